@@ -1,12 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select, func
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
+from starlette.concurrency import run_in_threadpool
+from app.api.seats import etag_matches
 from app.db.database import get_session
-from app.models.models import Booking, User, Seat, SeatType, BookingStatus, BookingDuration, Payment, PaymentStatus, RazorpayPaymentStatus
-from app.core.auth import admin_required, get_current_user
-from app.core.pricing import compute_amount, to_paise, compute_end_time
-from typing import List, Optional
-from datetime import datetime, timezone
+from app.models.models import Booking, User, UserRole, Seat, SeatType, BookingDuration, Payment, KycDocumentInfo
+from app.core.admin_views import list_bookings, list_kyc, list_users, update_user_summary
+from app.core.auth import Principal, admin_required, get_current_user, principal_cache
+from app.core.availability import active_paid_statement, bump_seat_version
+from app.core.blobstore import BlobNotFound, blob_store, read_chunks
+from app.core.checkout import CheckoutError, begin_checkout, finish_checkout, release_checkout
+from app.core.config import settings
+from app.core.gateway import GatewayError, gateway
+from app.core.kyc_documents import InvalidDocument, decode_data_url, migrate_inline_documents
+from app.core.kyc_processing import PREVIEW_CONTENT_TYPE
+from app.core.occupancy import backfill_occupancy, occupancy_heatmap
+from app.core.pricing import to_paise
+from app.core.reconciliation import reconcile_pending_orders
+from app.core.revenue import DIMENSIONS, backfill_revenue, rebuild_revenue, revenue_report
+from app.core.webhook_inbox import inbox_metrics
+from functools import partial
+from typing import BinaryIO, Callable, List, Optional
+from urllib.parse import quote
+from uuid import UUID
+from datetime import date, datetime, timedelta, timezone
+import hashlib
+import io
 import sqlalchemy
 import logging
 
@@ -16,6 +36,8 @@ router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(admin_
 
 
 class AdminUserSummary(BaseModel):
+    model_config = ConfigDict(from_attributes=True)   # built from app.core.admin_views rows
+
     id: str
     full_name: str
     email: str
@@ -25,6 +47,8 @@ class AdminUserSummary(BaseModel):
 
 
 class AdminBookingSummary(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: str
     user_name: str
     user_email: str
@@ -74,6 +98,11 @@ class AdminSeatUpdate(BaseModel):
     locked_until: Optional[datetime] = None
 
 
+class AdminUserUpdate(BaseModel):
+    role: Optional[UserRole] = None
+    is_active: Optional[bool] = None
+
+
 class AdminSeatLock(BaseModel):
     """Lock a seat manually until a specific datetime. Pass null to unlock."""
     locked_until: Optional[datetime] = None
@@ -81,57 +110,45 @@ class AdminSeatLock(BaseModel):
 
 @router.get("/users", response_model=List[AdminUserSummary])
 def get_all_users(session: Session = Depends(get_session)):
-    users = session.exec(select(User)).all()
-    return [
-        AdminUserSummary(
-            id=str(user.id),
-            full_name=user.full_name,
-            email=user.email,
-            role=user.role.value,
-            is_active=user.is_active,
-            created_at=user.created_at,
-        )
-        for user in users
-    ]
+    return list_users(session)
+
+
+@router.patch("/users/{user_id}", response_model=AdminUserSummary)
+def update_user(
+    user_id: str,
+    body: AdminUserUpdate,
+    current_admin: Principal = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Change a user's role or deactivate them; takes effect on their next request."""
+    try:
+        uid = UUID(user_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid user ID")
+    if uid == current_admin.id:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="You cannot change your own role or status")
+
+    # One UPDATE ... RETURNING of the summary columns; the User entity (and its document column) is never loaded
+    values = body.model_dump(exclude_none=True)
+    row = update_user_summary(session, uid, values)
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    session.commit()
+    principal_cache.invalidate(row.email)
+    return row
 
 
 @router.get("/bookings", response_model=List[AdminBookingSummary])
 def get_all_bookings(session: Session = Depends(get_session)):
-    # Join with User and Seat for full CRM view
-    statement = select(Booking, User, Seat).join(User).join(Seat)
-    results = session.exec(statement).all()
-    
-    formatted_results = []
-    for booking, user, seat in results:
-        formatted_results.append({
-            "id": str(booking.id),
-            "user_name": user.full_name,
-            "user_email": user.email,
-            "gov_id": f"{user.gov_id_type}: {user.gov_id_number}",
-            "seat_code": seat.code,
-            "status": booking.status.value,
-            "date": booking.booking_date,
-            "duration_unit": booking.duration_unit.value,
-            "duration_quantity": booking.duration_quantity,
-            "amount": booking.price_amount,
-            "start_time": booking.start_time,
-            "end_time": booking.end_time,
-        })
-    return formatted_results
+    # Booking joined with its user and seat, projected to the CRM columns
+    return list_bookings(session)
 
 
 @router.get("/stats", response_model=AdminStats)
 def get_stats(session: Session = Depends(get_session)):
     total_seats = session.exec(select(Seat)).all()
     now = datetime.now(timezone.utc)
-    active_bookings = session.exec(
-        select(Booking.seat_id).where(
-            Booking.status == BookingStatus.PAID,
-            Booking.end_time.is_not(None),
-            Booking.end_time > now,
-        )
-    ).all()
-    locked_ids = set(active_bookings)
+    locked_ids = {seat_id for seat_id, _ in session.exec(active_paid_statement(now)).all()}
     available_seats = sum(1 for seat in total_seats if seat.is_available and seat.id not in locked_ids)
 
     return {
@@ -146,13 +163,7 @@ def get_stats(session: Session = Depends(get_session)):
 def get_seats(session: Session = Depends(get_session)):
     seats = session.exec(select(Seat)).all()
     now = datetime.now(timezone.utc)
-    active_bookings = session.exec(
-        select(Booking.seat_id, Booking.end_time).where(
-            Booking.status == BookingStatus.PAID,
-            Booking.end_time.is_not(None),
-            Booking.end_time > now,
-        )
-    ).all()
+    active_bookings = session.exec(active_paid_statement(now)).all()
     booking_lock_map = {seat_id: end_time for seat_id, end_time in active_bookings}
     return [
         AdminSeatSummary(
@@ -189,6 +200,7 @@ def create_seat(body: AdminSeatCreate, session: Session = Depends(get_session)):
     )
     session.add(seat)
     session.commit()
+    bump_seat_version()
     session.refresh(seat)
     return AdminSeatSummary(
         id=seat.id,
@@ -232,6 +244,7 @@ def update_seat(seat_id: int, body: AdminSeatUpdate, session: Session = Depends(
 
     session.add(seat)
     session.commit()
+    bump_seat_version()
     session.refresh(seat)
     now = datetime.now(timezone.utc)
     return AdminSeatSummary(
@@ -256,6 +269,7 @@ def lock_seat(seat_id: int, body: AdminSeatLock, session: Session = Depends(get_
     seat.locked_until = body.locked_until
     session.add(seat)
     session.commit()
+    bump_seat_version()
     session.refresh(seat)
     now = datetime.now(timezone.utc)
     return AdminSeatSummary(
@@ -270,7 +284,180 @@ def lock_seat(seat_id: int, body: AdminSeatLock, session: Session = Depends(get_
     )
 
 
+# ── Utilisation analytics ───────────────────────────────────────────────────
+
+class HeatmapCell(BaseModel):
+    weekday: int            # ISO weekday, 1 = Monday
+    hour: int               # 0-23 in ANALYTICS_TIMEZONE
+    occupied_minutes: float
+    utilisation: float      # 0.0 - 1.0 of seat capacity for that hour-of-week
+
+
+class OccupancyHeatmapResponse(BaseModel):
+    start: datetime
+    end: datetime
+    seat_count: int
+    cells: List[HeatmapCell]
+
+
+class OccupancyBackfillResponse(BaseModel):
+    bookings_processed: int
+    more_remaining: bool
+
+
+@router.get("/analytics/heatmap", response_model=OccupancyHeatmapResponse)
+def get_occupancy_heatmap(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    section: Optional[str] = None,
+    seat_type: Optional[str] = None,
+    seat_id: Optional[int] = None,
+    session: Session = Depends(get_session),
+):
+    """Hour-of-week utilisation from the hourly rollup (defaults to the last 12 weeks)."""
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(weeks=12)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if end <= start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="End must be after start")
+    if end - start > timedelta(days=366 * 3):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Range is limited to 3 years")
+
+    seat_count, cells = occupancy_heatmap(session, start, end, section=section, seat_type=seat_type, seat_id=seat_id)
+    return OccupancyHeatmapResponse(start=start, end=end, seat_count=seat_count, cells=cells)
+
+
+@router.post("/analytics/occupancy/backfill", response_model=OccupancyBackfillResponse)
+def run_occupancy_backfill(
+    chunk_size: int = Query(default=500, ge=1, le=5000),
+    max_chunks: int = Query(default=20, ge=1, le=1000),
+):
+    """Fold historical paid bookings into the rollup. Call again while more_remaining is true."""
+    processed, more = backfill_occupancy(chunk_size=chunk_size, max_chunks=max_chunks)
+    return OccupancyBackfillResponse(bookings_processed=processed, more_remaining=more)
+
+
+# ── Revenue ledger ──────────────────────────────────────────────────────────
+
+class RevenueLine(BaseModel):
+    day: date | None = None
+    seat_type: str | None = None
+    duration_unit: str | None = None
+    section: str | None = None
+    amount: float
+    payments: int
+
+
+class RevenueReportResponse(BaseModel):
+    start: date
+    end: date
+    total_amount: float
+    total_payments: int
+    lines: List[RevenueLine]
+
+
+class RevenueBackfillResponse(BaseModel):
+    payments_processed: int
+    more_remaining: bool
+
+
+@router.get("/analytics/revenue", response_model=RevenueReportResponse)
+def get_revenue(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    group_by: List[str] = Query(default=["day"]),
+    seat_type: Optional[str] = None,
+    duration_unit: Optional[BookingDuration] = None,
+    section: Optional[str] = None,
+    session: Session = Depends(get_session),
+):
+    """Revenue per day / seat type / duration unit / section from the daily ledger (defaults to the last 30 days)."""
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=29)
+    if end < start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="End must not be before start")
+    if end - start > timedelta(days=366 * 3):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Range is limited to 3 years")
+    unknown = [dimension for dimension in group_by if dimension not in DIMENSIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot group by {', '.join(unknown)}; use {', '.join(DIMENSIONS)}",
+        )
+
+    lines = revenue_report(
+        session, start, end,
+        group_by=list(dict.fromkeys(group_by)),
+        seat_type=seat_type,
+        duration_unit=duration_unit.name if duration_unit else None,
+        section=section,
+    )
+    for line in lines:
+        if "duration_unit" in line and line["duration_unit"] in BookingDuration.__members__:
+            line["duration_unit"] = BookingDuration[line["duration_unit"]].value
+    return RevenueReportResponse(
+        start=start,
+        end=end,
+        total_amount=round(sum(line["amount"] for line in lines), 2),
+        total_payments=sum(line["payments"] for line in lines),
+        lines=lines,
+    )
+
+
+@router.post("/analytics/revenue/backfill", response_model=RevenueBackfillResponse)
+def run_revenue_backfill(
+    chunk_size: int = Query(default=1000, ge=1, le=10000),
+    max_chunks: int = Query(default=20, ge=1, le=1000),
+):
+    """Fold payments missing from the ledger into it. Call again while more_remaining is true."""
+    processed, more = backfill_revenue(chunk_size=chunk_size, max_chunks=max_chunks)
+    return RevenueBackfillResponse(payments_processed=processed, more_remaining=more)
+
+
+@router.post("/analytics/revenue/rebuild")
+def run_revenue_rebuild():
+    """Recompute the whole ledger from the payment table (e.g. after changing ANALYTICS_TIMEZONE)."""
+    return {"rows": rebuild_revenue()}
+
+
+class WebhookInboxMetrics(BaseModel):
+    pending: int
+    dead_letter: int
+    oldest_pending_at: datetime | None
+    lag_seconds: float
+    processed_last_hour: int
+    avg_processing_seconds: float | None
+    max_processing_seconds: float | None
+
+
+@router.get("/webhooks/metrics", response_model=WebhookInboxMetrics)
+def get_webhook_metrics(session: Session = Depends(get_session)):
+    """Razorpay webhook inbox depth and processing lag."""
+    return WebhookInboxMetrics(**vars(inbox_metrics(session)))
+
+
+class ReconcileResponse(BaseModel):
+    checked: int
+    confirmed: List[str]
+    failed: List[str]
+    conflicts: List[str]
+    errors: List[str]
+
+
+@router.post("/payments/reconcile", response_model=ReconcileResponse)
+async def run_payment_reconciliation(limit: int = Query(default=50, ge=1, le=1000)):
+    """Run one reconciliation pass now instead of waiting for the scheduled one."""
+    if not gateway.configured:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Payment gateway not configured.")
+    return ReconcileResponse(**vars(await reconcile_pending_orders(limit)))
+
+
 class AdminKYCSummary(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: str
     full_name: str
     email: str
@@ -282,53 +469,161 @@ class AdminKYCSummary(BaseModel):
     kyc_document_name: str | None
     has_document: bool
     created_at: datetime
+    processing_status: str | None     # pending | ready | failed; None for documents not migrated yet
+    detected_type: str | None
+    document_size: int | None
+    has_preview: bool
 
 
 @router.get("/kyc", response_model=List[AdminKYCSummary])
 def get_kyc_list(session: Session = Depends(get_session)):
     """Return all users with KYC metadata — excludes raw document bytes."""
-    users = session.exec(select(User)).all()
-    return [
-        AdminKYCSummary(
-            id=str(u.id),
-            full_name=u.full_name,
-            email=u.email,
-            mobile=u.mobile,
-            gov_id_type=u.gov_id_type,
-            gov_id_number=u.gov_id_number,
-            occupation_sector=u.occupation_sector,
-            occupation_role=u.occupation_role,
-            kyc_document_name=u.kyc_document_name,
-            has_document=bool(u.kyc_document_data),
-            created_at=u.created_at,
+    return list_kyc(session)
+
+
+def _parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    Single ``bytes=`` range -> inclusive (start, end); None to send the whole
+    body (no header, or a multi-range we do not serve). Raises 416 if unsatisfiable.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[6:].strip().partition("-")
+    try:
+        if first:
+            start, end = int(first), int(last) if last else size - 1
+        else:
+            start, end = max(size - int(last), 0), size - 1     # suffix: the last N bytes
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={"Content-Range": f"bytes */{size}"},
         )
-        for u in users
-    ]
+    return start, min(end, size - 1)
+
+
+def _document_response(
+    request: Request, open_body: Callable[[], BinaryIO], size: int, etag: str, content_type: str, filename: str,
+) -> Response:
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": f"inline; filename*=UTF-8''{quote(filename)}",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range == etag:
+        byte_range = _parse_range(request.headers.get("range"), size)
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(read_chunks(open_body()), media_type=content_type, headers=headers)
+    start, end = byte_range
+    headers["Content-Length"] = str(end - start + 1)
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(
+        read_chunks(open_body(), start, end - start + 1),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=content_type,
+        headers=headers,
+    )
 
 
 @router.get("/kyc/{user_id}/document")
-def get_kyc_document(user_id: str, session: Session = Depends(get_session)):
-    """Return the base64 document for a single user (on-demand only)."""
-    from uuid import UUID as _UUID
+def get_kyc_document(user_id: str, request: Request, session: Session = Depends(get_session)):
+    """Stream the user's KYC document (Range / If-None-Match aware)."""
     try:
-        uid = _UUID(user_id)
+        uid = UUID(user_id)
     except ValueError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid user ID")
-    user = session.get(User, uid)
-    if not user:
+    row = session.exec(
+        select(
+            User.kyc_document_name,
+            User.kyc_document_key,
+            User.kyc_document_content_type,
+            User.kyc_document_data.is_not(None),
+        ).where(User.id == uid)
+    ).first()
+    if row is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    if not user.kyc_document_data:
+    name, key, content_type, has_inline = row
+    filename = name or "kyc-document"
+
+    if key is not None:
+        try:
+            size = blob_store.size(key)
+        except BlobNotFound:
+            logger.error("KYC blob %s of user %s is missing from the blob store", key, uid)
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No document uploaded")
+        return _document_response(
+            request, partial(blob_store.open, key), size, f'"{key}"',
+            content_type or "application/octet-stream", filename,
+        )
+
+    if not has_inline:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No document uploaded")
-    return {
-        "document_name": user.kyc_document_name,
-        "document_data": user.kyc_document_data,
-    }
+    # Not migrated yet (python -m app.db.kyc_migrate): decode the inline copy
+    data = session.exec(select(User.kyc_document_data).where(User.id == uid)).first()
+    try:
+        content_type, raw = decode_data_url(data)
+    except InvalidDocument:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No document uploaded")
+    return _document_response(
+        request, partial(io.BytesIO, raw), len(raw), f'"{hashlib.sha256(raw).hexdigest()}"', content_type, filename,
+    )
+
+
+@router.get("/kyc/{user_id}/preview")
+def get_kyc_preview(user_id: str, request: Request, session: Session = Depends(get_session)):
+    """Small JPEG preview of the user's KYC document, once background processing has made one."""
+    try:
+        uid = UUID(user_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid user ID")
+    preview_key = session.exec(
+        select(KycDocumentInfo.preview_key)
+        .join(User, User.kyc_document_key == KycDocumentInfo.key)
+        .where(User.id == uid)
+    ).first()
+    if preview_key is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No preview available")
+    try:
+        size = blob_store.size(preview_key)
+    except BlobNotFound:
+        logger.error("KYC preview blob %s of user %s is missing from the blob store", preview_key, uid)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No preview available")
+    return _document_response(
+        request, partial(blob_store.open, preview_key), size, f'"{preview_key}"',
+        PREVIEW_CONTENT_TYPE, "kyc-preview.jpg",
+    )
+
+
+class KYCMigrationResponse(BaseModel):
+    migrated: int
+    failed: int
+    more_remaining: bool
+
+
+@router.post("/kyc/migrate", response_model=KYCMigrationResponse)
+def run_kyc_migration(
+    batch_size: int = Query(default=50, ge=1, le=500),
+    max_batches: int = Query(default=20, ge=1, le=1000),
+):
+    """Move inline base64 documents into the blob store. Call again while more_remaining is true."""
+    migrated, failed, more = migrate_inline_documents(batch_size=batch_size, max_batches=max_batches)
+    return KYCMigrationResponse(migrated=migrated, failed=failed, more_remaining=more)
 
 
 @router.post("/seats/reset-availability")
 def reset_seat_availability(session: Session = Depends(get_session)):
     session.exec(sqlalchemy.update(Seat).values(is_available=True))
     session.commit()
+    bump_seat_version()
     return {"message": "All seats marked available."}
 
 
@@ -339,6 +634,7 @@ class AdminBookingOrderRequest(BaseModel):
     duration_unit: BookingDuration = BookingDuration.MONTHLY
     duration_quantity: int = 1
     custom_amount: Optional[float] = None   # override computed price (total, in INR)
+    start_time: Optional[datetime] = None   # future reservation; None = starts on payment
 
 
 class AdminBookingOrderResponse(BaseModel):
@@ -351,109 +647,45 @@ class AdminBookingOrderResponse(BaseModel):
 
 
 @router.post("/bookings/create-order", response_model=AdminBookingOrderResponse)
-def admin_create_booking_order(
+async def admin_create_booking_order(
     body: AdminBookingOrderRequest,
-    current_admin: User = Depends(get_current_user),
+    current_admin: Principal = Depends(get_current_user),
     session: Session = Depends(get_session),
 ):
     """Admin creates a booking + Razorpay order, optionally with a custom amount."""
-    import razorpay
-    from app.core.config import settings
-
-    if body.duration_quantity < 1:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Duration quantity must be at least 1")
-    if not body.seat_ids:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="At least one seat required")
-
-    seats = session.exec(select(Seat).where(Seat.id.in_(body.seat_ids))).all()
-    seat_map = {seat.id: seat for seat in seats}
-    missing = [sid for sid in body.seat_ids if sid not in seat_map]
-    if missing:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Some seats not found")
+    if not gateway.configured:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Payment gateway not configured")
 
-    now = datetime.now(timezone.utc)
-    active = session.exec(
-        select(Booking.seat_id).where(
-            Booking.status == BookingStatus.PAID,
-            Booking.end_time.is_not(None),
-            Booking.end_time > now,
-        )
-    ).all()
-    locked_ids = set(active)
-
-    for seat in seats:
-        manually_locked = seat.locked_until and seat.locked_until > now
-        if not seat.is_available or seat.id in locked_ids or manually_locked:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Seat {seat.code} is not available")
-
-    # Cancel stale PENDING bookings by this admin for these seats
-    stale = session.exec(
-        select(Booking).where(
-            Booking.user_id == current_admin.id,
-            Booking.seat_id.in_(body.seat_ids),
-            Booking.status == BookingStatus.PENDING,
-        )
-    ).all()
-    for b in stale:
-        b.status = BookingStatus.CANCELLED
-        session.add(b)
-    if stale:
-        session.commit()
-
-    # Compute per-seat amounts
-    computed_total = sum(
-        compute_amount(seat_map[sid].type, body.duration_unit, body.duration_quantity)
-        for sid in body.seat_ids
-    )
-    total_amount = body.custom_amount if body.custom_amount and body.custom_amount > 0 else computed_total
-    # Distribute custom amount proportionally across seats
-    per_seat_amount = round(total_amount / len(body.seat_ids), 2)
-
-    booking_ids: List[str] = []
-    for seat_id in body.seat_ids:
-        booking = Booking(
-            user_id=current_admin.id,
-            seat_id=seat_id,
-            booking_date=now,
-            status=BookingStatus.PENDING,
-            duration_unit=body.duration_unit,
-            duration_quantity=body.duration_quantity,
-            price_amount=per_seat_amount,
+    try:
+        checkout = await run_in_threadpool(
+            begin_checkout, session, current_admin.id, body.seat_ids, body.duration_unit, body.duration_quantity,
+            body.start_time, body.custom_amount,
         )
-        session.add(booking)
-        session.flush()
-        booking_ids.append(str(booking.id))
-    session.commit()
+    except CheckoutError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail)
 
-    if not settings.RAZORPAY_KEY_ID or not settings.RAZORPAY_KEY_SECRET:
-        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Payment gateway not configured")
-
-    client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
+    booking_ids = checkout.booking_ids
+    total_amount = checkout.total_amount
     amount_paise = to_paise(total_amount)
     receipt = f"adm-{booking_ids[0][:8]}"
 
     try:
-        order = client.order.create({
+        order = await gateway.create_order({
             "amount": amount_paise,
             "currency": "INR",
             "receipt": receipt,
             "notes": {
-                "booking_ids": ",".join(b[:8] for b in booking_ids),
+                "booking_ids": ",".join(b[:8] for b in booking_ids[:20]),
                 "admin_email": current_admin.email,
                 "type": "admin_manual",
             },
         })
-    except Exception as exc:
+    except GatewayError as exc:
         logger.error("Admin Razorpay order creation failed: %s", exc)
+        await run_in_threadpool(release_checkout, session, [seat.id for seat in checkout.seats], current_admin.id)
         raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Payment gateway error.")
 
-    for bid in booking_ids:
-        booking = session.get(Booking, bid)
-        if booking:
-            booking.razorpay_order_id = order["id"]
-            booking.payment_status = RazorpayPaymentStatus.PENDING
-            session.add(booking)
-    session.commit()
+    await run_in_threadpool(finish_checkout, session, booking_ids, order["id"])
 
     return AdminBookingOrderResponse(
         razorpay_order_id=order["id"],
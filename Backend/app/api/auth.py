@@ -1,15 +1,30 @@
 import logging
 from datetime import timedelta
+from functools import partial
 
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Callable, Optional
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
+from fastapi.exceptions import RequestValidationError
 from fastapi.security import OAuth2PasswordRequestForm
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, ValidationError
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
 
-from app.core.auth import create_access_token, get_password_hash, verify_password
+from app.core.auth import create_access_token
+from app.core.blobstore import BlobTooLarge
 from app.core.config import settings
+from app.core.kyc_documents import InvalidDocument, StoredDocument, store_data_url, store_upload
+from app.core.kyc_processing import enqueue_documents, kyc_processor
 from app.core.notifications import send_registration_email
+from app.core.passwords import PasswordHasherBusy, password_hasher
+from app.core.refresh_tokens import (
+    RefreshAccountInactive,
+    RefreshTokenError,
+    issue_refresh_token,
+    revoke_refresh_token,
+    rotate_refresh_token,
+)
 from app.db.database import get_session
 from app.models.models import User, UserRole
 
@@ -28,7 +43,8 @@ class RegisterRequest(BaseModel):
     occupation_sector: str = Field(default='', max_length=100)
     occupation_role: Optional[str] = Field(default=None, max_length=100)
     kyc_document_name: Optional[str] = Field(default=None, max_length=255)
-    kyc_document_data: Optional[str] = Field(default=None)  # base64 encoded file
+    # Legacy: base64 data URL, stored in the blob store. /auth/register/multipart uploads the file as-is.
+    kyc_document_data: Optional[str] = Field(default=None)
 
 
 class RegisterResponse(BaseModel):
@@ -39,20 +55,30 @@ class RegisterResponse(BaseModel):
 
 class LoginResponse(BaseModel):
     access_token: str
+    refresh_token: str
     token_type: str
     role: str
 
 
-@router.post("/register", response_model=RegisterResponse, status_code=status.HTTP_201_CREATED)
-def register(payload: RegisterRequest, session: Session = Depends(get_session)):
-    # Check if user already exists
-    statement = select(User).where(User.email == payload.email)
-    existing_user = session.exec(statement).first()
-    if existing_user:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email already registered")
-    
-    # Create new user
-    hashed_pwd = get_password_hash(payload.password)
+class RefreshRequest(BaseModel):
+    refresh_token: str = Field(min_length=1, max_length=255)
+
+
+def _hashing_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-ins right now. Try again in a moment.",
+        headers={"Retry-After": "1"},
+    )
+
+
+def _email_taken(session: Session, email: str) -> bool:
+    return session.exec(select(User.id).where(User.email == email)).first() is not None
+
+
+def _create_user(
+    session: Session, payload: RegisterRequest, hashed_pwd: str, document: Optional[StoredDocument],
+) -> User:
     db_user = User(
         email=payload.email,
         full_name=payload.full_name,
@@ -64,26 +90,127 @@ def register(payload: RegisterRequest, session: Session = Depends(get_session)):
         occupation_sector=payload.occupation_sector or None,
         occupation_role=payload.occupation_role or None,
         kyc_document_name=payload.kyc_document_name or None,
-        kyc_document_data=payload.kyc_document_data or None,
+        kyc_document_key=document.key if document else None,
+        kyc_document_size=document.size if document else None,
+        kyc_document_content_type=document.content_type if document else None,
     )
     session.add(db_user)
-    session.commit()
+    if document:
+        enqueue_documents(session, [document.key])
+    try:
+        session.commit()
+    except IntegrityError:
+        # Lost a race with a concurrent registration for the same email
+        session.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email already registered")
     session.refresh(db_user)
-    
+
     # Send mock email
     try:
         send_registration_email(db_user.email, db_user.full_name)
     except Exception as exc:  # noqa: BLE001
         logger.warning("Failed to send registration email for %s: %s", db_user.email, exc)
-    
+    return db_user
+
+
+async def _register(
+    session: Session, payload: RegisterRequest, store_document: Optional[Callable[[], StoredDocument]],
+) -> dict:
+    # Check if user already exists
+    if await run_in_threadpool(_email_taken, session, payload.email):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email already registered")
+
+    # Before hashing, so a rejected document costs no PBKDF2 job
+    document = None
+    if store_document is not None:
+        try:
+            document = await run_in_threadpool(store_document)
+        except BlobTooLarge as exc:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"KYC document exceeds {exc.max_bytes // (1024 * 1024)} MB",
+            )
+        except InvalidDocument as exc:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc))
+
+    try:
+        hashed_pwd = await password_hasher.hash(payload.password)
+    except PasswordHasherBusy:
+        raise _hashing_busy()
+
+    db_user = await run_in_threadpool(_create_user, session, payload, hashed_pwd, document)
+    if document:
+        kyc_processor.wake()   # sniffing and previews happen after the response
     return {"message": "User created successfully", "user_id": str(db_user.id), "role": db_user.role.value}
 
 
+@router.post("/register", response_model=RegisterResponse, status_code=status.HTTP_201_CREATED)
+async def register(payload: RegisterRequest, session: Session = Depends(get_session)):
+    store_document = partial(store_data_url, payload.kyc_document_data) if payload.kyc_document_data else None
+    return await _register(session, payload, store_document)
+
+
+@router.post("/register/multipart", response_model=RegisterResponse, status_code=status.HTTP_201_CREATED)
+async def register_multipart(
+    email: str = Form(...),
+    full_name: str = Form(...),
+    password: str = Form(...),
+    gov_id_type: str = Form(...),
+    gov_id_number: str = Form(...),
+    mobile: str = Form(default=""),
+    occupation_sector: str = Form(default=""),
+    occupation_role: Optional[str] = Form(default=None),
+    kyc_document: Optional[UploadFile] = File(default=None),
+    session: Session = Depends(get_session),
+):
+    """Registration as multipart/form-data; the KYC document is streamed to the blob store."""
+    has_document = kyc_document is not None and bool(kyc_document.filename)
+    try:
+        payload = RegisterRequest(
+            email=email,
+            full_name=full_name,
+            password=password,
+            gov_id_type=gov_id_type,
+            gov_id_number=gov_id_number,
+            mobile=mobile,
+            occupation_sector=occupation_sector,
+            occupation_role=occupation_role,
+            kyc_document_name=kyc_document.filename[:255] if has_document else None,
+        )
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors())
+    store_document = (
+        partial(store_upload, kyc_document.file, kyc_document.content_type) if has_document else None
+    )
+    return await _register(session, payload, store_document)
+
+
+def _login_row(session: Session, email: str):
+    return session.exec(
+        select(User.id, User.email, User.hashed_password, User.is_active, User.role).where(User.email == email)
+    ).first()
+
+
+def _start_session(session: Session, user_id) -> str:
+    refresh_token = issue_refresh_token(session, user_id)
+    session.commit()
+    return refresh_token
+
+
+def _access_token(subject: str) -> str:
+    return create_access_token(
+        subject=subject, expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+
+
 @router.post("/login", response_model=LoginResponse)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
-    statement = select(User).where(User.email == form_data.username)
-    user = session.exec(statement).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
+    user = await run_in_threadpool(_login_row, session, form_data.username)
+    try:
+        valid = user is not None and await password_hasher.verify(form_data.password, user.hashed_password)
+    except PasswordHasherBusy:
+        raise _hashing_busy()
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -92,9 +219,39 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = D
 
     if not user.is_active:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User account is inactive")
-    
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        subject=user.email, expires_delta=access_token_expires
-    )
-    return {"access_token": access_token, "token_type": "bearer", "role": user.role.value}
+
+    refresh_token = await run_in_threadpool(_start_session, session, user.id)
+    return {
+        "access_token": _access_token(user.email),
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "role": user.role.value,
+    }
+
+
+@router.post("/refresh", response_model=LoginResponse)
+def refresh(payload: RefreshRequest, session: Session = Depends(get_session)):
+    """Swap a refresh token for a new access / refresh pair; each refresh token works once."""
+    try:
+        refreshed = rotate_refresh_token(session, payload.refresh_token)
+    except RefreshAccountInactive:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User account is inactive")
+    except RefreshTokenError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return {
+        "access_token": _access_token(refreshed.email),
+        "refresh_token": refreshed.refresh_token,
+        "token_type": "bearer",
+        "role": refreshed.role.value,
+    }
+
+
+@router.post("/logout")
+def logout(payload: RefreshRequest, session: Session = Depends(get_session)):
+    """Revoke the refresh token and every token rotated from the same login."""
+    revoke_refresh_token(session, payload.refresh_token)
+    return {"message": "Signed out"}
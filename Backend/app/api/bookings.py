@@ -1,13 +1,20 @@
 import logging
+from itertools import islice
+from uuid import UUID
+from zoneinfo import ZoneInfo
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel
 from sqlmodel import Session, select
 from app.db.database import get_session
-from app.models.models import Booking, BookingStatus, BookingDuration, Seat, User
-from app.core.auth import get_current_user
-from app.core.pricing import compute_amount
-from datetime import datetime, timezone
+from app.models.models import Booking, BookingStatus, BookingDuration, RecurringBooking, Seat
+from app.core.auth import Principal, get_current_user
+from app.core.availability import find_conflicts, get_snapshot
+from app.core.config import settings
+from app.core.pricing import compute_amount, normalize_reservation_start, resolve_booking_window
+from app.core.recurrence import RecurrenceRule, format_weekdays, parse_weekdays
+from datetime import date, datetime, time, timedelta, timezone
+from typing import List, Optional
 
 router = APIRouter(prefix="/bookings", tags=["bookings"])
 logger = logging.getLogger(__name__)
@@ -18,19 +25,23 @@ class CreateBookingResponse(BaseModel):
     amount: float
     duration_unit: BookingDuration
     duration_quantity: int
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
     message: str
 
 
 class CreateBookingRequest(BaseModel):
     duration_unit: BookingDuration = BookingDuration.MONTHLY
     duration_quantity: int = 1
+    # Reserve a future window; omitted = the booking starts when payment is confirmed
+    start_time: Optional[datetime] = None
 
 
 @router.post("/create/{seat_id}", response_model=CreateBookingResponse, status_code=status.HTTP_201_CREATED)
 def create_booking(
     seat_id: int,
     body: CreateBookingRequest = CreateBookingRequest(),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     session: Session = Depends(get_session),
 ):
     if body.duration_quantity < 1:
@@ -43,34 +54,18 @@ def create_booking(
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Seat not available")
 
     now = datetime.now(timezone.utc)
-    if seat.locked_until and seat.locked_until > now:
+    try:
+        requested_start = normalize_reservation_start(body.start_time, now)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    start, end = resolve_booking_window(requested_start, body.duration_unit, body.duration_quantity, now)
+
+    if seat.locked_until and seat.locked_until > start:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Seat is temporarily locked by admin")
 
-    active_booking = session.exec(
-        select(Booking).where(
-            Booking.seat_id == seat_id,
-            Booking.status == BookingStatus.PAID,
-            Booking.end_time.is_not(None),
-            Booking.end_time > now,
-        )
-    ).first()
-    if active_booking:
+    if find_conflicts(session, [seat_id], start, end):
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Seat already booked for the selected time")
 
-    # Cancel stale PENDING bookings for this user+seat (from abandoned payments)
-    stale_pending = session.exec(
-        select(Booking).where(
-            Booking.user_id == current_user.id,
-            Booking.seat_id == seat_id,
-            Booking.status == BookingStatus.PENDING,
-        )
-    ).all()
-    for stale in stale_pending:
-        stale.status = BookingStatus.CANCELLED
-        session.add(stale)
-    if stale_pending:
-        session.commit()
-
     # Create pending booking
     booking_amount = compute_amount(seat.type, body.duration_unit, body.duration_quantity)
     booking = Booking(
@@ -81,6 +76,8 @@ def create_booking(
         duration_unit=body.duration_unit,
         duration_quantity=body.duration_quantity,
         price_amount=booking_amount,
+        start_time=requested_start,
+        end_time=end if requested_start else None,
     )
     session.add(booking)
     session.commit()
@@ -91,5 +88,200 @@ def create_booking(
         "amount": booking_amount,
         "duration_unit": body.duration_unit,
         "duration_quantity": body.duration_quantity,
+        "start_time": booking.start_time,
+        "end_time": booking.end_time,
         "message": "Booking created. Proceed to payment.",
     }
+
+
+# ---------------------------------------------------------------------------
+# Recurring bookings
+# ---------------------------------------------------------------------------
+
+class CreateRecurringBookingRequest(BaseModel):
+    seat_id: int
+    weekdays: List[int]                    # ISO weekdays, Monday = 1
+    first_date: date
+    last_date: date                        # inclusive
+    duration_unit: BookingDuration = BookingDuration.HOURLY   # HOURLY or DAILY
+    # Office-local wall-clock times, hourly rules only (daily rules take the whole day)
+    start_time: Optional[time] = None
+    end_time: Optional[time] = None
+
+
+class RecurringBookingResponse(BaseModel):
+    id: str
+    seat_id: int
+    weekdays: List[int]
+    first_date: date
+    last_date: date
+    duration_unit: BookingDuration
+    start_time: Optional[time] = None
+    end_time: Optional[time] = None
+    timezone: str
+    occurrence_count: int
+    amount: float
+    status: BookingStatus
+    payment_status: str
+    starts_at: datetime
+    ends_at: datetime
+
+
+class OccurrenceResponse(BaseModel):
+    start_time: datetime
+    end_time: datetime
+
+
+def _recurring_response(rule: RecurringBooking) -> RecurringBookingResponse:
+    return RecurringBookingResponse(
+        id=str(rule.id),
+        seat_id=rule.seat_id,
+        weekdays=sorted(parse_weekdays(rule.weekdays)),
+        first_date=rule.first_date,
+        last_date=rule.last_date,
+        duration_unit=rule.duration_unit,
+        start_time=rule.start_local_time,
+        end_time=rule.end_local_time,
+        timezone=rule.timezone,
+        occurrence_count=rule.occurrence_count,
+        amount=rule.price_amount,
+        status=rule.status,
+        payment_status=rule.payment_status,
+        starts_at=rule.starts_at,
+        ends_at=rule.ends_at,
+    )
+
+
+@router.post("/recurring", response_model=RecurringBookingResponse, status_code=status.HTTP_201_CREATED)
+def create_recurring_booking(
+    body: CreateRecurringBookingRequest,
+    current_user: Principal = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """
+    Book a seat on a weekly pattern (e.g. every Mon/Wed 09:00-13:00) between two
+    dates. The rule is stored once, priced once and paid with a single order
+    (``POST /payment/create-order-recurring``).
+    """
+    if body.duration_unit not in (BookingDuration.HOURLY, BookingDuration.DAILY):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Recurring bookings are hourly or daily")
+    if not body.weekdays or any(day < 1 or day > 7 for day in body.weekdays):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Weekdays must be 1 (Monday) to 7 (Sunday)")
+
+    hours_per_occurrence = 0
+    if body.duration_unit == BookingDuration.HOURLY:
+        if body.start_time is None or body.end_time is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Hourly rules need start_time and end_time")
+        span = datetime.combine(date.min, body.end_time) - datetime.combine(date.min, body.start_time)
+        if span.total_seconds() <= 0 or span.total_seconds() % 3600:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="end_time must be a whole number of hours after start_time",
+            )
+        hours_per_occurrence = int(span.total_seconds() // 3600)
+
+    tz = ZoneInfo(settings.OFFICE_TIMEZONE)
+    now = datetime.now(timezone.utc)
+    today = now.astimezone(tz).date()
+    if body.first_date < today or body.last_date < body.first_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid date range")
+    if body.last_date > today + timedelta(days=settings.RESERVATION_MAX_ADVANCE_DAYS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Bookings can be made at most {settings.RESERVATION_MAX_ADVANCE_DAYS} days ahead",
+        )
+
+    daily = body.duration_unit == BookingDuration.DAILY
+    rule = RecurrenceRule(
+        weekdays=frozenset(body.weekdays),
+        first_date=body.first_date,
+        last_date=body.last_date,
+        start_time=None if daily else body.start_time,
+        end_time=None if daily else body.end_time,
+        tz=tz,
+    )
+    occurrence_count = rule.count()
+    if occurrence_count == 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The rule has no occurrences in that range")
+    starts_at = rule.window(rule.first_day())[0]
+    ends_at = rule.window(rule.last_day())[1]
+    if starts_at < now:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The first occurrence has already started")
+
+    seat = session.get(Seat, body.seat_id)
+    if not seat:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Seat not found")
+    if not seat.is_available:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Seat is not available")
+    if seat.locked_until and seat.locked_until > starts_at:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Seat is temporarily locked by admin")
+
+    snapshot = get_snapshot(session)
+    for occurrence_start, occurrence_end in rule.occurrences(starts_at, ends_at):
+        if snapshot.overlaps(seat.id, occurrence_start, occurrence_end):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Seat already booked on {occurrence_start.astimezone(tz).date().isoformat()}",
+            )
+
+    quantity = occurrence_count if daily else hours_per_occurrence * occurrence_count
+    recurring = RecurringBooking(
+        user_id=current_user.id,
+        seat_id=seat.id,
+        duration_unit=body.duration_unit,
+        weekdays=format_weekdays(body.weekdays),
+        first_date=body.first_date,
+        last_date=body.last_date,
+        start_local_time=rule.start_time,
+        end_local_time=rule.end_time,
+        timezone=settings.OFFICE_TIMEZONE,
+        occurrence_count=occurrence_count,
+        price_amount=compute_amount(seat.type, body.duration_unit, quantity),
+        starts_at=starts_at,
+        ends_at=ends_at,
+    )
+    session.add(recurring)
+    session.commit()
+    session.refresh(recurring)
+    return _recurring_response(recurring)
+
+
+@router.get("/recurring", response_model=List[RecurringBookingResponse])
+def list_recurring_bookings(
+    current_user: Principal = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    rules = session.exec(
+        select(RecurringBooking)
+        .where(RecurringBooking.user_id == current_user.id)
+        .order_by(RecurringBooking.created_at.desc())
+    ).all()
+    return [_recurring_response(rule) for rule in rules]
+
+
+@router.get("/recurring/{recurring_id}/occurrences", response_model=List[OccurrenceResponse])
+def list_recurring_occurrences(
+    recurring_id: UUID,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(default=100, ge=1, le=500),
+    current_user: Principal = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Occurrences of a rule inside [start, end) (default: the next 30 days), expanded on demand."""
+    recurring = session.get(RecurringBooking, recurring_id)
+    if not recurring or (recurring.user_id != current_user.id and current_user.role != "admin"):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recurring booking not found")
+
+    start = start or datetime.now(timezone.utc)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    end = end or start + timedelta(days=30)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+
+    occurrences = RecurrenceRule.from_model(recurring).occurrences(start, end)
+    return [
+        OccurrenceResponse(start_time=occurrence_start, end_time=occurrence_end)
+        for occurrence_start, occurrence_end in islice(occurrences, limit)
+    ]
@@ -3,23 +3,35 @@ import hmac
 import json
 import logging
 
-import razorpay
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
 
-from app.core.auth import get_current_user
+from app.core.auth import Principal, get_current_user
+from app.core.availability import bump_seat_version
+from app.core.checkout import CheckoutError, PendingCheckout, begin_checkout, finish_checkout, release_checkout
 from app.core.config import settings
+from app.core.confirmation import (
+    SeatConflictError,
+    confirm_bookings,
+    confirm_recurring,
+    mark_orders_failed,
+    order_bookings_statement,
+)
+from app.core.gateway import GatewayError, gateway
+from app.core.holds import acquire_holds
 from app.core.notifications import send_booking_email
-from app.core.pricing import compute_amount, to_paise, compute_end_time
-from app.db.database import get_session
+from app.core.pricing import compute_amount, to_paise
+from app.core.webhook_inbox import event_id_for, inbox_worker, record_event
+from app.db.database import get_session, is_exclusion_violation
 from app.models.models import (
     Booking,
     BookingStatus,
     BookingDuration,
-    Payment,
-    PaymentStatus,
     RazorpayPaymentStatus,
+    RecurringBooking,
     Seat,
     User,
 )
@@ -33,13 +45,103 @@ logger = logging.getLogger(__name__)
 # Helpers
 # ---------------------------------------------------------------------------
 
-def _get_razorpay_client() -> razorpay.Client:
-    if not settings.RAZORPAY_KEY_ID or not settings.RAZORPAY_KEY_SECRET:
+def _require_gateway() -> None:
+    if not gateway.configured:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Payment gateway not configured.",
         )
-    return razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
+
+
+def _hold_seats(session: Session, seat_map: dict[int, Seat], user_id) -> None:
+    """Lease the seats to this checkout, or roll back and 409 if another checkout holds one."""
+    taken = acquire_holds(session, seat_map.keys(), user_id)
+    if taken:
+        session.rollback()
+        codes = ", ".join(sorted(seat_map[seat_id].code for seat_id in taken))
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Seat {codes} is being booked by someone else. Try again in a few minutes.",
+        )
+    session.commit()
+    bump_seat_version()
+
+
+async def _create_gateway_order(session: Session, payload: dict, seat_ids: list[int], user_id) -> dict:
+    """Create the Razorpay order; if that fails, release the holds and answer 502."""
+    try:
+        return await gateway.create_order(payload)
+    except GatewayError as exc:
+        logger.error("Razorpay order creation failed: %s", exc)
+        await run_in_threadpool(release_checkout, session, seat_ids, user_id)
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail="Payment gateway error. Try again.",
+        )
+
+
+def _set_order_id(session: Session, record: Booking | RecurringBooking, order_id: str) -> None:
+    record.razorpay_order_id = order_id
+    record.payment_status = RazorpayPaymentStatus.PENDING
+    record.order_created_at = datetime.now(timezone.utc)
+    session.add(record)
+    session.commit()
+
+
+async def _open_checkout_order(
+    session: Session,
+    user: Principal,
+    seat_ids: list[int],
+    duration_unit: BookingDuration,
+    duration_quantity: int,
+    start_time: datetime | None,
+    receipt_prefix: str,
+    notes: dict[str, str] | None = None,
+) -> tuple[PendingCheckout, dict, int]:
+    """Insert the PENDING bookings, create the Razorpay order and attach it to them."""
+    _require_gateway()
+    try:
+        checkout = await run_in_threadpool(
+            begin_checkout, session, user.id, seat_ids, duration_unit, duration_quantity, start_time,
+        )
+    except CheckoutError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail)
+
+    amount_paise = to_paise(checkout.total_amount)
+    booking_ids = checkout.booking_ids
+    order = await _create_gateway_order(
+        session,
+        {
+            "amount": amount_paise,
+            "currency": "INR",
+            # Razorpay receipt field has a hard 40-character maximum.
+            "receipt": f"{receipt_prefix}-{booking_ids[0][:8]}",
+            "notes": {
+                "booking_ids": ",".join(b[:8] for b in booking_ids[:20]),
+                "seat_count": str(len(booking_ids)),
+                "user_email": user.email,
+                "duration_unit": duration_unit,
+                **(notes or {}),
+            },
+        },
+        [seat.id for seat in checkout.seats],
+        user.id,
+    )
+    await run_in_threadpool(finish_checkout, session, booking_ids, order["id"])
+    return checkout, order, amount_paise
+
+
+def _email_contact(session: Session, user: Principal) -> dict:
+    """Admin-notification contact details, read only when a confirmation email goes out."""
+    mobile, gov_id_type, gov_id_number = session.exec(
+        select(User.mobile, User.gov_id_type, User.gov_id_number).where(User.id == user.id)
+    ).one()
+    return {
+        "user_name": user.full_name,
+        "user_email": user.email,
+        "user_mobile": mobile,
+        "gov_id": f"{gov_id_type}: {gov_id_number}",
+    }
 
 
 def _verify_razorpay_signature(order_id: str, payment_id: str, signature: str) -> bool:
@@ -64,6 +166,11 @@ class CreateOrderBatchRequest(BaseModel):
     seat_ids: list[int]
     duration_unit: BookingDuration = BookingDuration.MONTHLY
     duration_quantity: int = 1
+    start_time: datetime | None = None   # future reservation; None = starts on payment
+
+
+class CreateRecurringOrderRequest(BaseModel):
+    recurring_booking_id: str
 
 
 class CreateOrderResponse(BaseModel):
@@ -73,6 +180,28 @@ class CreateOrderResponse(BaseModel):
     key_id: str
     booking_id: str | None = None
     booking_ids: list[str] | None = None
+    recurring_booking_id: str | None = None
+
+
+class BulkOrderRequest(BaseModel):
+    seat_ids: list[int]
+    duration_unit: BookingDuration = BookingDuration.MONTHLY
+    duration_quantity: int = 1
+    start_time: datetime | None = None
+    reference: str | None = None          # customer PO / cost centre, copied into the order notes
+
+
+class BulkOrderLine(BaseModel):
+    booking_id: str
+    seat_id: int
+    seat_code: str
+    amount: float        # INR
+
+
+class BulkOrderResponse(CreateOrderResponse):
+    start_time: datetime | None = None
+    end_time: datetime | None = None
+    lines: list[BulkOrderLine]
 
 
 class VerifyPaymentRequest(BaseModel):
@@ -85,15 +214,9 @@ class VerifyPaymentRequest(BaseModel):
 # POST /payment/create-order
 # ---------------------------------------------------------------------------
 
-@router.post("/create-order", response_model=CreateOrderResponse, status_code=status.HTTP_201_CREATED)
-def create_order(
-    body: CreateOrderRequest,
-    current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
-):
-    """Create a Razorpay order for an existing PENDING booking."""
-    booking = session.get(Booking, body.booking_id)
-    if not booking or booking.user_id != current_user.id:
+def _load_payable_booking(session: Session, booking_id: str, user: Principal) -> tuple[Booking, Seat | None]:
+    booking = session.get(Booking, booking_id)
+    if not booking or booking.user_id != user.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Booking not found")
 
     if booking.status == BookingStatus.PAID:
@@ -101,32 +224,40 @@ def create_order(
     if booking.status == BookingStatus.CANCELLED:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cancelled booking cannot be paid")
 
+    seat = session.get(Seat, booking.seat_id)
+    if not seat and not booking.razorpay_order_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Seat not found")
+    return booking, seat
+
+
+@router.post("/create-order", response_model=CreateOrderResponse, status_code=status.HTTP_201_CREATED)
+async def create_order(
+    body: CreateOrderRequest,
+    current_user: Principal = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Create a Razorpay order for an existing PENDING booking."""
+    booking, seat = await run_in_threadpool(_load_payable_booking, session, body.booking_id, current_user)
+    booking_amount = booking.price_amount or compute_amount(
+        seat.type if seat else "workstation", booking.duration_unit, booking.duration_quantity
+    )
+    amount_paise = to_paise(booking_amount)
+
     # Idempotency: return existing order if already created
     if booking.razorpay_order_id:
-        seat = session.get(Seat, booking.seat_id)
-        booking_amount = booking.price_amount or compute_amount(
-            seat.type if seat else "workstation", booking.duration_unit, booking.duration_quantity
-        )
         return CreateOrderResponse(
             razorpay_order_id=booking.razorpay_order_id,
-            amount=to_paise(booking_amount),
+            amount=amount_paise,
             currency="INR",
             key_id=settings.RAZORPAY_KEY_ID,
             booking_id=str(booking.id),
         )
 
-    seat = session.get(Seat, booking.seat_id)
-    if not seat:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Seat not found")
-
-    client = _get_razorpay_client()
-    booking_amount = booking.price_amount or compute_amount(
-        seat.type, booking.duration_unit, booking.duration_quantity
-    )
-    amount_paise = to_paise(booking_amount)
-
-    try:
-        order = client.order.create({
+    _require_gateway()
+    await run_in_threadpool(_hold_seats, session, {seat.id: seat}, current_user.id)
+    order = await _create_gateway_order(
+        session,
+        {
             "amount": amount_paise,
             "currency": "INR",
             "receipt": str(booking.id)[:40],   # Razorpay max 40 chars
@@ -135,19 +266,11 @@ def create_order(
                 "seat_code": seat.code,
                 "user_email": current_user.email,
             },
-        })
-    except Exception as exc:
-        logger.error("Razorpay order creation failed: %s", exc)
-        raise HTTPException(
-            status_code=status.HTTP_502_BAD_GATEWAY,
-            detail="Payment gateway error. Try again.",
-        )
-
-    booking.razorpay_order_id = order["id"]
-    booking.payment_status = RazorpayPaymentStatus.PENDING
-    session.add(booking)
-    session.commit()
-    session.refresh(booking)
+        },
+        [seat.id],
+        current_user.id,
+    )
+    await run_in_threadpool(_set_order_id, session, booking, order["id"])
 
     return CreateOrderResponse(
         razorpay_order_id=order["id"],
@@ -163,116 +286,182 @@ def create_order(
 # ---------------------------------------------------------------------------
 
 @router.post("/create-order-batch", response_model=CreateOrderResponse, status_code=status.HTTP_201_CREATED)
-def create_order_batch(
+async def create_order_batch(
     body: CreateOrderBatchRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     session: Session = Depends(get_session),
 ):
     """Create a Razorpay order for multiple seats in one payment."""
-    if body.duration_quantity < 1:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Duration quantity must be at least 1")
-    if not body.seat_ids:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="At least one seat is required")
-
-    seats = session.exec(select(Seat).where(Seat.id.in_(body.seat_ids))).all()
-    seat_map = {seat.id: seat for seat in seats}
-
-    missing = [seat_id for seat_id in body.seat_ids if seat_id not in seat_map]
-    if missing:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Some seats were not found")
-
-    now = datetime.now(timezone.utc)
-    active_bookings = session.exec(
-        select(Booking.seat_id).where(
-            Booking.status == BookingStatus.PAID,
-            Booking.end_time.is_not(None),
-            Booking.end_time > now,
-        )
-    ).all()
-    locked_seat_ids = set(active_bookings)
-
-    for seat in seats:
-        manually_locked = seat.locked_until and seat.locked_until > now
-        if not seat.is_available or seat.id in locked_seat_ids or manually_locked:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Seat {seat.code} is not available")
-
-    # Cancel any stale PENDING bookings for this user+seats (from abandoned payment attempts)
-    stale_pending = session.exec(
-        select(Booking).where(
-            Booking.user_id == current_user.id,
-            Booking.seat_id.in_(body.seat_ids),
-            Booking.status == BookingStatus.PENDING,
-        )
-    ).all()
-    for stale in stale_pending:
-        stale.status = BookingStatus.CANCELLED
-        session.add(stale)
-    if stale_pending:
-        session.commit()
+    checkout, order, amount_paise = await _open_checkout_order(
+        session, current_user, body.seat_ids, body.duration_unit, body.duration_quantity, body.start_time,
+        receipt_prefix="batch",
+    )
+    return CreateOrderResponse(
+        razorpay_order_id=order["id"],
+        amount=amount_paise,
+        currency="INR",
+        key_id=settings.RAZORPAY_KEY_ID,
+        booking_ids=checkout.booking_ids,
+    )
 
-    booking_ids: list[str] = []
-    total_amount = 0.0
-    for seat_id in body.seat_ids:
-        seat = seat_map[seat_id]
-        seat_amount = compute_amount(seat.type, body.duration_unit, body.duration_quantity)
-        total_amount += seat_amount
-        booking = Booking(
-            user_id=current_user.id,
-            seat_id=seat_id,
-            booking_date=datetime.now(timezone.utc),
-            status=BookingStatus.PENDING,
-            duration_unit=body.duration_unit,
-            duration_quantity=body.duration_quantity,
-            price_amount=seat_amount,
-        )
-        session.add(booking)
-        session.flush()
-        booking_ids.append(str(booking.id))
 
-    session.commit()
+# ---------------------------------------------------------------------------
+# POST /payment/create-order-bulk
+# ---------------------------------------------------------------------------
 
-    client = _get_razorpay_client()
-    amount_paise = to_paise(total_amount)
+@router.post("/create-order-bulk", response_model=BulkOrderResponse, status_code=status.HTTP_201_CREATED)
+async def create_order_bulk(
+    body: BulkOrderRequest,
+    current_user: Principal = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """
+    Corporate booking: many seats, one shared duration, one payment. Same checkout
+    as ``create-order-batch`` (up to BULK_BOOKING_MAX_SEATS seats) with a per-seat
+    breakdown in the response.
+    """
+    notes = {"reference": body.reference[:200]} if body.reference else {}
+    checkout, order, amount_paise = await _open_checkout_order(
+        session, current_user, body.seat_ids, body.duration_unit, body.duration_quantity, body.start_time,
+        receipt_prefix="bulk", notes=notes,
+    )
+    return BulkOrderResponse(
+        razorpay_order_id=order["id"],
+        amount=amount_paise,
+        currency="INR",
+        key_id=settings.RAZORPAY_KEY_ID,
+        booking_ids=checkout.booking_ids,
+        start_time=checkout.start_time,
+        end_time=checkout.end_time,
+        lines=[
+            BulkOrderLine(booking_id=booking_id, seat_id=seat.id, seat_code=seat.code, amount=amount)
+            for booking_id, seat, amount in zip(checkout.booking_ids, checkout.seats, checkout.amounts)
+        ],
+    )
 
-    # Razorpay receipt field has a hard 40-character maximum.
-    # Use a short hash of the first booking_id so it's always within the limit.
-    receipt_ref = f"batch-{booking_ids[0][:8]}" if booking_ids else "batch"
 
-    try:
-        order = client.order.create({
+# ---------------------------------------------------------------------------
+# POST /payment/create-order-recurring
+# ---------------------------------------------------------------------------
+
+def _load_payable_recurring(session: Session, recurring_id: str, user: Principal) -> tuple[RecurringBooking, Seat]:
+    recurring = session.get(RecurringBooking, recurring_id)
+    if not recurring or recurring.user_id != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recurring booking not found")
+    if recurring.status == BookingStatus.PAID:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Recurring booking already paid")
+    if recurring.status == BookingStatus.CANCELLED:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cancelled booking cannot be paid")
+    seat = session.get(Seat, recurring.seat_id)
+    if not seat:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Seat not found")
+    return recurring, seat
+
+
+@router.post("/create-order-recurring", response_model=CreateOrderResponse, status_code=status.HTTP_201_CREATED)
+async def create_recurring_order(
+    body: CreateRecurringOrderRequest,
+    current_user: Principal = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Create one Razorpay order covering every occurrence of a PENDING recurring booking."""
+    recurring, seat = await run_in_threadpool(
+        _load_payable_recurring, session, body.recurring_booking_id, current_user,
+    )
+    amount_paise = to_paise(recurring.price_amount)
+    if recurring.razorpay_order_id:
+        return CreateOrderResponse(
+            razorpay_order_id=recurring.razorpay_order_id,
+            amount=amount_paise,
+            currency="INR",
+            key_id=settings.RAZORPAY_KEY_ID,
+            recurring_booking_id=str(recurring.id),
+        )
+
+    _require_gateway()
+    await run_in_threadpool(_hold_seats, session, {seat.id: seat}, current_user.id)
+    order = await _create_gateway_order(
+        session,
+        {
             "amount": amount_paise,
             "currency": "INR",
-            "receipt": receipt_ref,
+            "receipt": f"rec-{str(recurring.id)[:8]}",
             "notes": {
-                "booking_ids": ",".join(b[:8] for b in booking_ids),
+                "recurring_booking_id": str(recurring.id),
+                "seat_code": seat.code,
+                "occurrences": str(recurring.occurrence_count),
                 "user_email": current_user.email,
-                "duration_unit": body.duration_unit,
             },
-        })
-    except Exception as exc:
-        logger.error("Razorpay order creation failed: %s", exc)
-        raise HTTPException(
-            status_code=status.HTTP_502_BAD_GATEWAY,
-            detail="Payment gateway error. Try again.",
-        )
-
-    for booking_id in booking_ids:
-        booking = session.get(Booking, booking_id)
-        if booking:
-            booking.razorpay_order_id = order["id"]
-            booking.payment_status = RazorpayPaymentStatus.PENDING
-            session.add(booking)
-    session.commit()
+        },
+        [seat.id],
+        current_user.id,
+    )
+    await run_in_threadpool(_set_order_id, session, recurring, order["id"])
 
     return CreateOrderResponse(
         razorpay_order_id=order["id"],
         amount=amount_paise,
         currency="INR",
         key_id=settings.RAZORPAY_KEY_ID,
-        booking_ids=booking_ids,
+        recurring_booking_id=str(recurring.id),
     )
 
 
+def _verify_recurring_payment(
+    body: VerifyPaymentRequest, current_user: Principal, session: Session, recurring: RecurringBooking,
+) -> dict:
+    if recurring.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Unauthorized booking")
+    if recurring.status == BookingStatus.PAID:
+        return {"message": "Booking already confirmed", "recurring_booking_id": str(recurring.id)}
+    if not _verify_razorpay_signature(body.razorpay_order_id, body.razorpay_payment_id, body.razorpay_signature):
+        recurring.payment_status = RazorpayPaymentStatus.FAILED
+        session.add(recurring)
+        session.commit()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Payment verification failed. Invalid signature.",
+        )
+
+    try:
+        confirm_recurring(session, recurring, body.razorpay_payment_id)
+        session.commit()
+    except SeatConflictError:
+        session.rollback()
+        mark_orders_failed(session, [body.razorpay_order_id])
+        session.commit()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Seat was booked by another user. Please contact support for a refund.",
+        )
+    bump_seat_version()
+
+    try:
+        seat = session.get(Seat, recurring.seat_id)
+        contact = _email_contact(session, current_user)
+        send_booking_email(
+            current_user.email,
+            current_user.full_name,
+            {
+                "seat_code": seat.code,
+                "seat_type": seat.type,
+                "section": seat.section,
+                "duration_unit": recurring.duration_unit.value,
+                "duration_quantity": recurring.occurrence_count,
+                "amount": recurring.price_amount,
+                "transaction_id": body.razorpay_payment_id,
+                "start_time": recurring.starts_at,
+                "end_time": recurring.ends_at,
+                "booking_date": recurring.created_at,
+                **contact,
+            },
+        )
+    except Exception as exc:
+        logger.warning("Failed to send booking email for %s: %s", current_user.email, exc)
+
+    return {"message": "Payment verified. Booking confirmed.", "recurring_booking_id": str(recurring.id)}
+
+
 # ---------------------------------------------------------------------------
 # POST /payment/verify
 # ---------------------------------------------------------------------------
@@ -280,15 +469,18 @@ def create_order_batch(
 @router.post("/verify")
 def verify_payment(
     body: VerifyPaymentRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     session: Session = Depends(get_session),
 ):
     """Verify Razorpay signature and confirm the booking."""
-    bookings = session.exec(
-        select(Booking).where(Booking.razorpay_order_id == body.razorpay_order_id)
-    ).all()
+    bookings = session.exec(order_bookings_statement(body.razorpay_order_id)).all()
 
     if not bookings:
+        recurring = session.exec(
+            select(RecurringBooking).where(RecurringBooking.razorpay_order_id == body.razorpay_order_id)
+        ).first()
+        if recurring:
+            return _verify_recurring_payment(body, current_user, session, recurring)
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Booking not found")
 
     if any(booking.user_id != current_user.id for booking in bookings):
@@ -303,93 +495,54 @@ def verify_payment(
         body.razorpay_payment_id,
         body.razorpay_signature,
     ):
-        for booking in bookings:
-            booking.payment_status = RazorpayPaymentStatus.FAILED
-            session.add(booking)
+        mark_orders_failed(session, [body.razorpay_order_id])
         session.commit()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Payment verification failed. Invalid signature.",
         )
 
-    now = datetime.now(timezone.utc)
-    for booking in bookings:
-        seat = session.get(Seat, booking.seat_id)
-        if not seat:
-            continue
-
-        conflicting = session.exec(
-            select(Booking).where(
-                Booking.seat_id == booking.seat_id,
-                Booking.status == BookingStatus.PAID,
-                Booking.id != booking.id,
-                Booking.end_time.is_not(None),
-                Booking.end_time > now,
-            )
-        ).first()
-        if conflicting:
-            booking.payment_status = RazorpayPaymentStatus.FAILED
-            session.add(booking)
-            session.commit()
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="Seat was booked by another user. Please contact support for a refund.",
-            )
-
-        booking.status = BookingStatus.PAID
-        booking.payment_status = RazorpayPaymentStatus.SUCCESS
-        booking.razorpay_payment_id = body.razorpay_payment_id
-        booking.start_time = now
-        booking.end_time = compute_end_time(now, booking.duration_unit, booking.duration_quantity)
-
-        payment_amount = booking.price_amount or compute_amount(
-            seat.type, booking.duration_unit, booking.duration_quantity
-        )
-        payment = Payment(
-            booking_id=booking.id,
-            amount=payment_amount,
-            status=PaymentStatus.COMPLETED,
-            transaction_id=body.razorpay_payment_id,
+    booking_ids = [str(booking.id) for booking in bookings]
+    try:
+        confirmed = confirm_bookings(session, bookings, body.razorpay_payment_id)
+        session.commit()
+    except (SeatConflictError, IntegrityError) as exc:
+        if isinstance(exc, IntegrityError) and not is_exclusion_violation(exc):
+            raise
+        # Nothing from this order may be confirmed: drop the partial work, then flag it
+        session.rollback()
+        mark_orders_failed(session, [body.razorpay_order_id])
+        session.commit()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Seat was booked by another user. Please contact support for a refund.",
         )
-
-        session.add(booking)
-        session.add(seat)
-        session.add(payment)
-    session.commit()
+    bump_seat_version()
 
     try:
-        for booking in bookings:
-            seat = session.get(Seat, booking.seat_id)
-            if not seat:
-                continue
-            amount = booking.price_amount or compute_amount(
-                seat.type, booking.duration_unit, booking.duration_quantity
-            )
+        contact = _email_contact(session, current_user)
+        for line in confirmed:
             send_booking_email(
                 current_user.email,
                 current_user.full_name,
                 {
-                    "seat_code": seat.code,
-                    "seat_type": seat.type,
-                    "section": seat.section,
-                    "duration_unit": booking.duration_unit.value,
-                    "duration_quantity": booking.duration_quantity,
-                    "amount": amount,
+                    "seat_code": line.seat_code,
+                    "seat_type": line.seat_type,
+                    "section": line.section,
+                    "duration_unit": line.duration_unit.value,
+                    "duration_quantity": line.duration_quantity,
+                    "amount": line.amount,
                     "transaction_id": body.razorpay_payment_id,
-                    "start_time": booking.start_time,
-                    "end_time": booking.end_time,
-                    "booking_date": booking.booking_date,
-                    # Admin notification extras
-                    "user_name": current_user.full_name,
-                    "user_email": current_user.email,
-                    "user_mobile": getattr(current_user, "mobile", None),
-                    "gov_id": f"{current_user.gov_id_type}: {current_user.gov_id_number}",
+                    "start_time": line.start_time,
+                    "end_time": line.end_time,
+                    "booking_date": line.booking_date,
+                    **contact,   # admin notification extras
                 },
             )
     except Exception as exc:
         logger.warning("Failed to send booking email for %s: %s", current_user.email, exc)
 
-    return {"message": "Payment verified. Booking confirmed.", "booking_ids": [str(b.id) for b in bookings]}
+    return {"message": "Payment verified. Booking confirmed.", "booking_ids": booking_ids}
 
 
 # ---------------------------------------------------------------------------
@@ -397,11 +550,14 @@ def verify_payment(
 # ---------------------------------------------------------------------------
 
 @router.post("/webhook", status_code=status.HTTP_200_OK)
-async def razorpay_webhook(request: Request, session: Session = Depends(get_session)):
+async def razorpay_webhook(request: Request):
     """
     Razorpay webhook endpoint.
     Configure in Razorpay Dashboard → Webhooks → URL: /payment/webhook
     Active events: payment.captured, payment.failed
+
+    Verified events are stored in the webhook inbox and applied by the inbox
+    worker (``app.core.webhook_inbox``); redeliveries of the same event id are ignored.
     """
     if not settings.RAZORPAY_WEBHOOK_SECRET:
         raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="Webhook not configured")
@@ -422,67 +578,12 @@ async def razorpay_webhook(request: Request, session: Session = Depends(get_sess
         payload = json.loads(body_bytes)
     except json.JSONDecodeError:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid JSON payload")
-    event = payload.get("event")
-
-    if event == "payment.captured":
-        payment_entity = payload["payload"]["payment"]["entity"]
-        order_id = payment_entity.get("order_id")
-        payment_id = payment_entity.get("id")
-
-        if not order_id:
-            return {"status": "ignored"}
-
-        bookings = session.exec(
-            select(Booking).where(Booking.razorpay_order_id == order_id)
-        ).all()
-
-        now = datetime.now(timezone.utc)
-        for booking in bookings:
-            if booking.status == BookingStatus.PAID:
-                continue
-            booking.status = BookingStatus.PAID
-            booking.payment_status = RazorpayPaymentStatus.SUCCESS
-            booking.razorpay_payment_id = payment_id
-            booking.start_time = now
-            booking.end_time = compute_end_time(now, booking.duration_unit, booking.duration_quantity)
-
-            seat = session.get(Seat, booking.seat_id)
-            if seat:
-                session.add(seat)
-
-            existing_payment = session.exec(
-                select(Payment).where(Payment.booking_id == booking.id)
-            ).first()
-            if not existing_payment:
-                amount = booking.price_amount or compute_amount(
-                    seat.type if seat else "workstation", booking.duration_unit, booking.duration_quantity
-                )
-                session.add(Payment(
-                    booking_id=booking.id,
-                    amount=amount,
-                    status=PaymentStatus.COMPLETED,
-                    transaction_id=payment_id,
-                ))
-
-            session.add(booking)
-        session.commit()
-        if bookings:
-            logger.info("Webhook confirmed %s booking(s) via payment %s", len(bookings), payment_id)
-
-    elif event == "payment.failed":
-        payment_entity = payload["payload"]["payment"]["entity"]
-        order_id = payment_entity.get("order_id")
-
-        if order_id:
-            bookings = session.exec(
-                select(Booking).where(Booking.razorpay_order_id == order_id)
-            ).all()
-            for booking in bookings:
-                if booking.status == BookingStatus.PENDING:
-                    booking.payment_status = RazorpayPaymentStatus.FAILED
-                    session.add(booking)
-            session.commit()
-            if bookings:
-                logger.info("Webhook marked %s booking(s) as payment failed", len(bookings))
-
-    return {"status": "ok"}
+    event = payload.get("event") if isinstance(payload, dict) else None
+    if not isinstance(event, str):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Missing event type")
+
+    event_id = event_id_for(request.headers.get("x-razorpay-event-id"), body_bytes)
+    if not await run_in_threadpool(record_event, event_id, event, body_bytes):
+        return {"status": "duplicate"}
+    inbox_worker.wake()
+    return {"status": "queued"}
@@ -1,12 +1,18 @@
-from fastapi import APIRouter, Depends
-from sqlmodel import Session, select
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, case, or_, tuple_
+from sqlmodel import Session, func, select
+from pydantic import BaseModel, TypeAdapter
 from app.db.database import get_session
-from app.models.models import Seat
+from app.models.models import Booking, BookingDuration, Seat
 from app.core.auth import admin_required
+from app.core.config import settings
+from app.core.availability import AvailabilitySnapshot, active_paid_statement, bump_seat_version, get_snapshot
+from app.core.holds import active_holds_statement
+from app.core.pricing import compute_end_time, normalize_reservation_start
+from app.core.seat_events import SubscriberLimitReached, broadcaster
 from typing import List, Optional
 from datetime import datetime, timezone
-from app.models.models import Booking, BookingStatus
 from app.seed.office import get_office_seats
 
 router = APIRouter(prefix="/seats", tags=["seats"])
@@ -20,43 +26,240 @@ class SeatResponse(BaseModel):
     price: float
     is_available: bool
     locked_until: Optional[datetime] = None
+    held_until: Optional[datetime] = None     # another checkout is paying for this seat
 
 
-def _build_lock_map(session: Session) -> dict[int, datetime]:
-    """Returns {seat_id: end_time} for all currently active paid bookings."""
-    now = datetime.now(timezone.utc)
-    rows = session.exec(
-        select(Booking.seat_id, Booking.end_time).where(
-            Booking.status == BookingStatus.PAID,
-            Booking.end_time.is_not(None),
-            Booking.end_time > now,
+class OccupancyCounts(BaseModel):
+    total: int
+    available: int
+    booked: int
+    held: int
+    admin_locked: int
+    next_free_at: Optional[datetime] = None
+
+
+class SectionOccupancy(OccupancyCounts):
+    section: str
+
+
+class TypeOccupancy(OccupancyCounts):
+    type: str
+
+
+class SeatSummaryResponse(BaseModel):
+    totals: OccupancyCounts
+    sections: List[SectionOccupancy]
+    types: List[TypeOccupancy]
+
+
+_seat_list = TypeAdapter(List[SeatResponse])
+
+
+def _render_all(snapshot: AvailabilitySnapshot) -> bytes:
+    return _seat_list.dump_json([
+        SeatResponse(
+            id=seat.id,
+            code=seat.code,
+            type=seat.type,
+            section=seat.section,
+            price=seat.price,
+            is_available=seat.is_free,
+            locked_until=seat.booked_until,
+            held_until=seat.held_until,
         )
-    ).all()
-    return {seat_id: end_time for seat_id, end_time in rows}
+        for seat in snapshot.seats
+    ])
 
 
-@router.get("/", response_model=List[SeatResponse])
-def get_seats(session: Session = Depends(get_session)):
-    seats = session.exec(select(Seat)).all()
-    lock_map = _build_lock_map(session)
-    return [
+def _render_available(snapshot: AvailabilitySnapshot) -> bytes:
+    return _seat_list.dump_json([
         SeatResponse(
             id=seat.id,
             code=seat.code,
             type=seat.type,
             section=seat.section,
             price=seat.price,
-            is_available=seat.is_available and seat.id not in lock_map,
-            locked_until=lock_map.get(seat.id),
+            is_available=True,
+            locked_until=None,
         )
-        for seat in seats
-    ]
+        for seat in snapshot.seats
+        if seat.is_free
+    ])
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def summary_statement(now: datetime, recurring_busy: List[int]):
+    """
+    Per-section and per-type occupancy in one GROUP BY GROUPING SETS query.
+    Seats in ``recurring_busy`` count as booked (recurring occurrences are not rows).
+    """
+    running = active_paid_statement(now).subquery()
+    active = (
+        select(running.c.seat_id, func.max(running.c.end_time).label("booked_until"))
+        .group_by(running.c.seat_id)
+        .subquery()
+    )
+    holds = active_holds_statement(now).subquery()
+    booked = or_(active.c.booked_until.is_not(None), Seat.id.in_(recurring_busy))
+    held = holds.c.expires_at.is_not(None)
+    locked = and_(Seat.locked_until.is_not(None), Seat.locked_until > now)
+    # GREATEST ignores NULLs: the latest of "booking ends", "hold ends" and "admin lock ends"
+    free_at = func.greatest(active.c.booked_until, holds.c.expires_at, case((locked, Seat.locked_until)))
+
+    return (
+        select(
+            func.grouping(Seat.section).label("by_type"),
+            Seat.section,
+            Seat.type,
+            func.count().label("total"),
+            func.count().filter(Seat.is_available, ~booked, ~held, ~locked).label("available"),
+            func.count().filter(booked).label("booked"),
+            func.count().filter(held, ~booked).label("held"),
+            func.count().filter(locked).label("admin_locked"),
+            func.min(free_at).filter(Seat.is_available).label("next_free_at"),
+        )
+        .select_from(Seat)
+        .outerjoin(active, active.c.seat_id == Seat.id)
+        .outerjoin(holds, holds.c.seat_id == Seat.id)
+        .group_by(func.grouping_sets(tuple_(Seat.section), tuple_(Seat.type)))
+    )
+
+
+def _query_summary(session: Session, snapshot: AvailabilitySnapshot) -> SeatSummaryResponse:
+    now = datetime.now(timezone.utc)
+    # Recurring occurrences are not rows; take the ones running now from the snapshot
+    recurring_busy = [seat.id for seat in snapshot.seats if snapshot.recurring.busy_until(seat.id, now)]
+    rows = session.exec(summary_statement(now, recurring_busy)).all()
+
+    sections: list[SectionOccupancy] = []
+    types: list[TypeOccupancy] = []
+    for by_type, section, seat_type, total, available, booked_count, held_count, admin_locked, next_free_at in rows:
+        counts = dict(
+            total=total, available=available, booked=booked_count, held=held_count,
+            admin_locked=admin_locked, next_free_at=next_free_at,
+        )
+        if by_type:
+            types.append(TypeOccupancy(type=seat_type, **counts))
+        else:
+            sections.append(SectionOccupancy(section=section, **counts))
+    sections.sort(key=lambda row: row.section)
+    types.sort(key=lambda row: row.type)
+
+    next_free = [row.next_free_at for row in types if row.next_free_at]
+    totals = OccupancyCounts(
+        total=sum(row.total for row in types),
+        available=sum(row.available for row in types),
+        booked=sum(row.booked for row in types),
+        held=sum(row.held for row in types),
+        admin_locked=sum(row.admin_locked for row in types),
+        next_free_at=min(next_free) if next_free else None,
+    )
+    return SeatSummaryResponse(totals=totals, sections=sections, types=types)
+
+
+def _snapshot_response(
+    request: Request, body: bytes, etag: str, cache_control: str = "no-cache",
+) -> Response:
+    # no-cache: clients must revalidate, which is a cheap 304 while nothing changed
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("/", response_model=List[SeatResponse])
+def get_seats(request: Request, session: Session = Depends(get_session)):
+    body, etag = get_snapshot(session).render("all", _render_all)
+    return _snapshot_response(request, body, etag)
 
 
 @router.get("/available", response_model=List[SeatResponse])
-def get_available_seats(session: Session = Depends(get_session)):
-    seats = session.exec(select(Seat)).all()
-    lock_map = _build_lock_map(session)
+def get_available_seats(request: Request, session: Session = Depends(get_session)):
+    body, etag = get_snapshot(session).render("available", _render_available)
+    return _snapshot_response(request, body, etag)
+
+@router.get("/summary", response_model=SeatSummaryResponse)
+def get_seat_summary(request: Request, session: Session = Depends(get_session)):
+    """
+    Occupancy counts per section and per seat type. The result is cached for the
+    lifetime of the availability snapshot, so it is recomputed only when a seat
+    actually changes state.
+    """
+    body, etag = get_snapshot(session).render(
+        "summary", lambda snapshot: _query_summary(session, snapshot).model_dump_json().encode()
+    )
+    return _snapshot_response(
+        request, body, etag,
+        cache_control=f"public, max-age={settings.SEAT_SUMMARY_MAX_AGE_SECONDS}",
+    )
+
+
+class _SeatStreamResponse(StreamingResponse):
+    """
+    Streams one subscriber queue and gives its slot back however the response
+    ends, including a client that is gone before the body generator first runs
+    (a generator that never started never reaches its ``finally``).
+    """
+
+    def __init__(self, queue, **kwargs):
+        super().__init__(broadcaster.stream(queue), **kwargs)
+        self._queue = queue
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            broadcaster.unsubscribe(self._queue)
+
+
+@router.get("/stream")
+async def stream_seat_changes():
+    """
+    Server-Sent Events feed of seat changes: ``seats`` events carry
+    ``[{id, available, locked_until, held_until}]`` diffs; ``resync`` means re-fetch ``/seats``.
+    """
+    try:
+        queue = broadcaster.subscribe()
+    except SubscriberLimitReached:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many live connections. Fall back to polling.",
+            headers={"Retry-After": "30"},
+        )
+    return _SeatStreamResponse(
+        queue,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/free", response_model=List[SeatResponse])
+def get_free_seats(
+    start: datetime,
+    end: Optional[datetime] = None,
+    duration_unit: BookingDuration = BookingDuration.HOURLY,
+    duration_quantity: int = Query(default=1, ge=1),
+    session: Session = Depends(get_session),
+):
+    """Seats free for the whole window [start, end). ``end`` defaults to start + duration."""
+    try:
+        start = normalize_reservation_start(start, datetime.now(timezone.utc))
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    if end is None:
+        end = compute_end_time(start, duration_unit, duration_quantity)
+    elif end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    if end <= start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="End time must be after start time")
+
+    snapshot = get_snapshot(session)
     return [
         SeatResponse(
             id=seat.id,
@@ -67,10 +270,14 @@ def get_available_seats(session: Session = Depends(get_session)):
             is_available=True,
             locked_until=None,
         )
-        for seat in seats
-        if seat.is_available and seat.id not in lock_map
+        for seat in snapshot.seats
+        if seat.is_available
+        and seat.held_until is None
+        and not (seat.locked_until and seat.locked_until > start)
+        and not snapshot.overlaps(seat.id, start, end)
     ]
 
+
 @router.post("/initialize-office", dependencies=[Depends(admin_required)])
 def initialize_office(session: Session = Depends(get_session)):
     # Check if already initialized
@@ -82,4 +289,5 @@ def initialize_office(session: Session = Depends(get_session)):
         session.add(seat)
     
     session.commit()
+    bump_seat_version()
     return {"message": f"Initialized {len(all_seats)} seats"}
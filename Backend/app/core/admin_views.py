@@ -0,0 +1,152 @@
+"""
+Read models for the admin listings (users, KYC records, bookings).
+
+Each listing selects only the columns it shows, and derives flags and labels
+in SQL (``kyc_document_data IS NOT NULL``, the ``type: number`` gov-id label).
+The KYC listing also joins the background processing result of each document.
+Each result row maps straight into a ``__slots__`` dataclass. No ORM entity or
+identity-map entry is built per row, and the TEXT document column is never
+read. ``python -m app.db.admin_listing_benchmark`` compares this with loading
+full entities. ``update_user_summary`` applies an admin edit the same way, with one
+``UPDATE ... RETURNING`` of the user listing columns.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Optional
+from uuid import UUID
+
+import sqlalchemy
+from sqlalchemy import String, cast, or_
+from sqlmodel import Session, func, select
+
+from app.models.models import Booking, KycDocumentInfo, Seat, User
+
+
+@dataclass(slots=True)
+class UserListRow:
+    id: str
+    full_name: str
+    email: str
+    role: str
+    is_active: bool
+    created_at: datetime
+
+
+@dataclass(slots=True)
+class KYCListRow:
+    id: str
+    full_name: str
+    email: str
+    mobile: Optional[str]
+    gov_id_type: str
+    gov_id_number: str
+    occupation_sector: Optional[str]
+    occupation_role: Optional[str]
+    kyc_document_name: Optional[str]
+    has_document: bool
+    created_at: datetime
+    processing_status: Optional[str]
+    detected_type: Optional[str]
+    document_size: Optional[int]
+    has_preview: bool
+
+
+@dataclass(slots=True)
+class BookingListRow:
+    id: str
+    user_name: str
+    user_email: str
+    gov_id: str
+    seat_code: str
+    status: str
+    date: datetime
+    duration_unit: str
+    duration_quantity: int
+    amount: float
+    start_time: Optional[datetime]
+    end_time: Optional[datetime]
+
+
+_USER_COLUMNS = (cast(User.id, String), User.full_name, User.email, User.role, User.is_active, User.created_at)
+
+
+def _user_row(user_id: str, full_name: str, email: str, role: Any, is_active: bool, created_at: datetime) -> UserListRow:
+    return UserListRow(user_id, full_name, email, role.value, is_active, created_at)
+
+
+def list_users(session: Session) -> list[UserListRow]:
+    return [_user_row(*row) for row in session.exec(select(*_USER_COLUMNS)).all()]
+
+
+def update_user_summary(session: Session, user_id: UUID, values: dict[str, Any]) -> Optional[UserListRow]:
+    """Apply ``values`` to one user and return its listing row, or None if there is no such user."""
+    if values:
+        statement = (
+            sqlalchemy.update(User)
+            .where(User.id == user_id)
+            .values(**values)
+            .returning(*_USER_COLUMNS)
+            .execution_options(synchronize_session=False)
+        )
+    else:
+        statement = select(*_USER_COLUMNS).where(User.id == user_id)
+    row = session.execute(statement).first()
+    return _user_row(*row) if row is not None else None
+
+
+def list_kyc(session: Session) -> list[KYCListRow]:
+    has_document = or_(User.kyc_document_key.is_not(None), User.kyc_document_data.is_not(None))
+    rows = session.exec(
+        select(
+            cast(User.id, String),
+            User.full_name,
+            User.email,
+            User.mobile,
+            User.gov_id_type,
+            User.gov_id_number,
+            User.occupation_sector,
+            User.occupation_role,
+            User.kyc_document_name,
+            has_document,
+            User.created_at,
+            KycDocumentInfo.status,
+            KycDocumentInfo.detected_type,
+            User.kyc_document_size,
+            KycDocumentInfo.preview_key.is_not(None),
+        )
+        .outerjoin(KycDocumentInfo, KycDocumentInfo.key == User.kyc_document_key)
+    ).all()
+    return [KYCListRow(*row) for row in rows]
+
+
+def list_bookings(session: Session) -> list[BookingListRow]:
+    rows = session.exec(
+        select(
+            cast(Booking.id, String),
+            User.full_name,
+            User.email,
+            func.concat(User.gov_id_type, ": ", User.gov_id_number),
+            Seat.code,
+            Booking.status,
+            Booking.booking_date,
+            Booking.duration_unit,
+            Booking.duration_quantity,
+            Booking.price_amount,
+            Booking.start_time,
+            Booking.end_time,
+        )
+        .join(User, User.id == Booking.user_id)
+        .join(Seat, Seat.id == Booking.seat_id)
+    ).all()
+    return [
+        BookingListRow(
+            booking_id, user_name, user_email, gov_id, seat_code, status.value, booking_date,
+            duration_unit.value, duration_quantity, amount, start_time, end_time,
+        )
+        for (
+            booking_id, user_name, user_email, gov_id, seat_code, status, booking_date,
+            duration_unit, duration_quantity, amount, start_time, end_time,
+        ) in rows
+    ]
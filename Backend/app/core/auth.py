@@ -1,25 +1,20 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import datetime, timezone, timedelta
 from typing import Optional, Union, Any
+from uuid import UUID
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlmodel import Session, select
 from app.core.config import settings
 from app.db.database import get_session
-from app.models.models import User
+from app.models.models import User, UserRole
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-# Use PBKDF2 to avoid runtime incompatibilities between passlib and bcrypt v5.
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
-
 def create_access_token(subject: Union[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
@@ -30,7 +25,65 @@ def create_access_token(subject: Union[str, Any], expires_delta: Optional[timede
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)) -> User:
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """The authenticated caller: only what authorisation needs, never KYC data or the password hash."""
+    id: UUID
+    email: str
+    full_name: str
+    role: UserRole
+    is_active: bool
+
+
+class PrincipalCache:
+    """
+    Bounded TTL cache of principals keyed by token subject. Entries are dropped
+    when an admin changes the user; other workers pick the change up within
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self._max_size = max_size
+        self._ttl = ttl_seconds
+        self._items: OrderedDict[str, tuple[float, Principal]] = OrderedDict()
+        self._lock = threading.Lock()   # get_current_user runs in the threadpool
+
+    def get(self, subject: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._items.get(subject)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at <= time.monotonic():
+                del self._items[subject]
+                return None
+            self._items.move_to_end(subject)
+            return principal
+
+    def put(self, subject: str, principal: Principal) -> None:
+        if self._ttl <= 0 or self._max_size <= 0:
+            return
+        with self._lock:
+            self._items[subject] = (time.monotonic() + self._ttl, principal)
+            self._items.move_to_end(subject)
+            while len(self._items) > self._max_size:
+                self._items.popitem(last=False)
+
+    def invalidate(self, subject: str) -> None:
+        with self._lock:
+            self._items.pop(subject, None)
+
+
+principal_cache = PrincipalCache(settings.AUTH_PRINCIPAL_CACHE_SIZE, settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS)
+
+
+def load_principal(session: Session, email: str) -> Optional[Principal]:
+    row = session.exec(
+        select(User.id, User.email, User.full_name, User.role, User.is_active).where(User.email == email)
+    ).first()
+    return Principal(*row) if row else None
+
+def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -44,12 +97,17 @@ def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Dep
     except JWTError:
         raise credentials_exception
     
-    user = session.exec(select(User).where(User.email == email)).first()
-    if user is None:
-        raise credentials_exception
-    return user
+    principal = principal_cache.get(email)
+    if principal is None:
+        principal = load_principal(session, email)
+        if principal is None:
+            raise credentials_exception
+        principal_cache.put(email, principal)
+    if not principal.is_active:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User account is inactive")
+    return principal
 
-def admin_required(current_user: User = Depends(get_current_user)):
+def admin_required(current_user: Principal = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     return current_user
@@ -0,0 +1,244 @@
+"""
+Process-wide seat availability snapshot.
+
+The floor plan only changes when a payment is confirmed, a checkout takes a
+seat hold, an admin edits or locks a seat, or a booking / hold / manual lock
+starts or runs out.  Writers call ``bump_seat_version()`` after committing;
+readers share one cached snapshot that is rebuilt when the version moves,
+when the earliest lock inside it expires, or after
+SEAT_SNAPSHOT_MAX_AGE_SECONDS (so that other worker processes converge on
+changes they did not make themselves).
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, Optional, Sequence
+
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.core.holds import active_holds_statement
+from app.core.intervals import SeatIntervalIndex
+from app.core.recurrence import RecurringIndex, load_recurring_index, recurring_conflicts
+from app.models.models import Booking, BookingStatus, Seat
+
+
+@dataclass(frozen=True)
+class SeatState:
+    id: int
+    code: str
+    type: str
+    section: str
+    price: float
+    is_available: bool                      # admin on/off switch on the seat row
+    booked_until: Optional[datetime]        # end of the active paid booking, if any
+    locked_until: Optional[datetime]        # admin manual lock, only while in force
+    held_until: Optional[datetime] = None   # open checkout hold, only while in force
+
+    @property
+    def is_free(self) -> bool:
+        """
+        Bookable right now: switched on, not booked, not admin-locked and not held
+        by a checkout. ``/seats``, ``/seats/available``, the seat stream and the
+        ``available`` count of ``/seats/summary`` all use this definition.
+        """
+        return (
+            self.is_available
+            and self.booked_until is None
+            and self.locked_until is None
+            and self.held_until is None
+        )
+
+
+@dataclass
+class AvailabilitySnapshot:
+    version: int
+    built_at: datetime
+    expires_at: datetime
+    seats: tuple[SeatState, ...]
+    intervals: SeatIntervalIndex
+    recurring: RecurringIndex = field(default_factory=RecurringIndex)
+    _rendered: dict[str, tuple[bytes, str]] = field(default_factory=dict, repr=False)
+
+    def is_fresh(self, version: int, now: datetime) -> bool:
+        return self.version == version and now < self.expires_at
+
+    def overlaps(self, seat_id: int, start: datetime, end: datetime) -> bool:
+        """True if a paid booking or a paid recurring occurrence on the seat intersects [start, end)."""
+        return self.intervals.overlaps(seat_id, start, end) or self.recurring.overlaps(seat_id, start, end)
+
+    def render(self, key: str, render: Callable[["AvailabilitySnapshot"], bytes]) -> tuple[bytes, str]:
+        """Return ``(body, strong_etag)`` for a view of this snapshot, rendering it once."""
+        cached = self._rendered.get(key)
+        if cached is None:
+            body = render(self)
+            cached = (body, f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+            self._rendered[key] = cached
+        return cached
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+_version_lock = threading.Lock()
+_build_lock = threading.Lock()
+_version = 0
+_snapshot: AvailabilitySnapshot | None = None
+
+
+_listeners: list[Callable[[int], None]] = []
+
+
+def add_version_listener(listener: Callable[[int], None]) -> None:
+    """Register a callback run (in the caller's thread) after every version bump."""
+    _listeners.append(listener)
+
+
+def remove_version_listener(listener: Callable[[int], None]) -> None:
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def bump_seat_version() -> int:
+    """Invalidate the snapshot. Call after committing any change to seat availability."""
+    global _version
+    with _version_lock:
+        _version += 1
+        version = _version
+    for listener in tuple(_listeners):
+        listener(version)
+    return version
+
+
+def get_seat_version() -> int:
+    return _version
+
+
+def paid_windows_statement(now: datetime):
+    """Every paid booking window that has not ended yet, including future reservations."""
+    return select(Booking.seat_id, Booking.start_time, Booking.end_time).where(
+        Booking.status == BookingStatus.PAID,
+        Booking.end_time.is_not(None),
+        Booking.end_time > now,
+    )
+
+
+def active_paid_statement(now: datetime):
+    """Paid bookings running at ``now`` (ix_booking_paid_end_time): the seats that are taken right now."""
+    return select(Booking.seat_id, Booking.end_time).where(
+        Booking.status == BookingStatus.PAID,
+        Booking.end_time.is_not(None),
+        Booking.end_time > now,
+        Booking.start_time <= now,
+    )
+
+
+def _load_intervals(session: Session, now: datetime) -> SeatIntervalIndex:
+    rows = session.exec(paid_windows_statement(now)).all()
+    return SeatIntervalIndex(
+        (seat_id, start_time or _EPOCH, end_time) for seat_id, start_time, end_time in rows
+    )
+
+
+def _build_snapshot(session: Session, version: int, now: datetime) -> AvailabilitySnapshot:
+    seat_rows = session.exec(
+        select(
+            Seat.id, Seat.code, Seat.type, Seat.section, Seat.price, Seat.is_available, Seat.locked_until,
+        ).order_by(Seat.id)
+    ).all()
+    intervals = _load_intervals(session, now)
+    recurring = load_recurring_index(session, now)
+    holds = dict(session.exec(active_holds_statement(now)).all())
+
+    expires_at = now + timedelta(seconds=settings.SEAT_SNAPSHOT_MAX_AGE_SECONDS)
+    seats: list[SeatState] = []
+    for seat_id, code, seat_type, section, price, is_available, locked_until in seat_rows:
+        busy = [end for end in (intervals.busy_until(seat_id, now), recurring.busy_until(seat_id, now)) if end]
+        booked_until = max(busy) if busy else None
+        if locked_until is not None and locked_until <= now:
+            locked_until = None
+        held_until = holds.get(seat_id)
+        # The snapshot goes stale at the next moment any seat changes state on its own
+        boundaries = (
+            booked_until, locked_until, held_until,
+            intervals.next_start(seat_id, now), recurring.next_start(seat_id, now),
+        )
+        for boundary in boundaries:
+            if boundary is not None and boundary < expires_at:
+                expires_at = boundary
+        seats.append(SeatState(
+            id=seat_id,
+            code=code,
+            type=seat_type,
+            section=section,
+            price=price,
+            is_available=is_available,
+            booked_until=booked_until,
+            locked_until=locked_until,
+            held_until=held_until,
+        ))
+
+    return AvailabilitySnapshot(
+        version=version, built_at=now, expires_at=expires_at, seats=tuple(seats),
+        intervals=intervals, recurring=recurring,
+    )
+
+
+def get_snapshot(session: Session) -> AvailabilitySnapshot:
+    """Return the current snapshot, rebuilding it (once, under a lock) if it is stale."""
+    global _snapshot
+    now = datetime.now(timezone.utc)
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.is_fresh(_version, now):
+        return snapshot
+
+    with _build_lock:
+        version = _version
+        snapshot = _snapshot
+        if snapshot is not None and snapshot.is_fresh(version, now):
+            return snapshot
+        snapshot = _build_snapshot(session, version, now)
+        _snapshot = snapshot
+        return snapshot
+
+
+def paid_conflicts_statement(windows: Sequence[tuple[int, datetime, datetime]], exclude_booking_ids: Iterable = ()):
+    """
+    Paid booking windows on the seats of ``(seat_id, start, end)`` windows that
+    reach into the span of all of them (ix_booking_paid_seat_end_time).
+    """
+    stmt = select(Booking.seat_id, Booking.start_time, Booking.end_time).where(
+        Booking.seat_id.in_({seat_id for seat_id, _, _ in windows}),
+        Booking.status == BookingStatus.PAID,
+        Booking.end_time.is_not(None),
+        Booking.end_time > min(start for _, start, _ in windows),
+        Booking.start_time < max(end for _, _, end in windows),
+    )
+    exclude = list(exclude_booking_ids)
+    if exclude:
+        stmt = stmt.where(Booking.id.not_in(exclude))
+    return stmt
+
+
+def paid_conflicts(
+    session: Session, windows: Sequence[tuple[int, datetime, datetime]], exclude_booking_ids: Iterable = (),
+) -> set[int]:
+    """Seats with a paid booking (other than ``exclude_booking_ids``) overlapping their window; one query."""
+    if not windows:
+        return set()
+    rows = session.exec(paid_conflicts_statement(windows, exclude_booking_ids)).all()
+    index = SeatIntervalIndex((seat_id, start or _EPOCH, end) for seat_id, start, end in rows)
+    return {seat_id for seat_id, start, end in windows if index.overlaps(seat_id, start, end)}
+
+
+def find_conflicts(session: Session, seat_ids: Iterable[int], start: datetime, end: datetime) -> set[int]:
+    """
+    Seat ids among ``seat_ids`` with a paid booking or recurring occurrence
+    overlapping [start, end). Asked of the database, not the snapshot: a seat
+    paid on another worker process only shows up in this process's snapshot
+    after SEAT_SNAPSHOT_MAX_AGE_SECONDS, too late to refuse the hold and order.
+    """
+    windows = [(seat_id, start, end) for seat_id in seat_ids]
+    return paid_conflicts(session, windows) | recurring_conflicts(session, windows)
@@ -0,0 +1,50 @@
+"""
+Periodic maintenance jobs run by the API process itself.
+
+Each job runs on a fixed interval: plain synchronous functions in the
+threadpool, coroutine functions (jobs that await the payment gateway) directly
+on the event loop. Jobs are started and stopped from the ``lifespan`` in
+``main.py``; one failing run is logged and the job carries on with the next tick.
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+from typing import Callable
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    def __init__(self, name: str, interval_seconds: float, job: Callable[[], object]):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self._job = job
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self.interval_seconds > 0:
+            self._task = asyncio.create_task(self._run(), name=self.name)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if inspect.iscoroutinefunction(self._job):
+                    await self._job()
+                else:
+                    await run_in_threadpool(self._job)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Periodic task %s failed: %s", self.name, exc)
+            await asyncio.sleep(self.interval_seconds)
@@ -0,0 +1,131 @@
+"""
+Blob storage for uploaded files (KYC documents), outside the database.
+
+Blobs are content-addressed: the key is the SHA-256 of the bytes, computed
+while they are written, so identical uploads share one blob and a key doubles
+as a strong ETag. ``BlobStore`` is the interface; ``LocalBlobStore`` keeps blobs
+on a filesystem path (a mounted volume in production). Another backend only
+has to implement ``write``, ``open`` and ``size``; ``KYC_BLOB_BACKEND`` picks
+the one ``blob_store`` uses.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import tempfile
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Iterable, Optional
+
+from app.core.config import settings
+
+CHUNK_SIZE = 64 * 1024
+
+_KEY_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class BlobNotFound(Exception):
+    pass
+
+
+class BlobTooLarge(Exception):
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Blob exceeds {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+@dataclass(frozen=True)
+class StoredBlob:
+    key: str          # sha256 hex of the content
+    size: int
+
+
+class BlobStore(ABC):
+    @abstractmethod
+    def write(self, chunks: Iterable[bytes], max_bytes: Optional[int] = None) -> StoredBlob:
+        """Store the concatenated chunks; raises ``BlobTooLarge`` past ``max_bytes``."""
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        """Seekable binary file for the blob; raises ``BlobNotFound``."""
+
+    @abstractmethod
+    def size(self, key: str) -> int:
+        """Byte length of the blob; raises ``BlobNotFound``."""
+
+
+class LocalBlobStore(BlobStore):
+    """Blobs under ``root/<k[:2]>/<k[2:4]>/<key>``, written via a temp file and an atomic rename."""
+
+    def __init__(self, root: str | os.PathLike):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        if not _KEY_RE.match(key):
+            raise BlobNotFound(key)
+        return self.root / key[:2] / key[2:4] / key
+
+    def write(self, chunks: Iterable[bytes], max_bytes: Optional[int] = None) -> StoredBlob:
+        self.root.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=self.root, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for chunk in chunks:
+                    size += len(chunk)
+                    if max_bytes is not None and size > max_bytes:
+                        raise BlobTooLarge(max_bytes)
+                    digest.update(chunk)
+                    out.write(chunk)
+                out.flush()
+                os.fsync(out.fileno())
+            key = digest.hexdigest()
+            path = self._path(key)
+            if path.exists():
+                os.unlink(temp_path)        # same content is already stored
+            else:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(temp_path, path)
+            return StoredBlob(key=key, size=size)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+    def open(self, key: str) -> BinaryIO:
+        try:
+            return open(self._path(key), "rb")
+        except FileNotFoundError:
+            raise BlobNotFound(key)
+
+    def size(self, key: str) -> int:
+        try:
+            return self._path(key).stat().st_size
+        except FileNotFoundError:
+            raise BlobNotFound(key)
+
+
+def read_chunks(handle: BinaryIO, start: int = 0, length: Optional[int] = None, chunk_size: int = CHUNK_SIZE):
+    """Yield ``length`` bytes (or the rest) from ``start``, closing ``handle`` at the end."""
+    with handle:
+        handle.seek(start)
+        remaining = length
+        while remaining is None or remaining > 0:
+            data = handle.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not data:
+                break
+            if remaining is not None:
+                remaining -= len(data)
+            yield data
+
+
+def _create_store() -> BlobStore:
+    if settings.KYC_BLOB_BACKEND == "local":
+        return LocalBlobStore(settings.KYC_BLOB_PATH)
+    raise ValueError(f"Unknown KYC_BLOB_BACKEND {settings.KYC_BLOB_BACKEND!r}")
+
+
+blob_store = _create_store()
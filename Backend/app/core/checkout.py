@@ -0,0 +1,193 @@
+"""
+Set-based creation of the PENDING bookings behind a checkout.
+
+One desk or five hundred, opening a checkout costs the same handful of
+statements: one SELECT for the seats, one indexed overlap query each for paid
+bookings and paid recurring rules, one hold upsert, one multi-row ``INSERT ... RETURNING``
+for the bookings and, once the gateway order exists, one UPDATE to attach its
+id. Used by ``/payment/create-order-batch``, ``/payment/create-order-bulk`` and the admin
+manual booking flow, through ``begin_checkout`` / ``finish_checkout`` /
+``release_checkout``, which commit around the gateway call.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+from uuid import UUID, uuid4
+
+import sqlalchemy
+from sqlmodel import Session, select
+
+from app.core.availability import bump_seat_version, find_conflicts
+from app.core.config import settings
+from app.core.holds import acquire_holds, release_holds
+from app.core.pricing import compute_amount, normalize_reservation_start, resolve_booking_window
+from app.models.models import Booking, BookingDuration, BookingStatus, RazorpayPaymentStatus, Seat
+
+
+class CheckoutError(Exception):
+    """The checkout cannot be opened; ``status_code`` is the HTTP status to answer with."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+@dataclass
+class PendingCheckout:
+    booking_ids: list[str]
+    seats: list[Seat]                  # in request order, one per booking
+    amounts: list[float]               # INR per booking, same order
+    total_amount: float
+    start_time: Optional[datetime]     # requested start; None = starts when paid
+    end_time: Optional[datetime]
+
+
+def open_checkout(
+    session: Session,
+    user_id: UUID,
+    seat_ids: Iterable[int],
+    duration_unit: BookingDuration,
+    duration_quantity: int,
+    start_time: Optional[datetime] = None,
+    total_override: Optional[float] = None,
+    now: Optional[datetime] = None,
+) -> PendingCheckout:
+    """
+    Validate the seats, hold them for ``user_id`` and insert one PENDING booking
+    per seat inside the caller's transaction. ``total_override`` (admin custom
+    pricing) is split evenly across the seats. Raises ``CheckoutError`` after
+    rolling back if anything is missing, taken or held by another checkout.
+    """
+    now = now or datetime.now(timezone.utc)
+    wanted = list(dict.fromkeys(seat_ids))
+    if duration_quantity < 1:
+        raise CheckoutError(400, "Duration quantity must be at least 1")
+    if not wanted:
+        raise CheckoutError(400, "At least one seat is required")
+    if len(wanted) > settings.BULK_BOOKING_MAX_SEATS:
+        raise CheckoutError(400, f"At most {settings.BULK_BOOKING_MAX_SEATS} seats can be booked at once")
+
+    seat_map = {seat.id: seat for seat in session.exec(select(Seat).where(Seat.id.in_(wanted))).all()}
+    if len(seat_map) != len(wanted):
+        raise CheckoutError(404, "Some seats were not found")
+
+    try:
+        requested_start = normalize_reservation_start(start_time, now)
+    except ValueError as exc:
+        raise CheckoutError(400, str(exc))
+    start, end = resolve_booking_window(requested_start, duration_unit, duration_quantity, now)
+
+    conflicts = find_conflicts(session, wanted, start, end)
+    unavailable = sorted(
+        seat.code for seat in seat_map.values()
+        if not seat.is_available
+        or seat.id in conflicts
+        or (seat.locked_until and seat.locked_until > start)
+    )
+    if unavailable:
+        raise CheckoutError(409, f"Seat {', '.join(unavailable)} is not available")
+
+    held = acquire_holds(session, wanted, user_id, now)
+    if held:
+        session.rollback()
+        codes = ", ".join(sorted(seat_map[seat_id].code for seat_id in held))
+        raise CheckoutError(409, f"Seat {codes} is being booked by someone else. Try again in a few minutes.")
+
+    seats = [seat_map[seat_id] for seat_id in wanted]
+    if total_override and total_override > 0:
+        per_seat = round(total_override / len(seats), 2)
+        amounts = [per_seat] * len(seats)
+        total_amount = total_override
+    else:
+        rates: dict[str, float] = {}
+        for seat in seats:
+            if seat.type not in rates:
+                rates[seat.type] = compute_amount(seat.type, duration_unit, duration_quantity)
+        amounts = [rates[seat.type] for seat in seats]
+        total_amount = sum(amounts)
+
+    rows = [
+        {
+            "id": uuid4(),
+            "user_id": user_id,
+            "seat_id": seat.id,
+            "booking_date": now,
+            "created_at": now,
+            "status": BookingStatus.PENDING,
+            "duration_unit": duration_unit,
+            "duration_quantity": duration_quantity,
+            "price_amount": amount,
+            "start_time": requested_start,
+            "end_time": end if requested_start else None,
+            "payment_status": RazorpayPaymentStatus.PENDING.value,
+            "razorpay_order_id": None,
+            "razorpay_payment_id": None,
+            "order_created_at": None,
+            "occupancy_recorded": False,
+            "reconciled_at": None,
+        }
+        for seat, amount in zip(seats, amounts)
+    ]
+    table = Booking.__table__
+    inserted = session.execute(
+        sqlalchemy.insert(table).values(rows).returning(table.c.id, table.c.seat_id)
+    ).all()
+    booking_by_seat = {seat_id: str(booking_id) for booking_id, seat_id in inserted}
+
+    return PendingCheckout(
+        booking_ids=[booking_by_seat[seat.id] for seat in seats],
+        seats=seats,
+        amounts=amounts,
+        total_amount=total_amount,
+        start_time=requested_start,
+        end_time=end if requested_start else None,
+    )
+
+
+def attach_order(session: Session, booking_ids: Iterable[str], order_id: str) -> None:
+    """Stamp the gateway order on every booking of a checkout with a single UPDATE."""
+    session.execute(
+        sqlalchemy.update(Booking)
+        .where(Booking.id.in_(list(booking_ids)))
+        .values(
+            razorpay_order_id=order_id,
+            payment_status=RazorpayPaymentStatus.PENDING.value,
+            order_created_at=datetime.now(timezone.utc),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def begin_checkout(
+    session: Session,
+    user_id: UUID,
+    seat_ids: Iterable[int],
+    duration_unit: BookingDuration,
+    duration_quantity: int,
+    start_time: Optional[datetime] = None,
+    total_override: Optional[float] = None,
+) -> PendingCheckout:
+    """``open_checkout`` and commit, before the gateway order is created. Raises ``CheckoutError``."""
+    checkout = open_checkout(
+        session, user_id, seat_ids, duration_unit, duration_quantity,
+        start_time=start_time, total_override=total_override,
+    )
+    session.commit()
+    bump_seat_version()
+    return checkout
+
+
+def finish_checkout(session: Session, booking_ids: Iterable[str], order_id: str) -> None:
+    """Attach the gateway order to the checkout's bookings and commit."""
+    attach_order(session, booking_ids, order_id)
+    session.commit()
+
+
+def release_checkout(session: Session, seat_ids: Iterable[int], user_id: UUID) -> None:
+    """The gateway order could not be created: give the seats back straight away."""
+    release_holds(session, seat_ids, user_id)
+    session.commit()
+    bump_seat_version()
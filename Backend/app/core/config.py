@@ -67,11 +67,121 @@ class Settings:
     RAZORPAY_KEY_ID: str | None = os.getenv("RAZORPAY_KEY_ID")
     RAZORPAY_KEY_SECRET: str | None = os.getenv("RAZORPAY_KEY_SECRET")
     RAZORPAY_WEBHOOK_SECRET: str | None = os.getenv("RAZORPAY_WEBHOOK_SECRET")
+    # Override to point at a local stub server in development / load tests
+    RAZORPAY_API_BASE_URL: str = os.getenv("RAZORPAY_API_BASE_URL", "https://api.razorpay.com/v1")
+    RAZORPAY_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("RAZORPAY_CONNECT_TIMEOUT_SECONDS", 3))
+    RAZORPAY_READ_TIMEOUT_SECONDS: float = float(os.getenv("RAZORPAY_READ_TIMEOUT_SECONDS", 10))
+    RAZORPAY_MAX_CONNECTIONS: int = int(os.getenv("RAZORPAY_MAX_CONNECTIONS", 20))
+
+    # Seat availability snapshot — upper bound on staleness across worker processes
+    SEAT_SNAPSHOT_MAX_AGE_SECONDS: int = int(os.getenv("SEAT_SNAPSHOT_MAX_AGE_SECONDS", 30))
+    # Browser/CDN max-age for GET /seats/summary
+    SEAT_SUMMARY_MAX_AGE_SECONDS: int = int(os.getenv("SEAT_SUMMARY_MAX_AGE_SECONDS", 10))
+
+    # GET /seats/stream (Server-Sent Events)
+    SEAT_STREAM_MAX_SUBSCRIBERS: int = int(os.getenv("SEAT_STREAM_MAX_SUBSCRIBERS", 5000))
+    SEAT_STREAM_QUEUE_SIZE: int = int(os.getenv("SEAT_STREAM_QUEUE_SIZE", 16))
+    SEAT_STREAM_HEARTBEAT_SECONDS: int = int(os.getenv("SEAT_STREAM_HEARTBEAT_SECONDS", 15))
+    SEAT_STREAM_RETRY_MS: int = int(os.getenv("SEAT_STREAM_RETRY_MS", 3000))
+
+    # Analytics — hour / day buckets are cut in this timezone
+    ANALYTICS_TIMEZONE: str = os.getenv("ANALYTICS_TIMEZONE", "Asia/Kolkata")
+
+    # Office wall clock: recurring booking times ("every Mon 09:00-13:00") are local to it
+    OFFICE_TIMEZONE: str = os.getenv("OFFICE_TIMEZONE", "Asia/Kolkata")
+
+    # Future-dated reservations
+    RESERVATION_MAX_ADVANCE_DAYS: int = int(os.getenv("RESERVATION_MAX_ADVANCE_DAYS", 180))
+
+    # Largest checkout (create-order-batch / create-order-bulk / admin manual booking)
+    BULK_BOOKING_MAX_SEATS: int = int(os.getenv("BULK_BOOKING_MAX_SEATS", 500))
+
+    # Checkout seat holds: how long an open Razorpay order keeps its seats
+    SEAT_HOLD_TTL_SECONDS: int = int(os.getenv("SEAT_HOLD_TTL_SECONDS", 600))
+
+    # Abandoned-checkout reaper (PENDING bookings older than the TTL are cancelled)
+    PENDING_BOOKING_TTL_MINUTES: int = int(os.getenv("PENDING_BOOKING_TTL_MINUTES", 30))
+    PENDING_REAPER_INTERVAL_SECONDS: int = int(os.getenv("PENDING_REAPER_INTERVAL_SECONDS", 60))
+    PENDING_REAPER_CHUNK_SIZE: int = int(os.getenv("PENDING_REAPER_CHUNK_SIZE", 500))
+    PENDING_REAPER_MAX_CHUNKS: int = int(os.getenv("PENDING_REAPER_MAX_CHUNKS", 20))
+
+    # Idempotency-Key replay for booking / order creation
+    IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 86400))
+    IDEMPOTENCY_CACHE_SIZE: int = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", 2048))
+    # How long a duplicate waits for the in-flight original before answering 409
+    IDEMPOTENCY_WAIT_SECONDS: int = int(os.getenv("IDEMPOTENCY_WAIT_SECONDS", 30))
+    # An unfinished claim older than this is treated as abandoned by a crashed worker
+    IDEMPOTENCY_LOCK_TIMEOUT_SECONDS: int = int(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT_SECONDS", 120))
+    IDEMPOTENCY_PURGE_INTERVAL_SECONDS: int = int(os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", 600))
+
+    # Password hashing (pbkdf2_sha256) runs in its own process pool, off the request threadpool
+    PASSWORD_HASH_ROUNDS: int = int(os.getenv("PASSWORD_HASH_ROUNDS", 29000))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    # Hash / verify jobs admitted at once; callers waiting longer than the timeout get a 503
+    PASSWORD_HASH_MAX_CONCURRENCY: int = int(os.getenv("PASSWORD_HASH_MAX_CONCURRENCY", 8))
+    PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS", 5))
+
+    # Authenticated principal cache (get_current_user); admin edits invalidate the local entry
+    AUTH_PRINCIPAL_CACHE_SIZE: int = int(os.getenv("AUTH_PRINCIPAL_CACHE_SIZE", 10000))
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS: int = int(os.getenv("AUTH_PRINCIPAL_CACHE_TTL_SECONDS", 60))
+
+    # Rotating refresh tokens: a password login is good for this long, refreshes keep the original expiry
+    REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 7))
+
+    # Razorpay webhook inbox: events are stored on receipt and applied by a background worker
+    WEBHOOK_BATCH_SIZE: int = int(os.getenv("WEBHOOK_BATCH_SIZE", 100))
+    # Fallback poll for events written by other workers (local deliveries wake the worker at once)
+    WEBHOOK_POLL_INTERVAL_SECONDS: float = float(os.getenv("WEBHOOK_POLL_INTERVAL_SECONDS", 2))
+    # An event that fails this many times is left in the inbox for manual inspection
+    WEBHOOK_MAX_ATTEMPTS: int = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", 5))
+    WEBHOOK_RETENTION_DAYS: int = int(os.getenv("WEBHOOK_RETENTION_DAYS", 30))
+
+    # Payment reconciliation: ask Razorpay about PENDING orders the browser / webhook never settled
+    RECONCILE_INTERVAL_SECONDS: int = int(os.getenv("RECONCILE_INTERVAL_SECONDS", 120))
+    # Orders younger than this are left to the normal verify / webhook flow
+    RECONCILE_MIN_AGE_MINUTES: int = int(os.getenv("RECONCILE_MIN_AGE_MINUTES", 3))
+    RECONCILE_RECHECK_MINUTES: int = int(os.getenv("RECONCILE_RECHECK_MINUTES", 5))
+    # Orders the reaper cancelled are still checked once, if opened within this window
+    RECONCILE_CANCELLED_LOOKBACK_HOURS: int = int(os.getenv("RECONCILE_CANCELLED_LOOKBACK_HOURS", 24))
+    RECONCILE_BATCH_SIZE: int = int(os.getenv("RECONCILE_BATCH_SIZE", 200))
+    # Gateway calls in flight at once, and calls started per second
+    RECONCILE_CONCURRENCY: int = int(os.getenv("RECONCILE_CONCURRENCY", 4))
+    RECONCILE_RATE_PER_SECOND: float = float(os.getenv("RECONCILE_RATE_PER_SECOND", 5))
+
+    # Rate limiting (token buckets): sign-in routes per client IP, order creation per user and per IP.
+    # "memory" keeps buckets per worker; "postgres" shares them across workers at one query per check.
+    RATE_LIMIT_ENABLED: bool = _get_bool_env("RATE_LIMIT_ENABLED", default=True)
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory").strip().lower()
+    # Behind a proxy (Render / Railway) the client is the last X-Forwarded-For entry
+    RATE_LIMIT_TRUST_FORWARDED_FOR: bool = _get_bool_env("RATE_LIMIT_TRUST_FORWARDED_FOR", default=False)
+    RATE_LIMIT_AUTH_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_AUTH_PER_MINUTE", 10))
+    RATE_LIMIT_AUTH_BURST: int = int(os.getenv("RATE_LIMIT_AUTH_BURST", 20))
+    RATE_LIMIT_ORDER_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_ORDER_PER_MINUTE", 6))
+    RATE_LIMIT_ORDER_BURST: int = int(os.getenv("RATE_LIMIT_ORDER_BURST", 10))
+    # Per IP on top of the per-user limit; generous because a whole office can share one address
+    RATE_LIMIT_ORDER_IP_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_ORDER_IP_PER_MINUTE", 120))
+    RATE_LIMIT_ORDER_IP_BURST: int = int(os.getenv("RATE_LIMIT_ORDER_IP_BURST", 120))
+    RATE_LIMIT_SWEEP_INTERVAL_SECONDS: int = int(os.getenv("RATE_LIMIT_SWEEP_INTERVAL_SECONDS", 60))
+
+    # KYC documents live in a blob store, not the user row. KYC_BLOB_PATH must survive restarts
+    # (a mounted volume in production).
+    KYC_BLOB_BACKEND: str = os.getenv("KYC_BLOB_BACKEND", "local").strip().lower()
+    KYC_BLOB_PATH: str = os.getenv("KYC_BLOB_PATH", "./data/kyc")
+    KYC_DOCUMENT_MAX_BYTES: int = int(os.getenv("KYC_DOCUMENT_MAX_BYTES", 2 * 1024 * 1024))
+
+    # KYC processing (type sniffing, previews) runs after registration in its own thread pool
+    KYC_PROCESSING_WORKERS: int = int(os.getenv("KYC_PROCESSING_WORKERS", 2))
+    KYC_PROCESSING_POLL_INTERVAL_SECONDS: float = float(os.getenv("KYC_PROCESSING_POLL_INTERVAL_SECONDS", 5))
+    KYC_PROCESSING_MAX_ATTEMPTS: int = int(os.getenv("KYC_PROCESSING_MAX_ATTEMPTS", 3))
+    KYC_PREVIEW_MAX_PIXELS: int = int(os.getenv("KYC_PREVIEW_MAX_PIXELS", 320))   # longest edge
 
     def validate(self) -> None:
         if not self.DATABASE_URL:
             raise ValueError("DATABASE_URL is required.")
 
+        if self.RATE_LIMIT_BACKEND not in {"memory", "postgres"}:
+            raise ValueError("RATE_LIMIT_BACKEND must be 'memory' or 'postgres'.")
+
         insecure_secret_keys = {"", "default_secret", "your_super_secret_key_here"}
         if self.ENVIRONMENT == "production":
             if self.SECRET_KEY in insecure_secret_keys or len(self.SECRET_KEY) < 32:
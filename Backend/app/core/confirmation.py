@@ -0,0 +1,229 @@
+"""
+Turning a paid Razorpay order into PAID bookings.
+
+Shared by ``POST /payment/verify`` (the browser came back with a signed
+payment) and the webhook inbox worker (Razorpay told us directly). Every
+function works inside the caller's transaction and never commits.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional, Sequence
+from uuid import UUID, uuid4
+
+import sqlalchemy
+from sqlmodel import Session, select
+
+from app.core.availability import paid_conflicts
+from app.core.holds import release_holds
+from app.core.occupancy import record_occupancy
+from app.core.pricing import compute_amount, resolve_booking_window
+from app.core.recurrence import recurring_conflicts, rule_conflicts_in_db
+from app.core.revenue import record_revenue
+from app.models.models import (
+    Booking,
+    BookingDuration,
+    BookingStatus,
+    Payment,
+    PaymentStatus,
+    RazorpayPaymentStatus,
+    RecurringBooking,
+    Seat,
+)
+
+class SeatConflictError(Exception):
+    """A seat in the order already has an overlapping paid booking."""
+
+
+def lock_seats(session: Session, seat_ids: set[int]) -> dict[int, Seat]:
+    """
+    Row-lock the seats in id order, so concurrent checkouts cannot deadlock and
+    confirmations for the same seat run one after another.
+    """
+    seats = session.exec(
+        select(Seat).where(Seat.id.in_(seat_ids)).order_by(Seat.id).with_for_update()
+    ).all()
+    return {seat.id: seat for seat in seats}
+
+
+def mark_orders_failed(session: Session, order_ids: list[str]) -> None:
+    """Flag every not-yet-paid booking and recurring rule of the orders as payment failed."""
+    if not order_ids:
+        return
+    for model in (Booking, RecurringBooking):
+        session.execute(
+            sqlalchemy.update(model)
+            .where(model.razorpay_order_id.in_(order_ids), model.status != BookingStatus.PAID)
+            .values(payment_status=RazorpayPaymentStatus.FAILED.value)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def confirm_recurring(session: Session, recurring: RecurringBooking, payment_id: str) -> None:
+    """Mark a recurring rule paid; raises SeatConflictError."""
+    lock_seats(session, {recurring.seat_id})
+    if recurring.status == BookingStatus.PAID:
+        return
+    if rule_conflicts_in_db(session, recurring):
+        raise SeatConflictError()
+    recurring.status = BookingStatus.PAID
+    recurring.payment_status = RazorpayPaymentStatus.SUCCESS
+    recurring.razorpay_payment_id = payment_id
+    session.add(recurring)
+    payment = Payment(
+        recurring_booking_id=recurring.id,
+        amount=recurring.price_amount,
+        status=PaymentStatus.COMPLETED,
+        transaction_id=payment_id,
+    )
+    session.add(payment)
+    record_revenue(session, [payment.id])
+    release_holds(session, [recurring.seat_id], recurring.user_id)
+
+
+def order_bookings_statement(order_id: str):
+    """Every booking of one Razorpay order (ix_booking_razorpay_order_id)."""
+    return select(Booking).where(Booking.razorpay_order_id == order_id)
+
+
+def existing_payments_statement(booking_ids: list):
+    """Bookings among ``booking_ids`` that already have a Payment row (ix_payment_booking_id)."""
+    return select(Payment.booking_id).where(Payment.booking_id.in_(booking_ids))
+
+
+@dataclass
+class ConfirmedBooking:
+    """Plain values of a booking just marked PAID, safe to use after the commit."""
+    booking_id: str
+    user_id: UUID
+    seat_code: str
+    seat_type: str
+    section: str
+    duration_unit: BookingDuration
+    duration_quantity: int
+    amount: float
+    start_time: datetime
+    end_time: datetime
+    booking_date: datetime
+
+
+def confirm_bookings(
+    session: Session, bookings: Sequence[Booking], payment_id: str, now: Optional[datetime] = None,
+) -> list[ConfirmedBooking]:
+    """
+    Mark the not-yet-paid bookings of one order PAID with a fixed number of
+    statements, whatever the number of seats: seat lock, paid-booking and
+    recurring-rule conflict checks, existing-payment lookup, one UPDATE, one
+    multi-row Payment INSERT, the revenue ledger and occupancy rollups and the
+    hold release.
+    Raises ``SeatConflictError`` if any seat is taken for its window; the
+    booking_paid_no_overlap constraint (IntegrityError) is the final guard.
+    """
+    now = now or datetime.now(timezone.utc)
+    pending = [booking for booking in bookings if booking.status != BookingStatus.PAID]
+    if not pending:
+        return []
+
+    seat_map = lock_seats(session, {booking.seat_id for booking in pending})
+    # Reservations keep their chosen window; everything else starts now
+    windows = {
+        booking.id: resolve_booking_window(booking.start_time, booking.duration_unit, booking.duration_quantity, now)
+        for booking in pending
+    }
+    seat_windows = [(booking.seat_id, *windows[booking.id]) for booking in pending]
+    if paid_conflicts(session, seat_windows, [booking.id for booking in bookings]):
+        raise SeatConflictError()
+    if recurring_conflicts(session, seat_windows):
+        raise SeatConflictError()
+
+    booking_ids = [booking.id for booking in pending]
+    paid_ids = set(session.exec(existing_payments_statement(booking_ids)).all())
+
+    confirmed = []
+    rates: dict[tuple[str, BookingDuration, int], float] = {}
+    for booking in pending:
+        seat = seat_map.get(booking.seat_id)
+        seat_type = seat.type if seat else "workstation"
+        amount = booking.price_amount
+        if not amount:
+            key = (seat_type, booking.duration_unit, booking.duration_quantity)
+            if key not in rates:
+                rates[key] = compute_amount(*key)
+            amount = rates[key]
+        start, end = windows[booking.id]
+        confirmed.append(ConfirmedBooking(
+            booking_id=str(booking.id),
+            user_id=booking.user_id,
+            seat_code=seat.code if seat else "",
+            seat_type=seat_type,
+            section=seat.section if seat else "",
+            duration_unit=booking.duration_unit,
+            duration_quantity=booking.duration_quantity,
+            amount=amount,
+            start_time=start,
+            end_time=end,
+            booking_date=booking.booking_date,
+        ))
+
+    table = Booking.__table__
+    session.execute(
+        sqlalchemy.update(table)
+        .where(table.c.id.in_(booking_ids))
+        .values(
+            status=BookingStatus.PAID,
+            payment_status=RazorpayPaymentStatus.SUCCESS.value,
+            razorpay_payment_id=payment_id,
+            start_time=sqlalchemy.case({booking_id: start for booking_id, (start, _) in windows.items()}, value=table.c.id),
+            end_time=sqlalchemy.case({booking_id: end for booking_id, (_, end) in windows.items()}, value=table.c.id),
+        )
+    )
+    payment_rows = [
+        {
+            "id": uuid4(),
+            "booking_id": booking.id,
+            "recurring_booking_id": None,
+            "amount": line.amount,
+            "status": PaymentStatus.COMPLETED,
+            "transaction_id": payment_id,
+            "created_at": now,
+            "revenue_recorded": False,
+        }
+        for booking, line in zip(pending, confirmed)
+        if booking.id not in paid_ids
+    ]
+    if payment_rows:
+        session.execute(sqlalchemy.insert(Payment.__table__).values(payment_rows))
+        record_revenue(session, [row["id"] for row in payment_rows])
+
+    record_occupancy(session, booking_ids)
+    users = {booking.user_id for booking in pending}
+    for user_id in users:
+        release_holds(session, [booking.seat_id for booking in pending if booking.user_id == user_id], user_id)
+
+    # The Core UPDATE bypassed the ORM; reload these on next access instead of trusting stale state
+    for booking in pending:
+        session.expire(booking)
+    return confirmed
+
+
+def confirm_captured_order(
+    session: Session, order_id: str, payment_id: str, now: Optional[datetime] = None,
+) -> int:
+    """
+    Apply a captured payment reported by Razorpay. Returns how many bookings
+    (or recurring rules) changed state; 0 for unknown or already-paid orders.
+    Raises ``SeatConflictError`` / IntegrityError like ``confirm_bookings``.
+    """
+    bookings = session.exec(order_bookings_statement(order_id)).all()
+
+    if not bookings:
+        recurring = session.exec(
+            select(RecurringBooking).where(RecurringBooking.razorpay_order_id == order_id)
+        ).first()
+        if recurring is None or recurring.status == BookingStatus.PAID:
+            return 0
+        confirm_recurring(session, recurring, payment_id)
+        return 1
+
+    return len(confirm_bookings(session, bookings, payment_id, now))
@@ -0,0 +1,99 @@
+"""
+Shared async client for the Razorpay REST API.
+
+One ``httpx.AsyncClient`` per process, opened and closed by the ``lifespan``
+in ``main.py``: TLS connections are kept alive and reused across requests,
+every call has explicit connect / read timeouts, and awaiting the gateway
+never occupies a threadpool worker. Point RAZORPAY_API_BASE_URL at a local
+stub server to exercise the payment flow without the real gateway.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any, Optional
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class GatewayNotConfigured(Exception):
+    """RAZORPAY_KEY_ID / RAZORPAY_KEY_SECRET are not set."""
+
+
+class GatewayError(Exception):
+    """The gateway could not be reached, timed out, or rejected the call."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class RazorpayGateway:
+    def __init__(self) -> None:
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def configured(self) -> bool:
+        return bool(settings.RAZORPAY_KEY_ID and settings.RAZORPAY_KEY_SECRET)
+
+    # ── lifecycle ────────────────────────────────────────────────────────────
+
+    async def start(self) -> None:
+        if self._client is not None:
+            return
+        limits = httpx.Limits(
+            max_connections=settings.RAZORPAY_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.RAZORPAY_MAX_CONNECTIONS,
+            keepalive_expiry=30.0,
+        )
+        self._client = httpx.AsyncClient(
+            base_url=settings.RAZORPAY_API_BASE_URL,
+            auth=(settings.RAZORPAY_KEY_ID or "", settings.RAZORPAY_KEY_SECRET or ""),
+            timeout=httpx.Timeout(
+                connect=settings.RAZORPAY_CONNECT_TIMEOUT_SECONDS,
+                read=settings.RAZORPAY_READ_TIMEOUT_SECONDS,
+                write=settings.RAZORPAY_READ_TIMEOUT_SECONDS,
+                pool=settings.RAZORPAY_CONNECT_TIMEOUT_SECONDS,
+            ),
+            # Connection failures are retried once; a request that reached Razorpay never is,
+            # because creating an order twice is not idempotent.
+            transport=httpx.AsyncHTTPTransport(retries=1, limits=limits),
+        )
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # ── calls ────────────────────────────────────────────────────────────────
+
+    async def _request(self, method: str, path: str, **kwargs: Any) -> dict:
+        if not self.configured:
+            raise GatewayNotConfigured()
+        if self._client is None:
+            await self.start()
+        try:
+            response = await self._client.request(method, path, **kwargs)
+        except httpx.TimeoutException as exc:
+            raise GatewayError(f"Razorpay {method} {path} timed out: {exc!r}") from exc
+        except httpx.HTTPError as exc:
+            raise GatewayError(f"Razorpay {method} {path} failed: {exc!r}") from exc
+        if response.status_code >= 400:
+            raise GatewayError(
+                f"Razorpay {method} {path} returned {response.status_code}: {response.text[:200]}",
+                status_code=response.status_code,
+            )
+        return response.json()
+
+    async def create_order(self, payload: dict) -> dict:
+        return await self._request("POST", "/orders", json=payload)
+
+    async def fetch_order_payments(self, order_id: str) -> list[dict]:
+        body = await self._request("GET", f"/orders/{order_id}/payments")
+        return body.get("items", [])
+
+
+gateway = RazorpayGateway()
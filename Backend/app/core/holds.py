@@ -0,0 +1,60 @@
+"""
+Short-lived seat holds taken while a checkout is open.
+
+Creating a Razorpay order leases its seats to the buyer for
+SEAT_HOLD_TTL_SECONDS. A hold is a ``SeatHold`` row keyed by seat, taken with
+a single ``INSERT ... ON CONFLICT DO UPDATE`` that only overwrites a row which
+has already expired or belongs to the same user, so two checkouts can never
+both own a seat. Holds are never swept: readers ignore rows whose
+``expires_at`` has passed and the next acquirer overwrites them in place.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+from uuid import UUID
+
+from sqlalchemy import delete, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models.models import SeatHold
+
+
+def acquire_holds(
+    session: Session, seat_ids: Iterable[int], user_id: UUID, now: Optional[datetime] = None,
+) -> set[int]:
+    """
+    Hold ``seat_ids`` for ``user_id`` inside the caller's transaction (re-holding
+    extends the user's own lease). Returns the seats held by someone else; the
+    caller must roll back if that set is not empty.
+    """
+    now = now or datetime.now(timezone.utc)
+    wanted = sorted(set(seat_ids))     # fixed order, so concurrent checkouts cannot deadlock
+    if not wanted:
+        return set()
+
+    table = SeatHold.__table__
+    stmt = insert(table).values([
+        {"seat_id": seat_id, "user_id": user_id, "expires_at": now + timedelta(seconds=settings.SEAT_HOLD_TTL_SECONDS)}
+        for seat_id in wanted
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.seat_id],
+        set_={"user_id": stmt.excluded.user_id, "expires_at": stmt.excluded.expires_at},
+        where=or_(table.c.expires_at <= now, table.c.user_id == stmt.excluded.user_id),
+    ).returning(table.c.seat_id)
+    acquired = set(session.execute(stmt).scalars().all())
+    return set(wanted) - acquired
+
+
+def release_holds(session: Session, seat_ids: Iterable[int], user_id: UUID) -> None:
+    """Drop ``user_id``'s holds on ``seat_ids`` (inside the caller's transaction)."""
+    ids = list(set(seat_ids))
+    if ids:
+        session.execute(delete(SeatHold).where(SeatHold.seat_id.in_(ids), SeatHold.user_id == user_id))
+
+
+def active_holds_statement(now: datetime):
+    return select(SeatHold.seat_id, SeatHold.expires_at).where(SeatHold.expires_at > now)
@@ -0,0 +1,355 @@
+"""
+``Idempotency-Key`` handling for the booking / order creation endpoints.
+
+The first response for a key is stored and replayed verbatim for the TTL, so a
+client retrying after a dropped connection gets the original booking and
+Razorpay order back instead of creating new ones. Keys are scoped to the
+caller's token subject, the method and the path.
+
+Lookups hit a bounded in-process LRU first and the ``IdempotencyRecord`` table
+second (shared by every worker). The first request claims the key in the table
+before running; a duplicate that arrives while it is still running waits for
+it — on an ``asyncio.Event`` in the same process, by polling the row otherwise.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from jose import JWTError, jwt
+from sqlalchemy import delete, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.db.database import engine
+from app.models.models import IdempotencyRecord
+
+logger = logging.getLogger(__name__)
+
+HEADER = b"idempotency-key"
+MAX_KEY_LENGTH = 255
+
+# Auth / throttling answers depend on the caller's state, not the request — never replay them
+_UNSTORED_STATUSES = {401, 403, 429}
+_POLL_INTERVAL_SECONDS = 0.25
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    request_hash: str
+    status_code: int
+    content_type: Optional[str]
+    body: bytes
+    expires_at: datetime
+
+
+class _Busy:
+    """Another worker holds the claim and has not finished yet."""
+
+
+class _ResponseCache:
+    """Bounded LRU of completed responses."""
+
+    def __init__(self, max_size: int):
+        self._max_size = max_size
+        self._items: OrderedDict[str, StoredResponse] = OrderedDict()
+
+    def get(self, key: str, now: datetime) -> Optional[StoredResponse]:
+        stored = self._items.get(key)
+        if stored is None:
+            return None
+        if stored.expires_at <= now:
+            del self._items[key]
+            return None
+        self._items.move_to_end(key)
+        return stored
+
+    def put(self, key: str, stored: StoredResponse) -> None:
+        self._items[key] = stored
+        self._items.move_to_end(key)
+        while len(self._items) > self._max_size:
+            self._items.popitem(last=False)
+
+
+# ── table access (threadpool) ────────────────────────────────────────────────
+
+def _claim(key: str, request_hash: str) -> StoredResponse | _Busy | None:
+    """
+    Take ownership of ``key``. Returns None when claimed, the stored response
+    when the key already completed, or ``_Busy`` while another request runs it.
+    Expired records and claims abandoned by a crashed worker are taken over.
+    """
+    now = datetime.now(timezone.utc)
+    table = IdempotencyRecord.__table__
+    stmt = insert(table).values(
+        key=key,
+        request_hash=request_hash,
+        status_code=None,
+        content_type=None,
+        response_body=None,
+        created_at=now,
+        expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.key],
+        set_={
+            "request_hash": stmt.excluded.request_hash,
+            "status_code": None,
+            "content_type": None,
+            "response_body": None,
+            "created_at": stmt.excluded.created_at,
+            "expires_at": stmt.excluded.expires_at,
+        },
+        where=or_(
+            table.c.expires_at <= now,
+            (table.c.status_code.is_(None))
+            & (table.c.created_at <= now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT_SECONDS)),
+        ),
+    ).returning(table.c.key)
+
+    with Session(engine) as session:
+        claimed = session.execute(stmt).first()
+        session.commit()
+        if claimed is not None:
+            return None
+        record = session.get(IdempotencyRecord, key)
+    if record is None:
+        # Deleted between the upsert and the read; the caller retries
+        return _Busy()
+    if record.status_code is None:
+        return _Busy()
+    return StoredResponse(
+        request_hash=record.request_hash,
+        status_code=record.status_code,
+        content_type=record.content_type,
+        body=record.response_body or b"",
+        expires_at=record.expires_at,
+    )
+
+
+def _complete(key: str, status_code: int, content_type: Optional[str], body: bytes) -> None:
+    with Session(engine) as session:
+        record = session.get(IdempotencyRecord, key)
+        if record is None:
+            return
+        record.status_code = status_code
+        record.content_type = content_type
+        record.response_body = body
+        session.add(record)
+        session.commit()
+
+
+def _release(key: str) -> None:
+    with Session(engine) as session:
+        session.execute(
+            delete(IdempotencyRecord).where(
+                IdempotencyRecord.key == key,
+                IdempotencyRecord.status_code.is_(None),
+            )
+        )
+        session.commit()
+
+
+def purge_expired(limit: int = 1000) -> int:
+    """Delete up to ``limit`` expired records; returns how many were removed."""
+    now = datetime.now(timezone.utc)
+    with Session(engine) as session:
+        keys = select(IdempotencyRecord.key).where(IdempotencyRecord.expires_at <= now).limit(limit)
+        result = session.execute(delete(IdempotencyRecord).where(IdempotencyRecord.key.in_(keys)))
+        session.commit()
+        return result.rowcount or 0
+
+
+# ── middleware ───────────────────────────────────────────────────────────────
+
+def _principal(scope: Scope) -> str:
+    """Token subject, or "anonymous" — an invalid token is rejected downstream anyway."""
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                break
+            try:
+                payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            except JWTError:
+                break
+            return str(payload.get("sub") or "anonymous")
+    return "anonymous"
+
+
+def _header(scope: Scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1").strip()
+    return None
+
+
+async def _send_json(send: Send, status_code: int, detail: str) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _replay(send: Send, stored: StoredResponse) -> None:
+    headers = [
+        (b"content-length", str(len(stored.body)).encode()),
+        (b"idempotent-replayed", b"true"),
+    ]
+    if stored.content_type:
+        headers.append((b"content-type", stored.content_type.encode("latin-1")))
+    await send({"type": "http.response.start", "status": stored.status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": stored.body})
+
+
+class IdempotencyMiddleware:
+    """
+    Pure ASGI middleware: requests to ``paths`` (prefix match, POST only)
+    carrying an ``Idempotency-Key`` header are executed at most once per key.
+    Requests without the header pass straight through.
+    """
+
+    def __init__(self, app: ASGIApp, paths: tuple[str, ...]):
+        self.app = app
+        self.paths = paths
+        self._cache = _ResponseCache(settings.IDEMPOTENCY_CACHE_SIZE)
+        self._inflight: dict[str, asyncio.Event] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not scope["path"].startswith(self.paths)
+        ):
+            await self.app(scope, receive, send)
+            return
+        idempotency_key = _header(scope, HEADER)
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+            return
+
+        body = await self._read_body(receive)
+        key = hashlib.sha256(
+            "\n".join((_principal(scope), scope["method"], scope["path"], idempotency_key)).encode()
+        ).hexdigest()
+        request_hash = hashlib.sha256(body).hexdigest()
+
+        deadline = asyncio.get_running_loop().time() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            stored = self._cache.get(key, datetime.now(timezone.utc))
+            if stored is None:
+                inflight = self._inflight.get(key)
+                if inflight is not None:
+                    # Same process: wait for the first request to finish, then re-check
+                    remaining = deadline - asyncio.get_running_loop().time()
+                    try:
+                        await asyncio.wait_for(inflight.wait(), timeout=max(remaining, 0))
+                    except asyncio.TimeoutError:
+                        await _send_json(send, 409, "A request with this Idempotency-Key is still in progress")
+                        return
+                    continue
+
+                event = asyncio.Event()
+                self._inflight[key] = event
+                try:
+                    claim = await run_in_threadpool(_claim, key, request_hash)
+                    if claim is None:
+                        await self._execute(scope, body, receive, send, key, request_hash)
+                        return
+                finally:
+                    del self._inflight[key]
+                    event.set()
+
+                if isinstance(claim, _Busy):
+                    # Claimed by another worker: poll the table until it completes
+                    if asyncio.get_running_loop().time() >= deadline:
+                        await _send_json(send, 409, "A request with this Idempotency-Key is still in progress")
+                        return
+                    await asyncio.sleep(_POLL_INTERVAL_SECONDS)
+                    continue
+                stored = claim
+                self._cache.put(key, stored)
+
+            if stored.request_hash != request_hash:
+                await _send_json(send, 422, "Idempotency-Key was already used with a different request body")
+                return
+            await _replay(send, stored)
+            return
+
+    @staticmethod
+    async def _read_body(receive: Receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+    async def _execute(
+        self, scope: Scope, body: bytes, receive: Receive, send: Send, key: str, request_hash: str
+    ) -> None:
+        body_sent = False
+
+        async def replay_receive() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status_code = 500
+        content_type: Optional[str] = None
+        chunks: list[bytes] = []
+
+        async def capture_send(message: Message) -> None:
+            nonlocal status_code, content_type
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-type":
+                        content_type = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        completed = False
+        try:
+            await self.app(scope, replay_receive, capture_send)
+            completed = True
+        finally:
+            if completed and status_code < 500 and status_code not in _UNSTORED_STATUSES:
+                response_body = b"".join(chunks)
+                try:
+                    await run_in_threadpool(_complete, key, status_code, content_type, response_body)
+                except Exception as exc:  # noqa: BLE001
+                    logger.warning("Could not store idempotent response: %s", exc)
+                    await run_in_threadpool(_release, key)
+                else:
+                    self._cache.put(key, StoredResponse(
+                        request_hash=request_hash,
+                        status_code=status_code,
+                        content_type=content_type,
+                        body=response_body,
+                        expires_at=datetime.now(timezone.utc) + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS),
+                    ))
+            else:
+                # Server errors and unauthenticated attempts may be retried for real
+                await asyncio.shield(run_in_threadpool(_release, key))
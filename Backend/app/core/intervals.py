@@ -0,0 +1,63 @@
+"""
+Per-seat interval index over paid booking windows.
+
+Each seat keeps its intervals sorted by start time together with a running
+maximum of end times, so "does [start, end) overlap anything on this seat?"
+is a single bisect instead of a scan over the booking table.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Iterable, Optional
+
+
+class SeatIntervalIndex:
+    __slots__ = ("_starts", "_max_ends")
+
+    def __init__(self, intervals: Iterable[tuple[int, datetime, datetime]] = ()):
+        by_seat: dict[int, list[tuple[datetime, datetime]]] = {}
+        for seat_id, start, end in intervals:
+            if end > start:
+                by_seat.setdefault(seat_id, []).append((start, end))
+
+        self._starts: dict[int, list[datetime]] = {}
+        self._max_ends: dict[int, list[datetime]] = {}
+        for seat_id, windows in by_seat.items():
+            windows.sort()
+            starts: list[datetime] = []
+            max_ends: list[datetime] = []
+            running = None
+            for start, end in windows:
+                running = end if running is None or end > running else running
+                starts.append(start)
+                max_ends.append(running)
+            self._starts[seat_id] = starts
+            self._max_ends[seat_id] = max_ends
+
+    def overlaps(self, seat_id: int, start: datetime, end: datetime) -> bool:
+        """True if any interval on the seat intersects the half-open window [start, end)."""
+        starts = self._starts.get(seat_id)
+        if not starts:
+            return False
+        i = bisect_left(starts, end)          # intervals that begin before the window ends
+        return i > 0 and self._max_ends[seat_id][i - 1] > start
+
+    def busy_until(self, seat_id: int, at: datetime) -> Optional[datetime]:
+        """End of the booking covering ``at``, or None if the seat is free at that instant."""
+        starts = self._starts.get(seat_id)
+        if not starts:
+            return None
+        i = bisect_right(starts, at)
+        if i == 0:
+            return None
+        end = self._max_ends[seat_id][i - 1]
+        return end if end > at else None
+
+    def next_start(self, seat_id: int, after: datetime) -> Optional[datetime]:
+        """Start of the first interval on the seat beginning strictly after ``after``."""
+        starts = self._starts.get(seat_id)
+        if not starts:
+            return None
+        i = bisect_right(starts, after)
+        return starts[i] if i < len(starts) else None
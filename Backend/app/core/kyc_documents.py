@@ -0,0 +1,132 @@
+"""
+KYC documents in the blob store.
+
+Uploads are copied chunk by chunk from the multipart temp file into
+``blob_store``; the user row keeps only the key, size and content type. Rows
+from before the blob store hold a base64 data URL in ``kyc_document_data``;
+``migrate_inline_documents`` moves them out in committed batches and is safe
+to stop and resume. Stored documents are queued for ``app.core.kyc_processing``.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import logging
+from dataclasses import dataclass
+from typing import BinaryIO, Iterable, Optional
+
+import sqlalchemy
+from sqlmodel import Session, select
+
+from app.core.blobstore import CHUNK_SIZE, blob_store
+from app.core.config import settings
+from app.core.kyc_processing import enqueue_documents, sniff_content_type
+from app.db.database import engine
+from app.models.models import User
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_CONTENT_TYPES = frozenset({"image/jpeg", "image/png", "image/webp", "application/pdf"})
+
+
+class InvalidDocument(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class StoredDocument:
+    key: str
+    size: int
+    content_type: str
+
+
+def store_document(chunks: Iterable[bytes], content_type: Optional[str]) -> StoredDocument:
+    """Write an upload to the blob store; raises ``InvalidDocument`` / ``BlobTooLarge``."""
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type not in ALLOWED_CONTENT_TYPES:
+        raise InvalidDocument("Only JPG, PNG, WEBP or PDF documents are accepted")
+    blob = blob_store.write(chunks, max_bytes=settings.KYC_DOCUMENT_MAX_BYTES)
+    if blob.size == 0:
+        raise InvalidDocument("The document is empty")
+    return StoredDocument(key=blob.key, size=blob.size, content_type=content_type)
+
+
+def store_upload(file: BinaryIO, content_type: Optional[str]) -> StoredDocument:
+    return store_document(iter(lambda: file.read(CHUNK_SIZE), b""), content_type)
+
+
+def decode_data_url(value: str) -> tuple[str, bytes]:
+    """
+    ``data:<type>;base64,<data>`` -> (content type, bytes). Bare base64, and a
+    data URL without a type, get the type of their magic bytes, else PDF.
+    """
+    content_type = ""
+    data = value
+    if value.startswith("data:"):
+        header, _, data = value.partition(",")
+        content_type = header[5:].split(";")[0]
+    try:
+        raw = base64.b64decode(data, validate=True)
+    except (binascii.Error, ValueError):
+        raise InvalidDocument("The document is not valid base64")
+    return content_type or sniff_content_type(raw[:16]) or "application/pdf", raw
+
+
+def store_data_url(value: str) -> StoredDocument:
+    """Legacy JSON registration: decode the base64 data URL straight into the blob store."""
+    content_type, raw = decode_data_url(value)
+    return store_document([raw], content_type)
+
+
+# ── migration of inline documents ────────────────────────────────────────────
+
+def migrate_inline_documents(batch_size: int = 50, max_batches: Optional[int] = None) -> tuple[int, int, bool]:
+    """
+    Move base64 documents from ``user.kyc_document_data`` into the blob store,
+    one committed batch at a time. Rows are locked with SKIP LOCKED so two
+    runs can share the work. A row that cannot be decoded is logged and left
+    in place. Returns ``(migrated, failed, more_remaining)``.
+    """
+    migrated = failed = batches = 0
+    skipped: set = set()
+    while max_batches is None or batches < max_batches:
+        with Session(engine) as session:
+            query = (
+                select(User.id, User.kyc_document_data)
+                .where(User.kyc_document_data.is_not(None), User.kyc_document_key.is_(None))
+                .order_by(User.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            if skipped:
+                query = query.where(User.id.not_in(skipped))
+            rows = session.exec(query).all()
+            if not rows:
+                return migrated, failed, False
+            keys = []
+            for user_id, data in rows:
+                try:
+                    content_type, raw = decode_data_url(data)
+                    blob = blob_store.write([raw])
+                except InvalidDocument as exc:
+                    logger.warning("KYC document of user %s not migrated: %s", user_id, exc)
+                    skipped.add(user_id)
+                    failed += 1
+                    continue
+                session.execute(
+                    sqlalchemy.update(User)
+                    .where(User.id == user_id)
+                    .values(
+                        kyc_document_key=blob.key,
+                        kyc_document_size=blob.size,
+                        kyc_document_content_type=content_type,
+                        kyc_document_data=None,
+                    )
+                )
+                keys.append(blob.key)
+                migrated += 1
+            enqueue_documents(session, keys)
+            session.commit()
+        batches += 1
+        logger.info("KYC migration: %d documents moved so far", migrated)
+    return migrated, failed, True
@@ -0,0 +1,261 @@
+"""
+Background processing of stored KYC documents.
+
+Registration only writes the upload to the blob store and queues its key here
+(``enqueue_documents``, in the same transaction as the user row), so none of
+this work is on the request path. ``KycDocumentProcessor`` claims queued keys
+with ``FOR UPDATE SKIP LOCKED`` plus a lease, and runs at most
+KYC_PROCESSING_WORKERS of them at a time in its own thread pool. The request
+threadpool is never used. Each document gets:
+
+- its size, and its real type sniffed from the leading bytes (the declared
+  content type comes from the client)
+- one row per blob key, which is the content hash, so a file uploaded by
+  several users is processed once and shares one preview
+- a JPEG preview, longest edge KYC_PREVIEW_MAX_PIXELS, of images (Pillow) and
+  of the first page of PDFs (needs the optional PyMuPDF package; without it
+  PDFs get the metadata only)
+
+Previews are stored in the blob store like the documents themselves and are
+served by ``GET /admin/kyc/{user_id}/preview``.
+"""
+from __future__ import annotations
+
+import asyncio
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+import sqlalchemy
+from PIL import Image, ImageOps
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import Session, select
+
+from app.core.blobstore import blob_store
+from app.core.config import settings
+from app.db.database import engine
+from app.models.models import KycDocumentInfo
+
+try:
+    import fitz  # PyMuPDF, for first-page previews of PDFs
+except ImportError:  # optional
+    fitz = None
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_CONTENT_TYPE = "image/jpeg"
+
+# A claimed document not finished within this time (worker crashed) is claimed again
+_CLAIM_LEASE = timedelta(minutes=5)
+_SNIFF_BYTES = 16
+
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    """The document type from its magic bytes, or None if it is not one we accept."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head.startswith(b"%PDF-"):
+        return "application/pdf"
+    return None
+
+
+def enqueue_documents(session: Session, keys: Iterable[str]) -> None:
+    """Queue blob keys for processing; keys already known are left as they are. The caller commits."""
+    rows = [
+        {"key": key, "status": "pending", "attempts": 0, "created_at": datetime.now(timezone.utc)}
+        for key in set(keys)
+    ]
+    if rows:
+        session.execute(
+            pg_insert(KycDocumentInfo.__table__).values(rows).on_conflict_do_nothing(index_elements=["key"])
+        )
+
+
+def enqueue_unprocessed_documents() -> int:
+    """Queue every stored document without a processing row (uploads from before this pipeline)."""
+    with Session(engine) as session:
+        result = session.execute(
+            sqlalchemy.text(
+                "INSERT INTO kycdocumentinfo (key, status, attempts, created_at) "
+                "SELECT DISTINCT kyc_document_key, 'pending', 0, now() FROM \"user\" "
+                "WHERE kyc_document_key IS NOT NULL "
+                "ON CONFLICT (key) DO NOTHING"
+            )
+        )
+        session.commit()
+    return result.rowcount or 0
+
+
+# ── processing ───────────────────────────────────────────────────────────────
+
+@dataclass
+class _Preview:
+    data: bytes
+    width: int
+    height: int
+
+
+def _to_preview(image: Image.Image) -> _Preview:
+    max_px = settings.KYC_PREVIEW_MAX_PIXELS
+    image.draft("RGB", (max_px, max_px))      # JPEG: decode at reduced scale
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_px, max_px))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    out = io.BytesIO()
+    image.save(out, format="JPEG", quality=70, optimize=True)
+    return _Preview(out.getvalue(), image.width, image.height)
+
+
+def _image_preview(data: bytes) -> _Preview:
+    with Image.open(io.BytesIO(data)) as image:
+        return _to_preview(image)
+
+
+def _pdf_preview(data: bytes) -> Optional[_Preview]:
+    if fitz is None:
+        return None
+    with fitz.open(stream=data, filetype="pdf") as pdf:
+        if pdf.page_count == 0:
+            return None
+        page = pdf[0]
+        zoom = settings.KYC_PREVIEW_MAX_PIXELS / max(page.rect.width, page.rect.height)
+        pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+    image = Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+    return _to_preview(image)
+
+
+def _analyse(key: str) -> dict:
+    """Column values for a processed document. Documents are at most KYC_DOCUMENT_MAX_BYTES."""
+    with blob_store.open(key) as handle:
+        data = handle.read()
+    detected = sniff_content_type(data[:_SNIFF_BYTES])
+    values = {"size": len(data), "detected_type": detected}
+
+    preview = None
+    if detected in ("image/jpeg", "image/png", "image/webp"):
+        preview = _image_preview(data)
+    elif detected == "application/pdf":
+        preview = _pdf_preview(data)
+    if preview is not None:
+        blob = blob_store.write([preview.data])
+        values.update(preview_key=blob.key, preview_width=preview.width, preview_height=preview.height)
+    return values
+
+
+def process_document(key: str) -> bool:
+    """Process one claimed document and record the result. Returns False if it failed."""
+    try:
+        values = _analyse(key)
+    except Exception as exc:  # noqa: BLE001 — corrupt uploads are expected
+        logger.warning("KYC document %s not processed: %r", key, exc)
+        with Session(engine) as session:
+            session.execute(
+                sqlalchemy.update(KycDocumentInfo)
+                .where(KycDocumentInfo.key == key)
+                .values(
+                    last_error=repr(exc)[:500],
+                    claimed_at=None,
+                    status=sqlalchemy.case(
+                        (KycDocumentInfo.attempts >= settings.KYC_PROCESSING_MAX_ATTEMPTS, "failed"), else_="pending"
+                    ),
+                )
+            )
+            session.commit()
+        return False
+
+    with Session(engine) as session:
+        session.execute(
+            sqlalchemy.update(KycDocumentInfo)
+            .where(KycDocumentInfo.key == key)
+            .values(status="ready", processed_at=datetime.now(timezone.utc), last_error=None, **values)
+        )
+        session.commit()
+    return True
+
+
+def claim_documents(limit: int) -> list[str]:
+    """Lease up to ``limit`` pending documents, oldest first, counting an attempt for each."""
+    now = datetime.now(timezone.utc)
+    with Session(engine) as session:
+        keys = session.exec(
+            select(KycDocumentInfo.key)
+            .where(
+                KycDocumentInfo.status == "pending",
+                KycDocumentInfo.attempts < settings.KYC_PROCESSING_MAX_ATTEMPTS,
+                sqlalchemy.or_(
+                    KycDocumentInfo.claimed_at.is_(None),
+                    KycDocumentInfo.claimed_at < now - _CLAIM_LEASE,
+                ),
+            )
+            .order_by(KycDocumentInfo.created_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if keys:
+            session.execute(
+                sqlalchemy.update(KycDocumentInfo)
+                .where(KycDocumentInfo.key.in_(keys))
+                .values(claimed_at=now, attempts=KycDocumentInfo.attempts + 1)
+            )
+            session.commit()
+    return list(keys)
+
+
+class KycDocumentProcessor:
+    """Processes queued documents in a bounded pool; woken by registrations, polls for the rest."""
+
+    def __init__(self) -> None:
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._pool: ThreadPoolExecutor | None = None
+
+    def start(self) -> None:
+        self._pool = ThreadPoolExecutor(
+            max_workers=settings.KYC_PROCESSING_WORKERS, thread_name_prefix="kyc-processing"
+        )
+        self._task = asyncio.create_task(self._run(), name="kyc-processing")
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pool is not None:
+            # Unfinished documents are claimed again once their lease expires
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        workers = settings.KYC_PROCESSING_WORKERS
+        while True:
+            self._wake.clear()
+            try:
+                keys = await loop.run_in_executor(self._pool, claim_documents, workers)
+                await asyncio.gather(*(loop.run_in_executor(self._pool, process_document, key) for key in keys))
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("KYC processing batch failed: %s", exc)
+                keys = []
+            if len(keys) >= workers:
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=settings.KYC_PROCESSING_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+
+kyc_processor = KycDocumentProcessor()
@@ -0,0 +1,156 @@
+"""
+Hourly seat occupancy rollup (``SeatOccupancyHour``) for utilisation heatmaps.
+
+Paid bookings are folded into per-seat hour buckets exactly once: the same
+statement that flags ``booking.occupancy_recorded`` feeds the upsert, so a
+booking can never be counted twice, whether it arrives through
+``verify_payment``, the webhook, or the backfill.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+from uuid import UUID
+from zoneinfo import ZoneInfo
+
+import sqlalchemy
+from sqlmodel import Session, func, select
+
+from app.core.config import settings
+from app.db.database import engine
+from app.models.models import Booking, BookingStatus, Seat, SeatOccupancyHour
+
+logger = logging.getLogger(__name__)
+
+# booking.status is a native enum stored by member name, hence 'PAID'
+_RECORD_SQL = sqlalchemy.text("""
+    WITH claimed AS (
+        UPDATE booking SET occupancy_recorded = true
+        WHERE id = ANY(CAST(:booking_ids AS uuid[]))
+          AND status = 'PAID'
+          AND NOT occupancy_recorded
+          AND start_time IS NOT NULL
+          AND end_time IS NOT NULL
+        RETURNING seat_id, start_time, end_time
+    )
+    INSERT INTO seatoccupancyhour (seat_id, hour_start, occupied_minutes)
+    SELECT c.seat_id,
+           h.hour_start,
+           SUM(EXTRACT(EPOCH FROM LEAST(c.end_time, h.hour_start + interval '1 hour')
+                                - GREATEST(c.start_time, h.hour_start)) / 60)
+    FROM claimed c
+    CROSS JOIN LATERAL generate_series(
+        date_trunc('hour', c.start_time, :tz),
+        c.end_time - interval '1 microsecond',
+        interval '1 hour'
+    ) AS h(hour_start)
+    GROUP BY c.seat_id, h.hour_start
+    ON CONFLICT (seat_id, hour_start) DO UPDATE
+        SET occupied_minutes = seatoccupancyhour.occupied_minutes + EXCLUDED.occupied_minutes
+""")
+
+
+def record_occupancy(session: Session, booking_ids: Iterable[UUID | str]) -> int:
+    """
+    Add paid bookings to the rollup inside the caller's transaction.
+    Returns the number of hour buckets touched.
+    """
+    ids = [str(booking_id) for booking_id in booking_ids]
+    if not ids:
+        return 0
+    session.flush()
+    result = session.execute(_RECORD_SQL, {"booking_ids": ids, "tz": settings.ANALYTICS_TIMEZONE})
+    return result.rowcount or 0
+
+
+def backfill_occupancy(chunk_size: int = 500, max_chunks: Optional[int] = None) -> tuple[int, bool]:
+    """
+    Fold historical paid bookings into the rollup, one committed chunk at a time.
+    Returns ``(bookings_processed, more_remaining)``.
+    """
+    processed = 0
+    chunks = 0
+    while max_chunks is None or chunks < max_chunks:
+        with Session(engine) as session:
+            ids = session.exec(
+                select(Booking.id)
+                .where(
+                    Booking.status == BookingStatus.PAID,
+                    Booking.occupancy_recorded == False,  # noqa: E712
+                    Booking.start_time.is_not(None),
+                    Booking.end_time.is_not(None),
+                )
+                .order_by(Booking.id)
+                .limit(chunk_size)
+            ).all()
+            if not ids:
+                return processed, False
+            record_occupancy(session, ids)
+            session.commit()
+        processed += len(ids)
+        chunks += 1
+        logger.info("Occupancy backfill: %d bookings so far", processed)
+    return processed, True
+
+
+def _hour_of_week_counts(start: datetime, end: datetime, tz: ZoneInfo) -> dict[tuple[int, int], int]:
+    """How many times each (ISO weekday, hour) occurs in [start, end)."""
+    counts: dict[tuple[int, int], int] = {}
+    cursor = start.astimezone(tz).replace(minute=0, second=0, microsecond=0)
+    while cursor < end:
+        key = (cursor.isoweekday(), cursor.hour)
+        counts[key] = counts.get(key, 0) + 1
+        cursor = (cursor + timedelta(hours=1)).astimezone(tz)
+    return counts
+
+
+def occupancy_heatmap(
+    session: Session,
+    start: datetime,
+    end: datetime,
+    section: Optional[str] = None,
+    seat_type: Optional[str] = None,
+    seat_id: Optional[int] = None,
+) -> tuple[int, list[dict]]:
+    """
+    Hour-of-week utilisation over [start, end) for the matching seats.
+    Returns ``(seat_count, cells)``; only reads the rollup rows inside the range.
+    """
+    tz_name = settings.ANALYTICS_TIMEZONE
+    local_hour = func.timezone(tz_name, SeatOccupancyHour.hour_start)
+    weekday = func.extract("isodow", local_hour)
+    hour = func.extract("hour", local_hour)
+
+    seat_filters = []
+    if section:
+        seat_filters.append(Seat.section == section)
+    if seat_type:
+        seat_filters.append(Seat.type == seat_type)
+    if seat_id is not None:
+        seat_filters.append(Seat.id == seat_id)
+
+    seat_count = session.exec(select(func.count()).select_from(Seat).where(*seat_filters)).one()
+    rows = session.exec(
+        select(weekday, hour, func.sum(func.least(SeatOccupancyHour.occupied_minutes, 60)))
+        .join(Seat, Seat.id == SeatOccupancyHour.seat_id)
+        .where(
+            SeatOccupancyHour.hour_start >= start,
+            SeatOccupancyHour.hour_start < end,
+            *seat_filters,
+        )
+        .group_by(weekday, hour)
+    ).all()
+    minutes = {(int(day), int(hr)): float(total or 0) for day, hr, total in rows}
+
+    cells = []
+    for (day, hr), occurrences in sorted(_hour_of_week_counts(start, end, ZoneInfo(tz_name)).items()):
+        occupied = minutes.get((day, hr), 0.0)
+        capacity = occurrences * 60 * seat_count
+        cells.append({
+            "weekday": day,
+            "hour": hr,
+            "occupied_minutes": round(occupied, 2),
+            "utilisation": round(occupied / capacity, 4) if capacity else 0.0,
+        })
+    return seat_count, cells
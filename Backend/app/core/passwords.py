@@ -0,0 +1,94 @@
+"""
+Password hashing off the request threadpool.
+
+PBKDF2 is deliberately slow and holds the GIL while it runs, so hashing in
+FastAPI's shared threadpool lets a burst of logins stall every other request
+on the worker. ``password_hasher`` runs it in a small dedicated process pool
+instead. At most PASSWORD_HASH_MAX_CONCURRENCY jobs are admitted at once; a
+caller that cannot get a slot within PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS gets
+``PasswordHasherBusy`` (503 + Retry-After) rather than queueing without bound.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, TypeVar
+
+from passlib.context import CryptContext
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Use PBKDF2 to avoid runtime incompatibilities between passlib and bcrypt v5.
+# Existing hashes keep verifying at the rounds they were created with.
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    deprecated="auto",
+    pbkdf2_sha256__rounds=settings.PASSWORD_HASH_ROUNDS,
+)
+
+
+def hash_password_sync(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password_sync(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasherBusy(Exception):
+    """No hashing slot became free within PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS."""
+
+
+class PasswordHasher:
+    def __init__(self) -> None:
+        self._pool: ProcessPoolExecutor | None = None
+        self._slots: asyncio.Semaphore | None = None
+
+    def start(self) -> None:
+        if self._pool is None:
+            # spawn, not fork: the API process already runs threads and an event loop
+            self._pool = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(settings.PASSWORD_HASH_MAX_CONCURRENCY)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self._slots = None
+
+    async def _run(self, func: Callable[..., T], *args) -> T:
+        self.start()
+        slots = self._slots
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            raise PasswordHasherBusy()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, func, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); start a fresh pool for the next caller
+            logger.error("Password hashing pool broke; restarting it")
+            self._pool = None
+            raise PasswordHasherBusy()
+        finally:
+            slots.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password_sync, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password_sync, plain_password, hashed_password)
+
+
+password_hasher = PasswordHasher()
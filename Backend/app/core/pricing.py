@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 from decimal import Decimal, ROUND_HALF_UP
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
+from app.core.config import settings
 from app.models.models import BookingDuration
 
 # ── Official rate card ───────────────────────────────────────────────────────
@@ -50,3 +51,27 @@ def compute_end_time(start_time: datetime, duration_unit: BookingDuration, quant
     if duration_unit == BookingDuration.YEARLY:
         return start_time + timedelta(days=360 * quantity)
     return start_time + timedelta(days=30 * quantity)
+
+
+def normalize_reservation_start(start_time: datetime | None, now: datetime) -> datetime | None:
+    """
+    Validate a customer-chosen start time. ``None`` keeps the legacy behaviour of
+    starting the booking at payment time. Naive datetimes are treated as UTC.
+    """
+    if start_time is None:
+        return None
+    if start_time.tzinfo is None:
+        start_time = start_time.replace(tzinfo=timezone.utc)
+    if start_time < now - timedelta(minutes=5):
+        raise ValueError("Start time must be in the future")
+    if start_time > now + timedelta(days=settings.RESERVATION_MAX_ADVANCE_DAYS):
+        raise ValueError(f"Bookings can be made at most {settings.RESERVATION_MAX_ADVANCE_DAYS} days ahead")
+    return start_time
+
+
+def resolve_booking_window(
+    start_time: datetime | None, duration_unit: BookingDuration, quantity: int, now: datetime
+) -> tuple[datetime, datetime]:
+    """Return the half-open window [start, end) a booking occupies; no start means "from now"."""
+    start = now if start_time is None else start_time
+    return start, compute_end_time(start, duration_unit, quantity)
@@ -0,0 +1,285 @@
+"""
+Token-bucket rate limiting for the routes that are expensive to abuse:
+sign-in (a PBKDF2 job per call) and order creation (a Razorpay call per call).
+
+Each ``RateLimitRule`` holds one bucket per client IP or per user (the bearer
+token's subject) and refills ``per_minute`` tokens a minute up to ``burst``. A
+request takes one token from every rule that matches it; if any bucket is
+empty it gets ``429`` with ``Retry-After`` and never reaches the route.
+
+The default backend keeps buckets in per-worker dicts: one ``__slots__`` object
+per active client, no locking (everything runs on the event loop), and a
+periodic sweep drops buckets that have refilled completely, since a full bucket
+is the same as no bucket. ``RATE_LIMIT_BACKEND=postgres`` keeps them in
+``RateLimitBucket`` instead so the limits hold across workers, at the cost of
+one upsert per check. Requests to other routes pay a single prefix test.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import sqlalchemy
+from jose import JWTError, jwt
+from sqlalchemy import delete
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.db.database import engine
+from app.models.models import RateLimitBucket
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    name: str
+    paths: tuple[str, ...]       # POST path prefixes
+    key: str                     # "ip" or "user"
+    per_minute: float
+    burst: int
+
+    @property
+    def rate(self) -> float:
+        return self.per_minute / 60
+
+    @property
+    def refill_seconds(self) -> float:
+        """Time for an empty bucket to become full again."""
+        return self.burst / self.rate
+
+
+def default_rules() -> tuple[RateLimitRule, ...]:
+    auth = dict(key="ip", per_minute=settings.RATE_LIMIT_AUTH_PER_MINUTE, burst=settings.RATE_LIMIT_AUTH_BURST)
+    orders = ("/payment/create-order",)      # create-order, -batch, -bulk and -recurring
+    return (
+        RateLimitRule("login", ("/auth/login",), **auth),
+        RateLimitRule("register", ("/auth/register",), **auth),
+        RateLimitRule(
+            "orders", orders, key="user",
+            per_minute=settings.RATE_LIMIT_ORDER_PER_MINUTE, burst=settings.RATE_LIMIT_ORDER_BURST,
+        ),
+        RateLimitRule(
+            "orders-ip", orders, key="ip",
+            per_minute=settings.RATE_LIMIT_ORDER_IP_PER_MINUTE, burst=settings.RATE_LIMIT_ORDER_IP_BURST,
+        ),
+    )
+
+
+# ── backends ─────────────────────────────────────────────────────────────────
+
+class _Bucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class MemoryBackend:
+    def __init__(self) -> None:
+        self._buckets: dict[str, dict[str, _Bucket]] = {}
+
+    async def take(self, rule: RateLimitRule, ident: str) -> float:
+        """Take a token; returns 0 when allowed, else seconds until one is available."""
+        buckets = self._buckets.get(rule.name)
+        if buckets is None:
+            buckets = self._buckets[rule.name] = {}
+        now = time.monotonic()
+        bucket = buckets.get(ident)
+        if bucket is None:
+            buckets[ident] = _Bucket(rule.burst - 1, now)
+            return 0.0
+        tokens = min(rule.burst, bucket.tokens + (now - bucket.updated) * rule.rate)
+        bucket.updated = now
+        if tokens >= 1:
+            bucket.tokens = tokens - 1
+            return 0.0
+        bucket.tokens = tokens
+        return (1 - tokens) / rule.rate
+
+    async def sweep(self, rules: tuple[RateLimitRule, ...]) -> int:
+        now = time.monotonic()
+        removed = 0
+        for rule in rules:
+            buckets = self._buckets.get(rule.name)
+            if not buckets:
+                continue
+            full = [
+                ident for ident, bucket in buckets.items()
+                if bucket.tokens + (now - bucket.updated) * rule.rate >= rule.burst
+            ]
+            for ident in full:
+                del buckets[ident]
+            removed += len(full)
+        return removed
+
+    def size(self) -> int:
+        return sum(len(buckets) for buckets in self._buckets.values())
+
+
+# Refill, then take a token only if a whole one is available. A refused request
+# leaves the row untouched, so ``updated_at = now()`` tells the caller whether it
+# was allowed; the returned tokens / timestamps give the wait otherwise.
+_TAKE_SQL = sqlalchemy.text("""
+    INSERT INTO ratelimitbucket AS b (key, tokens, updated_at)
+    VALUES (:key, :burst - 1, now())
+    ON CONFLICT (key) DO UPDATE SET
+        tokens = CASE
+            WHEN LEAST(:burst, b.tokens + EXTRACT(EPOCH FROM now() - b.updated_at) * :rate) >= 1
+            THEN LEAST(:burst, b.tokens + EXTRACT(EPOCH FROM now() - b.updated_at) * :rate) - 1
+            ELSE b.tokens
+        END,
+        updated_at = CASE
+            WHEN LEAST(:burst, b.tokens + EXTRACT(EPOCH FROM now() - b.updated_at) * :rate) >= 1
+            THEN now()
+            ELSE b.updated_at
+        END
+    RETURNING b.updated_at = now() AS allowed,
+              LEAST(:burst, b.tokens + EXTRACT(EPOCH FROM now() - b.updated_at) * :rate) AS available
+""")
+
+
+class PostgresBackend:
+    def _take(self, rule: RateLimitRule, ident: str) -> float:
+        with Session(engine) as session:
+            allowed, available = session.execute(
+                _TAKE_SQL, {"key": f"{rule.name}:{ident}", "burst": rule.burst, "rate": rule.rate},
+            ).one()
+            session.commit()
+        return 0.0 if allowed else (1 - float(available)) / rule.rate
+
+    async def take(self, rule: RateLimitRule, ident: str) -> float:
+        try:
+            return await run_in_threadpool(self._take, rule, ident)
+        except SQLAlchemyError as exc:
+            # Fail open: an unreachable database should not turn into a wall of 429s
+            logger.warning("Rate limit check failed for %s: %s", rule.name, exc)
+            return 0.0
+
+    def _sweep(self, rules: tuple[RateLimitRule, ...]) -> int:
+        # Untouched for longer than the slowest refill: full again, same as absent
+        idle = max((rule.refill_seconds for rule in rules), default=0)
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=idle)
+        with Session(engine) as session:
+            result = session.execute(delete(RateLimitBucket).where(RateLimitBucket.updated_at < cutoff))
+            session.commit()
+        return result.rowcount or 0
+
+    async def sweep(self, rules: tuple[RateLimitRule, ...]) -> int:
+        return await run_in_threadpool(self._sweep, rules)
+
+
+# ── limiter & middleware ─────────────────────────────────────────────────────
+
+class RateLimiter:
+    def __init__(self, rules: tuple[RateLimitRule, ...], backend: MemoryBackend | PostgresBackend):
+        self.rules = rules
+        self.backend = backend
+        self.prefixes = tuple({path for rule in rules for path in rule.paths})
+
+    async def check(self, scope: Scope) -> float:
+        """Seconds the caller must wait, or 0 if the request may proceed."""
+        path = scope["path"]
+        wait = 0.0
+        ip = subject = None
+        for rule in self.rules:
+            if not path.startswith(rule.paths):
+                continue
+            if rule.key == "ip":
+                ident = ip = ip or client_ip(scope)
+            else:
+                ident = subject = subject or bearer_subject(scope)
+                if ident is None:
+                    continue          # rejected with 401 downstream; the IP rule still applies
+            wait = max(wait, await self.backend.take(rule, ident))
+        return wait
+
+    async def sweep(self) -> None:
+        removed = await self.backend.sweep(self.rules)
+        if removed:
+            logger.debug("Rate limiter dropped %d idle buckets", removed)
+
+
+def client_ip(scope: Scope) -> str:
+    if settings.RATE_LIMIT_TRUST_FORWARDED_FOR:
+        for name, value in scope.get("headers", []):
+            if name == b"x-forwarded-for":
+                # The last hop is the one our proxy appended; earlier ones are client-supplied
+                return value.decode("latin-1").rsplit(",", 1)[-1].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+@lru_cache(maxsize=4096)
+def _token_subject(token: str) -> Optional[str]:
+    # Cached: a client reuses its token for many calls and a decode costs more than the
+    # bucket itself. Only keys the bucket; the route still rejects expired tokens.
+    try:
+        payload = jwt.decode(
+            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM], options={"verify_exp": False},
+        )
+    except JWTError:
+        return None
+    subject = payload.get("sub")
+    return str(subject) if subject else None
+
+
+def bearer_subject(scope: Scope) -> Optional[str]:
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer" or not token:
+                return None
+            return _token_subject(token)
+    return None
+
+
+async def _too_many_requests(send: Send, wait: float) -> None:
+    retry_after = max(math.ceil(wait), 1)
+    body = json.dumps({"detail": f"Too many requests. Try again in {retry_after} seconds."}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class RateLimitMiddleware:
+    """Pure ASGI middleware; only POSTs under the limiter's path prefixes are checked."""
+
+    def __init__(self, app: ASGIApp, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] == "http"
+            and scope["method"] == "POST"
+            and scope["path"].startswith(self.limiter.prefixes)
+        ):
+            wait = await self.limiter.check(scope)
+            if wait > 0:
+                await _too_many_requests(send, wait)
+                return
+        await self.app(scope, receive, send)
+
+
+rate_limiter = RateLimiter(
+    default_rules(),
+    PostgresBackend() if settings.RATE_LIMIT_BACKEND == "postgres" else MemoryBackend(),
+)
@@ -0,0 +1,94 @@
+"""
+Cancels PENDING bookings whose checkout was abandoned.
+
+Runs as a periodic task (see ``main.py``) instead of on the request path: each
+pass flips stale rows to CANCELLED with set-based UPDATEs of at most
+``chunk_size`` rows, each committed on its own so no long lock is held. Rows
+locked by an in-flight confirmation are skipped and picked up next time.
+
+A row without a Razorpay order is stale PENDING_BOOKING_TTL_MINUTES after it
+was created; one with an order only that long after the order was opened
+(``order_created_at``), so a checkout paid for late is not cancelled under it.
+Cancelling clears ``reconciled_at``, so the payment reconciler asks Razorpay
+about a reaped order once more in case its capture webhook was lost.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import func, or_, update
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.db.database import engine
+from app.models.models import Booking, BookingStatus, RecurringBooking
+
+logger = logging.getLogger(__name__)
+
+
+def _is_stale(model, cutoff: datetime):
+    """PENDING, and untouched since ``cutoff``: created then, and any order opened then too."""
+    return (
+        model.status == BookingStatus.PENDING,
+        # An order is always opened after the row was created, so this bound holds for both
+        model.created_at < cutoff,
+        or_(
+            model.razorpay_order_id.is_(None),
+            func.coalesce(model.order_created_at, model.created_at) < cutoff,
+        ),
+    )
+
+
+def stale_pending_statement(cutoff: datetime, limit: int):
+    """Oldest stale PENDING bookings (range served by ix_booking_pending_created_at)."""
+    return (
+        select(Booking.id)
+        .where(*_is_stale(Booking, cutoff))
+        .order_by(Booking.created_at)
+        .limit(limit)
+    )
+
+
+def reap_pending_bookings(
+    ttl_minutes: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    max_chunks: Optional[int] = None,
+) -> int:
+    """Cancel PENDING bookings older than the TTL. Returns how many rows were reaped."""
+    ttl_minutes = settings.PENDING_BOOKING_TTL_MINUTES if ttl_minutes is None else ttl_minutes
+    chunk_size = settings.PENDING_REAPER_CHUNK_SIZE if chunk_size is None else chunk_size
+    max_chunks = settings.PENDING_REAPER_MAX_CHUNKS if max_chunks is None else max_chunks
+    cutoff = datetime.now(timezone.utc) - timedelta(minutes=ttl_minutes)
+
+    reaped = 0
+    for _ in range(max_chunks):
+        stale_ids = stale_pending_statement(cutoff, chunk_size).with_for_update(skip_locked=True)
+        with Session(engine) as session:
+            result = session.execute(
+                update(Booking)
+                .where(Booking.id.in_(stale_ids.scalar_subquery()))
+                .values(status=BookingStatus.CANCELLED, reconciled_at=None)
+                .execution_options(synchronize_session=False)
+            )
+            session.commit()
+        count = result.rowcount or 0
+        reaped += count
+        if count < chunk_size:
+            break
+
+    # Recurring rules are one row per rule, so a single statement is enough
+    with Session(engine) as session:
+        result = session.execute(
+            update(RecurringBooking)
+            .where(*_is_stale(RecurringBooking, cutoff))
+            .values(status=BookingStatus.CANCELLED, reconciled_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+    reaped += result.rowcount or 0
+
+    if reaped:
+        logger.info("Reaped %d abandoned PENDING bookings older than %d minutes", reaped, ttl_minutes)
+    return reaped
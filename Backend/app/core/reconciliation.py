@@ -0,0 +1,190 @@
+"""
+Settles PENDING orders whose payment was captured but never reported back.
+
+If the browser closes after paying and the webhook is missing or late, the
+bookings would stay PENDING until the reaper cancels them. Every
+``RECONCILE_INTERVAL_SECONDS`` this job picks the oldest PENDING orders that
+are at least ``RECONCILE_MIN_AGE_MINUTES`` old, plus orders the reaper has
+cancelled since they were last checked (opened within
+``RECONCILE_CANCELLED_LOOKBACK_HOURS``; a captured one is confirmed all the
+same, seat conflicts permitting). It asks Razorpay for their
+payments — at most ``RECONCILE_CONCURRENCY`` calls in flight and
+``RECONCILE_RATE_PER_SECOND`` started per second — and confirms captured ones
+through ``app.core.confirmation``, exactly like ``POST /payment/verify``.
+Point RAZORPAY_API_BASE_URL at a local stub to exercise it.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import sqlalchemy
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, and_, func, or_, select
+from starlette.concurrency import run_in_threadpool
+
+from app.core.availability import bump_seat_version
+from app.core.config import settings
+from app.core.confirmation import SeatConflictError, confirm_captured_order, mark_orders_failed
+from app.core.gateway import GatewayError, gateway
+from app.db.database import engine, is_exclusion_violation
+from app.models.models import Booking, BookingStatus, RecurringBooking
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReconcileResult:
+    checked: int = 0
+    confirmed: list[str] = field(default_factory=list)     # order ids settled as paid
+    failed: list[str] = field(default_factory=list)        # every attempt on the order failed
+    conflicts: list[str] = field(default_factory=list)     # paid, but the seat was taken: refund needed
+    errors: list[str] = field(default_factory=list)        # gateway could not be asked
+
+
+class RateLimiter:
+    """Spaces call starts at least ``1 / rate_per_second`` apart across all callers."""
+
+    def __init__(self, rate_per_second: float):
+        self._interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self._interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def due_orders_statement(model, now: datetime, limit: int):
+    """
+    ``(order_id, opened_at)`` of the oldest orders of ``model`` (Booking or
+    RecurringBooking) to ask Razorpay about: PENDING ones old enough and not
+    checked recently, and reaped (CANCELLED) ones not checked since the reaper ran.
+    """
+    opened_before = now - timedelta(minutes=settings.RECONCILE_MIN_AGE_MINUTES)
+    checked_before = now - timedelta(minutes=settings.RECONCILE_RECHECK_MINUTES)
+    lookback = now - timedelta(hours=settings.RECONCILE_CANCELLED_LOOKBACK_HOURS)
+    opened_at = func.coalesce(model.order_created_at, model.created_at)
+    return (
+        select(model.razorpay_order_id, func.min(opened_at))
+        .where(
+            model.razorpay_order_id.is_not(None),
+            model.created_at < opened_before,
+            opened_at < opened_before,
+            or_(
+                and_(
+                    model.status == BookingStatus.PENDING,
+                    or_(model.reconciled_at.is_(None), model.reconciled_at < checked_before),
+                ),
+                and_(
+                    model.status == BookingStatus.CANCELLED,
+                    model.reconciled_at.is_(None),
+                    opened_at > lookback,
+                ),
+            ),
+        )
+        .group_by(model.razorpay_order_id)
+        .order_by(func.min(opened_at))
+        .limit(limit)
+    )
+
+
+def _due_orders(now: datetime, limit: int) -> list[str]:
+    orders: dict[str, datetime] = {}
+    with Session(engine) as session:
+        for model in (Booking, RecurringBooking):
+            orders.update(session.exec(due_orders_statement(model, now, limit)).all())
+    return sorted(orders, key=orders.get)[:limit]
+
+
+def _settle(outcomes: dict[str, Optional[dict]], now: datetime, result: ReconcileResult) -> None:
+    captured = {
+        order_id: payment["id"] for order_id, payment in outcomes.items()
+        if payment and payment.get("status") == "captured"
+    }
+    failed = [order_id for order_id, payment in outcomes.items() if payment and payment.get("status") == "failed"]
+    confirmed = 0
+
+    with Session(engine) as session:
+        for model in (Booking, RecurringBooking):
+            session.execute(
+                sqlalchemy.update(model)
+                .where(model.razorpay_order_id.in_(list(outcomes)), model.status != BookingStatus.PAID)
+                .values(reconciled_at=now)
+                .execution_options(synchronize_session=False)
+            )
+        mark_orders_failed(session, failed)
+        result.failed.extend(failed)
+
+        for order_id, payment_id in captured.items():
+            try:
+                with session.begin_nested():
+                    changed = confirm_captured_order(session, order_id, payment_id, now)
+            except (SeatConflictError, IntegrityError) as exc:
+                if isinstance(exc, IntegrityError) and not is_exclusion_violation(exc):
+                    raise
+                mark_orders_failed(session, [order_id])
+                result.conflicts.append(order_id)
+                logger.error("Reconciled payment %s for order %s overlaps a paid booking — refund needed", payment_id, order_id)
+                continue
+            if changed:
+                confirmed += changed
+                result.confirmed.append(order_id)
+        session.commit()
+
+    if confirmed:
+        bump_seat_version()
+        logger.info("Reconciliation confirmed %d booking(s) across %d order(s)", confirmed, len(result.confirmed))
+
+
+def _pick_payment(payments: list[dict]) -> Optional[dict]:
+    """The captured payment if there is one; a failed one only if every attempt failed."""
+    for payment in payments:
+        if payment.get("status") == "captured":
+            return payment
+    if payments and all(payment.get("status") == "failed" for payment in payments):
+        return payments[-1]
+    return None
+
+
+async def reconcile_pending_orders(limit: Optional[int] = None) -> ReconcileResult:
+    """One reconciliation pass; safe to run concurrently with verify / the webhook worker."""
+    result = ReconcileResult()
+    if not gateway.configured:
+        return result
+    now = datetime.now(timezone.utc)
+    order_ids = await run_in_threadpool(_due_orders, now, limit or settings.RECONCILE_BATCH_SIZE)
+    if not order_ids:
+        return result
+
+    limiter = RateLimiter(settings.RECONCILE_RATE_PER_SECOND)
+    slots = asyncio.Semaphore(max(settings.RECONCILE_CONCURRENCY, 1))
+
+    async def check(order_id: str) -> tuple[str, Optional[dict], bool]:
+        async with slots:
+            await limiter.acquire()
+            try:
+                payments = await gateway.fetch_order_payments(order_id)
+            except GatewayError as exc:
+                logger.warning("Reconciliation could not fetch order %s: %s", order_id, exc)
+                return order_id, None, False
+        return order_id, _pick_payment(payments), True
+
+    outcomes: dict[str, Optional[dict]] = {}
+    for order_id, payment, ok in await asyncio.gather(*(check(order_id) for order_id in order_ids)):
+        if ok:
+            outcomes[order_id] = payment
+        else:
+            result.errors.append(order_id)
+    result.checked = len(outcomes)
+    if outcomes:
+        await run_in_threadpool(_settle, outcomes, now, result)
+    return result
@@ -0,0 +1,217 @@
+"""
+Recurring bookings: "every Mon/Wed 09:00-13:00 for a quarter" stored as one rule.
+
+Occurrences are never written to the database. ``RecurrenceRule.occurrences``
+is a generator that only walks the calendar days overlapping the window being
+asked about, so availability and conflict checks touch a handful of dates
+instead of materialising every occurrence of every rule.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterable, Iterator, Optional, Sequence
+from zoneinfo import ZoneInfo
+
+from sqlmodel import Session, select
+
+from app.models.models import Booking, BookingDuration, BookingStatus, RecurringBooking
+
+_ONE_DAY = timedelta(days=1)
+_INSTANT = timedelta(microseconds=1)
+
+
+@dataclass(frozen=True)
+class RecurrenceRule:
+    weekdays: frozenset[int]          # ISO weekdays, Monday = 1
+    first_date: date
+    last_date: date                   # inclusive
+    start_time: Optional[time]        # local wall-clock; None for daily rules (whole day)
+    end_time: Optional[time]
+    tz: ZoneInfo
+
+    @classmethod
+    def from_model(cls, rule: RecurringBooking) -> "RecurrenceRule":
+        daily = rule.duration_unit == BookingDuration.DAILY
+        return cls(
+            weekdays=parse_weekdays(rule.weekdays),
+            first_date=rule.first_date,
+            last_date=rule.last_date,
+            start_time=None if daily else rule.start_local_time,
+            end_time=None if daily else rule.end_local_time,
+            tz=ZoneInfo(rule.timezone),
+        )
+
+    def window(self, day: date) -> tuple[datetime, datetime]:
+        """UTC [start, end) of the occurrence on ``day`` (whether or not the rule fires that day)."""
+        if self.start_time is None:
+            start = datetime.combine(day, time(0), tzinfo=self.tz)
+            end = datetime.combine(day + _ONE_DAY, time(0), tzinfo=self.tz)
+        else:
+            start = datetime.combine(day, self.start_time, tzinfo=self.tz)
+            end = datetime.combine(day, self.end_time, tzinfo=self.tz)
+        return start.astimezone(timezone.utc), end.astimezone(timezone.utc)
+
+    def occurrences(self, start: datetime, end: datetime) -> Iterator[tuple[datetime, datetime]]:
+        """Occurrences intersecting [start, end), in order, generated on demand."""
+        # An occurrence never spans more than one local day, so the day before
+        # ``start`` is the earliest one that can still reach into the window.
+        day = max(self.first_date, start.astimezone(self.tz).date() - _ONE_DAY)
+        last = min(self.last_date, end.astimezone(self.tz).date())
+        while day <= last:
+            if day.isoweekday() in self.weekdays:
+                occurrence_start, occurrence_end = self.window(day)
+                if occurrence_start < end and occurrence_end > start:
+                    yield occurrence_start, occurrence_end
+            day += _ONE_DAY
+
+    def first_day(self) -> Optional[date]:
+        day = self.first_date
+        for _ in range(7):
+            if day > self.last_date:
+                return None
+            if day.isoweekday() in self.weekdays:
+                return day
+            day += _ONE_DAY
+        return None
+
+    def last_day(self) -> Optional[date]:
+        day = self.last_date
+        for _ in range(7):
+            if day < self.first_date:
+                return None
+            if day.isoweekday() in self.weekdays:
+                return day
+            day -= _ONE_DAY
+        return None
+
+    def count(self) -> int:
+        """Number of occurrences, computed without walking the calendar."""
+        if self.last_date < self.first_date:
+            return 0
+        days = (self.last_date - self.first_date).days + 1
+        full_weeks, remainder = divmod(days, 7)
+        tail = {(self.first_date + timedelta(days=offset)).isoweekday() for offset in range(remainder)}
+        return full_weeks * len(self.weekdays) + len(tail & self.weekdays)
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        return next(self.occurrences(start, end), None) is not None
+
+    def busy_until(self, at: datetime) -> Optional[datetime]:
+        occurrence = next(self.occurrences(at, at + _INSTANT), None)
+        return occurrence[1] if occurrence else None
+
+    def next_start(self, after: datetime) -> Optional[datetime]:
+        last_day = self.last_day()
+        if last_day is None:
+            return None
+        horizon = self.window(last_day)[1]
+        for occurrence_start, _ in self.occurrences(after, horizon):
+            if occurrence_start > after:
+                return occurrence_start
+        return None
+
+
+def parse_weekdays(raw: str) -> frozenset[int]:
+    return frozenset(int(part) for part in raw.split(",") if part.strip())
+
+
+def format_weekdays(weekdays: Iterable[int]) -> str:
+    return ",".join(str(day) for day in sorted(set(weekdays)))
+
+
+class RecurringIndex:
+    """Paid recurring rules per seat, queried the same way as ``SeatIntervalIndex``."""
+    __slots__ = ("_rules",)
+
+    def __init__(self, rules: Iterable[tuple[int, RecurrenceRule]] = ()):
+        self._rules: dict[int, list[RecurrenceRule]] = {}
+        for seat_id, rule in rules:
+            self._rules.setdefault(seat_id, []).append(rule)
+
+    def overlaps(self, seat_id: int, start: datetime, end: datetime) -> bool:
+        return any(rule.overlaps(start, end) for rule in self._rules.get(seat_id, ()))
+
+    def busy_until(self, seat_id: int, at: datetime) -> Optional[datetime]:
+        ends = [end for rule in self._rules.get(seat_id, ()) if (end := rule.busy_until(at)) is not None]
+        return max(ends) if ends else None
+
+    def next_start(self, seat_id: int, after: datetime) -> Optional[datetime]:
+        starts = [start for rule in self._rules.get(seat_id, ()) if (start := rule.next_start(after)) is not None]
+        return min(starts) if starts else None
+
+
+def paid_rules_statement(now: datetime):
+    """Paid recurring rules that still have occurrences ahead (ix_recurringbooking_paid_seat_ends_at)."""
+    return select(RecurringBooking).where(
+        RecurringBooking.status == BookingStatus.PAID,
+        RecurringBooking.ends_at > now,
+    )
+
+
+def load_recurring_index(session: Session, now: datetime) -> RecurringIndex:
+    rules = session.exec(paid_rules_statement(now)).all()
+    return RecurringIndex((rule.seat_id, RecurrenceRule.from_model(rule)) for rule in rules)
+
+
+def recurring_conflicts_statement(windows: Sequence[tuple[int, datetime, datetime]]):
+    """
+    Paid rules on the seats of ``(seat_id, start, end)`` windows whose span
+    reaches into the span of all of them (ix_recurringbooking_paid_seat_ends_at).
+    """
+    return select(RecurringBooking).where(
+        RecurringBooking.seat_id.in_({seat_id for seat_id, _, _ in windows}),
+        RecurringBooking.status == BookingStatus.PAID,
+        RecurringBooking.ends_at > min(start for _, start, _ in windows),
+        RecurringBooking.starts_at < max(end for _, _, end in windows),
+    )
+
+
+def recurring_conflicts(
+    session: Session, windows: Sequence[tuple[int, datetime, datetime]],
+) -> set[int]:
+    """
+    Seats among ``(seat_id, start, end)`` windows on which a paid rule fires
+    inside that seat's window, with one query for all of them.
+    """
+    if not windows:
+        return set()
+    rules = session.exec(recurring_conflicts_statement(windows)).all()
+    index = RecurringIndex((rule.seat_id, RecurrenceRule.from_model(rule)) for rule in rules)
+    return {seat_id for seat_id, start, end in windows if index.overlaps(seat_id, start, end)}
+
+
+def rule_conflicts_in_db(session: Session, rule: RecurringBooking) -> bool:
+    """
+    Does ``rule`` collide with a paid booking or another paid rule on its seat?
+    Only occurrences inside each candidate's own window are generated.
+    """
+    expanded = RecurrenceRule.from_model(rule)
+    windows = session.exec(
+        select(Booking.start_time, Booking.end_time).where(
+            Booking.seat_id == rule.seat_id,
+            Booking.status == BookingStatus.PAID,
+            Booking.end_time.is_not(None),
+            Booking.end_time > rule.starts_at,
+            Booking.start_time < rule.ends_at,
+        )
+    ).all()
+    if any(expanded.overlaps(start, end) for start, end in windows):
+        return True
+
+    others = session.exec(
+        select(RecurringBooking).where(
+            RecurringBooking.seat_id == rule.seat_id,
+            RecurringBooking.status == BookingStatus.PAID,
+            RecurringBooking.id != rule.id,
+            RecurringBooking.ends_at > rule.starts_at,
+            RecurringBooking.starts_at < rule.ends_at,
+        )
+    ).all()
+    for other in others:
+        other_rule = RecurrenceRule.from_model(other)
+        window_start = max(rule.starts_at, other.starts_at)
+        window_end = min(rule.ends_at, other.ends_at)
+        if any(other_rule.overlaps(start, end) for start, end in expanded.occurrences(window_start, window_end)):
+            return True
+    return False
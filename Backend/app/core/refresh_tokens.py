@@ -0,0 +1,134 @@
+"""
+Rotating refresh tokens.
+
+A password login issues a refresh token next to the short-lived access token;
+``POST /auth/refresh`` trades it for a new pair without going near the password
+hasher. Tokens are 256 random bits, so only a plain SHA-256 of each is stored.
+
+Every refresh marks the presented token used and issues its successor in the
+same family. The family keeps the expiry of the login that started it
+(REFRESH_TOKEN_EXPIRE_DAYS), so a user pays one PBKDF2 verification per
+period instead of one per session. A used token that is presented again has
+leaked (or been replayed), so the whole family is revoked.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import secrets
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from uuid import UUID, uuid4
+
+from sqlalchemy import delete, update
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.db.database import engine
+from app.models.models import RefreshToken, User, UserRole
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshTokenError(Exception):
+    """The refresh token is unknown, expired, revoked or has already been used."""
+
+
+class RefreshAccountInactive(RefreshTokenError):
+    """The token is valid but its user has been deactivated."""
+
+
+@dataclass(frozen=True)
+class RefreshedSession:
+    email: str
+    role: UserRole
+    refresh_token: str
+
+
+def _digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_refresh_token(
+    session: Session,
+    user_id: UUID,
+    family_id: Optional[UUID] = None,
+    expires_at: Optional[datetime] = None,
+) -> str:
+    """Add a new token to the caller's transaction; starts a family unless one is given."""
+    token = secrets.token_urlsafe(32)
+    if expires_at is None:
+        expires_at = datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    session.add(RefreshToken(
+        token_hash=_digest(token),
+        user_id=user_id,
+        family_id=family_id or uuid4(),
+        expires_at=expires_at,
+    ))
+    return token
+
+
+def _revoke_family(session: Session, family_id: UUID, now: datetime) -> None:
+    session.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now)
+    )
+
+
+def rotate_refresh_token(session: Session, token: str) -> RefreshedSession:
+    """
+    Exchange ``token`` for its successor and commit. The row is locked, so of two
+    concurrent refreshes with the same token one wins and the other counts as reuse.
+    """
+    now = datetime.now(timezone.utc)
+    row = session.exec(
+        select(RefreshToken, User.email, User.role, User.is_active)
+        .join(User, User.id == RefreshToken.user_id)
+        .where(RefreshToken.token_hash == _digest(token))
+        .with_for_update(of=RefreshToken)
+    ).first()
+    if row is None:
+        raise RefreshTokenError()
+    record, email, role, is_active = row
+
+    if record.revoked_at is not None or record.expires_at <= now:
+        raise RefreshTokenError()
+    if record.used_at is not None:
+        _revoke_family(session, record.family_id, now)
+        session.commit()
+        logger.warning("Refresh token reused for user %s; revoked family %s", record.user_id, record.family_id)
+        raise RefreshTokenError()
+    if not is_active:
+        _revoke_family(session, record.family_id, now)
+        session.commit()
+        raise RefreshAccountInactive()
+
+    record.used_at = now
+    session.add(record)
+    successor = issue_refresh_token(session, record.user_id, record.family_id, record.expires_at)
+    session.commit()
+    return RefreshedSession(email=email, role=role, refresh_token=successor)
+
+
+def revoke_refresh_token(session: Session, token: str) -> bool:
+    """Revoke the family ``token`` belongs to (logout); False if the token is unknown."""
+    family_id = session.exec(
+        select(RefreshToken.family_id).where(RefreshToken.token_hash == _digest(token))
+    ).first()
+    if family_id is None:
+        return False
+    _revoke_family(session, family_id, datetime.now(timezone.utc))
+    session.commit()
+    return True
+
+
+def purge_expired_refresh_tokens(limit: int = 1000) -> int:
+    """Delete up to ``limit`` expired tokens; returns how many were removed."""
+    now = datetime.now(timezone.utc)
+    with Session(engine) as session:
+        ids = select(RefreshToken.id).where(RefreshToken.expires_at <= now).limit(limit)
+        result = session.execute(delete(RefreshToken).where(RefreshToken.id.in_(ids)))
+        session.commit()
+        return result.rowcount or 0
@@ -0,0 +1,148 @@
+"""
+Revenue ledger (``RevenueDaily``): completed payments pre-aggregated per local
+day, seat type, duration unit and section.
+
+Works like the occupancy rollup: the statement that flags
+``payment.revenue_recorded`` feeds the upsert, so a payment is counted exactly
+once whether it was written by ``verify_payment``, the webhook worker, the
+reconciler or the backfill. Reports only ever read the aggregate rows of the
+requested days, never ``payment`` or ``booking``.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import date
+from typing import Iterable, Optional, Sequence
+from uuid import UUID
+
+import sqlalchemy
+from sqlmodel import Session, func, select
+
+from app.core.config import settings
+from app.db.database import engine
+from app.models.models import Payment, PaymentStatus, RevenueDaily
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ("day", "seat_type", "duration_unit", "section")
+
+# payment.created_at is a naive UTC timestamp; enums are stored by member name
+_CLAIM_AND_UPSERT = """
+    WITH claimed AS (
+        UPDATE payment SET revenue_recorded = true
+        WHERE {where}
+          AND status = 'COMPLETED'
+          AND NOT revenue_recorded
+        RETURNING booking_id, recurring_booking_id, amount, created_at
+    )
+    INSERT INTO revenuedaily (day, seat_type, duration_unit, section, amount, payments)
+    SELECT CAST(timezone(:tz, timezone('UTC', c.created_at)) AS date),
+           s.type,
+           COALESCE(CAST(b.duration_unit AS text), CAST(r.duration_unit AS text)),
+           s.section,
+           SUM(c.amount),
+           COUNT(*)
+    FROM claimed c
+    LEFT JOIN booking b ON b.id = c.booking_id
+    LEFT JOIN recurringbooking r ON r.id = c.recurring_booking_id
+    JOIN seat s ON s.id = COALESCE(b.seat_id, r.seat_id)
+    GROUP BY 1, 2, 3, 4
+    ON CONFLICT (day, seat_type, duration_unit, section) DO UPDATE
+        SET amount = revenuedaily.amount + EXCLUDED.amount,
+            payments = revenuedaily.payments + EXCLUDED.payments
+"""
+_RECORD_SQL = sqlalchemy.text(_CLAIM_AND_UPSERT.format(where="id = ANY(CAST(:payment_ids AS uuid[]))"))
+_RECORD_ALL_SQL = sqlalchemy.text(_CLAIM_AND_UPSERT.format(where="true"))
+
+
+def record_revenue(session: Session, payment_ids: Iterable[UUID | str]) -> int:
+    """
+    Add completed payments to the ledger inside the caller's transaction.
+    Returns the number of ledger rows touched.
+    """
+    ids = [str(payment_id) for payment_id in payment_ids]
+    if not ids:
+        return 0
+    session.flush()
+    result = session.execute(_RECORD_SQL, {"payment_ids": ids, "tz": settings.ANALYTICS_TIMEZONE})
+    return result.rowcount or 0
+
+
+def backfill_revenue(chunk_size: int = 1000, max_chunks: Optional[int] = None) -> tuple[int, bool]:
+    """
+    Fold payments not yet in the ledger into it, one committed chunk at a time.
+    Returns ``(payments_processed, more_remaining)``.
+    """
+    processed = 0
+    chunks = 0
+    while max_chunks is None or chunks < max_chunks:
+        with Session(engine) as session:
+            ids = session.exec(
+                select(Payment.id)
+                .where(Payment.status == PaymentStatus.COMPLETED, Payment.revenue_recorded == False)  # noqa: E712
+                .order_by(Payment.id)
+                .limit(chunk_size)
+            ).all()
+            if not ids:
+                return processed, False
+            record_revenue(session, ids)
+            session.commit()
+        processed += len(ids)
+        chunks += 1
+        logger.info("Revenue backfill: %d payments so far", processed)
+    return processed, True
+
+
+def rebuild_revenue() -> int:
+    """
+    Recompute the whole ledger from ``payment`` in one transaction. Concurrent
+    confirmations wait on the table lock, so nothing is lost or counted twice.
+    Returns the number of ledger rows written.
+    """
+    with Session(engine) as session:
+        session.execute(sqlalchemy.text("LOCK TABLE revenuedaily IN EXCLUSIVE MODE"))
+        session.execute(sqlalchemy.delete(RevenueDaily))
+        session.execute(sqlalchemy.update(Payment).values(revenue_recorded=False))
+        result = session.execute(_RECORD_ALL_SQL, {"tz": settings.ANALYTICS_TIMEZONE})
+        session.commit()
+    rows = result.rowcount or 0
+    logger.info("Revenue ledger rebuilt: %d rows", rows)
+    return rows
+
+
+def revenue_report(
+    session: Session,
+    start: date,
+    end: date,
+    group_by: Sequence[str] = ("day",),
+    seat_type: Optional[str] = None,
+    duration_unit: Optional[str] = None,
+    section: Optional[str] = None,
+) -> list[dict]:
+    """
+    Totals over the inclusive day range ``[start, end]``, grouped by any of
+    ``DIMENSIONS``. Reads at most one ledger row per day and booking kind.
+    """
+    columns = [getattr(RevenueDaily, dimension) for dimension in group_by]
+    filters = [RevenueDaily.day >= start, RevenueDaily.day <= end]
+    if seat_type:
+        filters.append(RevenueDaily.seat_type == seat_type)
+    if duration_unit:
+        filters.append(RevenueDaily.duration_unit == duration_unit)
+    if section:
+        filters.append(RevenueDaily.section == section)
+
+    rows = session.exec(
+        select(*columns, func.sum(RevenueDaily.amount), func.sum(RevenueDaily.payments))
+        .where(*filters)
+        .group_by(*columns)
+        .order_by(*columns)
+    ).all()
+    report = []
+    for row in rows:
+        *keys, amount, payments = row
+        line = dict(zip(group_by, keys))
+        line["amount"] = round(float(amount or 0), 2)
+        line["payments"] = int(payments or 0)
+        report.append(line)
+    return report
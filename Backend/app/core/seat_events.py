@@ -0,0 +1,184 @@
+"""
+Seat state change fan-out for the ``GET /seats/stream`` Server-Sent Events endpoint.
+
+A single broadcaster task per process wakes up when the availability version
+is bumped or when the next booking / lock boundary in the snapshot passes,
+diffs the new snapshot against the last one it published, encodes the diff
+once and hands the same bytes to every subscriber queue.
+
+Subscriber queues are bounded. A consumer that falls behind has its backlog
+dropped and receives a single ``resync`` event instead, telling the client to
+re-fetch ``/seats`` — one slow browser never holds memory for everyone else.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core import availability
+from app.core.availability import AvailabilitySnapshot
+from app.core.config import settings
+from app.db.database import engine
+
+logger = logging.getLogger(__name__)
+
+_RESYNC = b"event: resync\ndata: {}\n\n"
+_HEARTBEAT = b": ping\n\n"
+
+
+class SubscriberLimitReached(Exception):
+    pass
+
+
+_SeatView = tuple[bool, Optional[datetime], Optional[datetime]]
+
+
+def _seat_view(snapshot: AvailabilitySnapshot) -> dict[int, _SeatView]:
+    """Same availability semantics as ``GET /seats``."""
+    return {seat.id: (seat.is_free, seat.booked_until, seat.held_until) for seat in snapshot.seats}
+
+
+def _encode_diff(sequence: int, changes: list[dict]) -> bytes:
+    data = json.dumps(changes, separators=(",", ":"))
+    return f"id: {sequence}\nevent: seats\ndata: {data}\n\n".encode()
+
+
+class SeatEventBroadcaster:
+    def __init__(self, max_subscribers: int, queue_size: int):
+        self._max_subscribers = max_subscribers
+        self._queue_size = queue_size
+        self._subscribers: set[asyncio.Queue[bytes]] = set()
+        self._wake = asyncio.Event()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task | None = None
+        self._last_view: dict[int, _SeatView] | None = None
+        self._next_boundary: datetime | None = None
+        self._sequence = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    # ── lifecycle ────────────────────────────────────────────────────────────
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        availability.add_version_listener(self._on_version_bump)
+        self._task = asyncio.create_task(self._run(), name="seat-event-broadcaster")
+
+    async def stop(self) -> None:
+        availability.remove_version_listener(self._on_version_bump)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _on_version_bump(self, _version: int) -> None:
+        # Called from request threadpool workers after a commit
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    # ── subscribers ──────────────────────────────────────────────────────────
+
+    def subscribe(self) -> asyncio.Queue[bytes]:
+        if len(self._subscribers) >= self._max_subscribers:
+            raise SubscriberLimitReached()
+        queue: asyncio.Queue[bytes] = asyncio.Queue(maxsize=self._queue_size)
+        self._subscribers.add(queue)
+        if len(self._subscribers) == 1:
+            # First listener: establish a baseline to diff against
+            self._wake.set()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue[bytes]) -> None:
+        self._subscribers.discard(queue)
+        if not self._subscribers:
+            self._last_view = None
+
+    def publish(self, message: bytes) -> None:
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Backpressure: drop this consumer's backlog and ask it to re-fetch
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(_RESYNC)
+
+    # ── diff loop ────────────────────────────────────────────────────────────
+
+    def _timeout(self) -> float | None:
+        if self._next_boundary is None or not self._subscribers:
+            return None
+        # Small margin so the snapshot is already stale when we look at it
+        return max(0.0, (self._next_boundary - datetime.now(timezone.utc)).total_seconds()) + 0.05
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self._timeout())
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if not self._subscribers:
+                continue
+            try:
+                snapshot = await run_in_threadpool(self._load_snapshot)
+                self._diff_and_publish(snapshot)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Seat event broadcast failed: %s", exc)
+                await asyncio.sleep(1)
+
+    @staticmethod
+    def _load_snapshot() -> AvailabilitySnapshot:
+        with Session(engine) as session:
+            return availability.get_snapshot(session)
+
+    def _diff_and_publish(self, snapshot: AvailabilitySnapshot) -> None:
+        self._next_boundary = snapshot.expires_at
+        view = _seat_view(snapshot)
+        previous = self._last_view
+        self._last_view = view
+        if previous is None:
+            return
+
+        changes = [
+            {
+                "id": seat_id,
+                "available": available,
+                "locked_until": locked_until.isoformat() if locked_until else None,
+                "held_until": held_until.isoformat() if held_until else None,
+            }
+            for seat_id, (available, locked_until, held_until) in view.items()
+            if previous.get(seat_id) != (available, locked_until, held_until)
+        ]
+        if changes:
+            self._sequence += 1
+            self.publish(_encode_diff(self._sequence, changes))
+
+    async def stream(self, queue: asyncio.Queue[bytes]) -> AsyncIterator[bytes]:
+        """
+        Yield SSE frames for one subscriber until the client goes away. The
+        caller unsubscribes the queue once the response is over.
+        """
+        yield f"retry: {settings.SEAT_STREAM_RETRY_MS}\n\n".encode()
+        while True:
+            try:
+                yield await asyncio.wait_for(queue.get(), timeout=settings.SEAT_STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield _HEARTBEAT
+
+
+broadcaster = SeatEventBroadcaster(
+    max_subscribers=settings.SEAT_STREAM_MAX_SUBSCRIBERS,
+    queue_size=settings.SEAT_STREAM_QUEUE_SIZE,
+)
@@ -0,0 +1,226 @@
+"""
+Inbox for Razorpay webhook deliveries.
+
+``POST /payment/webhook`` only verifies the signature and appends the raw event
+here (``record_event``), so Razorpay gets its 200 at once and a redelivered
+event is dropped by the primary key. ``WebhookInboxWorker`` drains the inbox
+in batches claimed with ``FOR UPDATE SKIP LOCKED`` — several API processes can
+share the work — and applies each batch in one transaction: all failed
+payments with a single UPDATE, each captured order in its own savepoint so one
+bad order does not hold back the rest.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import sqlalchemy
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, func, select
+from starlette.concurrency import run_in_threadpool
+
+from app.core.availability import bump_seat_version
+from app.core.config import settings
+from app.core.confirmation import SeatConflictError, confirm_captured_order, mark_orders_failed
+from app.db.database import engine, is_exclusion_violation
+from app.models.models import WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+
+def event_id_for(header_value: Optional[str], body: bytes) -> str:
+    """Razorpay's ``x-razorpay-event-id``; identical bodies dedupe if the header is missing."""
+    return header_value or hashlib.sha256(body).hexdigest()
+
+
+def record_event(event_id: str, event: str, body: bytes) -> bool:
+    """Append a verified delivery to the inbox. Returns False if it was already there."""
+    with Session(engine) as session:
+        result = session.execute(
+            pg_insert(WebhookEvent.__table__)
+            .values(
+                event_id=event_id,
+                event=event,
+                payload=body.decode("utf-8"),
+                received_at=datetime.now(timezone.utc),
+                attempts=0,
+            )
+            .on_conflict_do_nothing(index_elements=["event_id"])
+        )
+        session.commit()
+    return bool(result.rowcount)
+
+
+def _payment_refs(payload: str) -> tuple[Optional[str], Optional[str]]:
+    try:
+        entity = json.loads(payload)["payload"]["payment"]["entity"]
+    except (ValueError, KeyError, TypeError):
+        return None, None
+    return entity.get("order_id"), entity.get("id")
+
+
+def process_batch(limit: Optional[int] = None) -> int:
+    """Apply up to ``limit`` unprocessed events, oldest first. Returns how many were claimed."""
+    limit = limit or settings.WEBHOOK_BATCH_SIZE
+    now = datetime.now(timezone.utc)
+    errors: dict[str, str] = {}
+    confirmed = 0
+
+    with Session(engine) as session:
+        events = session.exec(
+            select(WebhookEvent)
+            .where(WebhookEvent.processed_at.is_(None), WebhookEvent.attempts < settings.WEBHOOK_MAX_ATTEMPTS)
+            .order_by(WebhookEvent.received_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not events:
+            return 0
+
+        captured: dict[str, tuple[str, str]] = {}     # order_id -> (payment_id, event_id)
+        failed: set[str] = set()
+        for event in events:
+            order_id, payment_id = _payment_refs(event.payload)
+            if not order_id:
+                continue
+            if event.event == "payment.captured":
+                captured[order_id] = (payment_id, event.event_id)
+            elif event.event == "payment.failed":
+                failed.add(order_id)
+
+        # A failed attempt followed by a successful retry in the same batch: the capture wins
+        mark_orders_failed(session, sorted(failed - captured.keys()))
+
+        for order_id, (payment_id, event_id) in captured.items():
+            try:
+                with session.begin_nested():
+                    confirmed += confirm_captured_order(session, order_id, payment_id, now)
+            except (SeatConflictError, IntegrityError) as exc:
+                if isinstance(exc, IntegrityError) and not is_exclusion_violation(exc):
+                    errors[event_id] = repr(exc)[:500]
+                    continue
+                # Acknowledge the event but leave the order unconfirmed
+                mark_orders_failed(session, [order_id])
+                logger.error("Webhook payment %s for order %s overlaps a paid booking — refund needed", payment_id, order_id)
+            except Exception as exc:  # noqa: BLE001
+                errors[event_id] = repr(exc)[:500]
+
+        done = [event.event_id for event in events if event.event_id not in errors]
+        if done:
+            session.execute(
+                sqlalchemy.update(WebhookEvent)
+                .where(WebhookEvent.event_id.in_(done))
+                .values(processed_at=now, attempts=WebhookEvent.attempts + 1, last_error=None)
+                .execution_options(synchronize_session=False)
+            )
+        for event_id, error in errors.items():
+            logger.warning("Webhook event %s failed: %s", event_id, error)
+            session.execute(
+                sqlalchemy.update(WebhookEvent)
+                .where(WebhookEvent.event_id == event_id)
+                .values(attempts=WebhookEvent.attempts + 1, last_error=error)
+                .execution_options(synchronize_session=False)
+            )
+        session.commit()
+
+    if confirmed:
+        bump_seat_version()
+        logger.info("Webhook inbox confirmed %d booking(s)", confirmed)
+    return len(events)
+
+
+def purge_processed_events() -> int:
+    """Delete applied events older than WEBHOOK_RETENTION_DAYS."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.WEBHOOK_RETENTION_DAYS)
+    with Session(engine) as session:
+        result = session.execute(
+            sqlalchemy.delete(WebhookEvent).where(WebhookEvent.processed_at < cutoff)
+        )
+        session.commit()
+    return result.rowcount or 0
+
+
+@dataclass
+class InboxMetrics:
+    pending: int                          # waiting to be applied
+    dead_letter: int                      # gave up after WEBHOOK_MAX_ATTEMPTS
+    oldest_pending_at: Optional[datetime]
+    lag_seconds: float                    # age of the oldest pending event
+    processed_last_hour: int
+    avg_processing_seconds: Optional[float]   # received -> applied, last hour
+    max_processing_seconds: Optional[float]
+
+
+def inbox_metrics(session: Session, now: Optional[datetime] = None) -> InboxMetrics:
+    now = now or datetime.now(timezone.utc)
+    live = WebhookEvent.attempts < settings.WEBHOOK_MAX_ATTEMPTS
+    pending, dead_letter, oldest = session.exec(
+        select(
+            func.count().filter(live),
+            func.count().filter(sqlalchemy.not_(live)),
+            func.min(WebhookEvent.received_at).filter(live),
+        ).where(WebhookEvent.processed_at.is_(None))
+    ).one()
+
+    delay = func.extract("epoch", WebhookEvent.processed_at - WebhookEvent.received_at)
+    processed, avg_delay, max_delay = session.exec(
+        select(func.count(), func.avg(delay), func.max(delay))
+        .where(WebhookEvent.processed_at >= now - timedelta(hours=1))
+    ).one()
+
+    return InboxMetrics(
+        pending=pending,
+        dead_letter=dead_letter,
+        oldest_pending_at=oldest,
+        lag_seconds=max((now - oldest).total_seconds(), 0.0) if oldest else 0.0,
+        processed_last_hour=processed,
+        avg_processing_seconds=float(avg_delay) if avg_delay is not None else None,
+        max_processing_seconds=float(max_delay) if max_delay is not None else None,
+    )
+
+
+class WebhookInboxWorker:
+    """Drains the inbox; woken immediately by local deliveries, polls for the rest."""
+
+    def __init__(self) -> None:
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="webhook-inbox")
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                claimed = await run_in_threadpool(process_batch)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Webhook inbox batch failed: %s", exc)
+                claimed = 0
+            if claimed >= settings.WEBHOOK_BATCH_SIZE:
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=settings.WEBHOOK_POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+
+inbox_worker = WebhookInboxWorker()
@@ -0,0 +1,133 @@
+"""
+Memory and latency of the admin listings: full ORM entities vs projections.
+
+Seeds ``--users`` synthetic users (a ``--document-share`` of them still carrying
+an inline base64 KYC document of ``--document-kb``, as rows from before the
+blob store do) and ``--bookings`` cancelled bookings inside a transaction.
+Each listing is then run both ways:
+
+- entities: ``select(User)`` / ``select(Booking, User, Seat)``, as the
+  endpoints used to
+- projection: the ``app.core.admin_views`` read models the endpoints use now
+
+It prints the median time and the tracemalloc peak for each, and rolls
+everything back at the end.
+
+    python -m app.db.admin_listing_benchmark
+    python -m app.db.admin_listing_benchmark --users 100000 --document-share 0.2 --repeat 5
+
+Times cover the query and row mapping only, not response serialisation.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+import tracemalloc
+from typing import Callable
+
+import sqlalchemy
+from sqlmodel import Session, select
+
+from app.core.admin_views import list_bookings, list_kyc, list_users
+from app.db.bench_fixtures import column_type, refuse_in_production, seed_seats, seed_users
+from app.db.database import engine, init_db
+from app.models.models import Booking, Seat, User
+
+
+def _seed(conn: sqlalchemy.Connection, users: int, bookings: int, document_share: float, document_kb: int) -> None:
+    every = max(int(round(1 / document_share)), 1) if document_share > 0 else 0
+    user_ids = seed_users(conn, users, "Admin Bench", document_every=every, document_kb=document_kb)
+    seat_ids = seed_seats(conn, 100, "Admin Bench")
+    conn.execute(
+        sqlalchemy.text(f"""
+            INSERT INTO booking (id, user_id, seat_id, booking_date, status, duration_unit,
+                                 duration_quantity, price_amount, start_time, end_time, created_at, payment_status)
+            SELECT gen_random_uuid(),
+                   (CAST(:user_ids AS uuid[]))[1 + g % cardinality(CAST(:user_ids AS uuid[]))],
+                   (CAST(:seat_ids AS int[]))[1 + g % 100],
+                   now(), CAST('CANCELLED' AS {column_type(conn, "booking", "status")}),
+                   CAST('DAILY' AS {column_type(conn, "booking", "duration_unit")}),
+                   1, 500, now(), now() + interval '1 day', now(), 'failed'
+            FROM generate_series(1, :n) g
+        """),
+        {"user_ids": [str(u) for u in user_ids], "seat_ids": list(seat_ids), "n": bookings},
+    )
+    conn.execute(sqlalchemy.text('ANALYZE "user"'))
+    conn.execute(sqlalchemy.text("ANALYZE booking"))
+
+
+# The endpoints before projections, kept here for comparison
+def _users_entities(session: Session) -> list:
+    return [
+        (str(u.id), u.full_name, u.email, u.role.value, u.is_active, u.created_at)
+        for u in session.exec(select(User)).all()
+    ]
+
+
+def _kyc_entities(session: Session) -> list:
+    return [
+        (str(u.id), u.full_name, u.email, u.kyc_document_name, bool(u.kyc_document_key or u.kyc_document_data))
+        for u in session.exec(select(User)).all()
+    ]
+
+
+def _bookings_entities(session: Session) -> list:
+    return [
+        (str(b.id), u.full_name, u.email, f"{u.gov_id_type}: {u.gov_id_number}", s.code, b.status.value)
+        for b, u, s in session.exec(select(Booking, User, Seat).join(User).join(Seat)).all()
+    ]
+
+
+def _measure(conn: sqlalchemy.Connection, listing: Callable[[Session], list], repeat: int) -> tuple[float, float, int]:
+    """(median ms, peak MiB, rows) over ``repeat`` runs, each in a fresh session."""
+    timings = []
+    peak = 0
+    rows = 0
+    for _ in range(repeat):
+        with Session(bind=conn, join_transaction_mode="create_savepoint") as session:
+            tracemalloc.start()
+            started = time.perf_counter()
+            rows = len(listing(session))
+            timings.append((time.perf_counter() - started) * 1000)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    return statistics.median(timings), peak / (1024 * 1024), rows
+
+
+def run(args: argparse.Namespace) -> None:
+    init_db()
+    cases = [
+        ("GET /admin/users", _users_entities, list_users),
+        ("GET /admin/kyc", _kyc_entities, list_kyc),
+        ("GET /admin/bookings", _bookings_entities, list_bookings),
+    ]
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            _seed(conn, args.users, args.bookings, args.document_share, args.document_kb)
+            print(f"{'listing':<20} {'mode':<11} {'rows':>8} {'median ms':>10} {'peak MiB':>9}")
+            for label, entities, projection in cases:
+                for mode, listing in (("entities", entities), ("projection", projection)):
+                    median_ms, peak_mib, rows = _measure(conn, listing, args.repeat)
+                    print(f"{label:<20} {mode:<11} {rows:>8} {median_ms:>10.1f} {peak_mib:>9.1f}")
+        finally:
+            trans.rollback()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--bookings", type=int, default=100_000)
+    parser.add_argument("--document-share", type=float, default=0.1, help="share of users with an inline document")
+    parser.add_argument("--document-kb", type=int, default=32, help="size of each inline document")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--force", action="store_true", help="allow running with ENVIRONMENT=production")
+    args = parser.parse_args()
+
+    refuse_in_production(args.force)
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Synthetic rows for the ``app.db`` benchmarks and the plan check.
+
+Every helper writes through the caller's connection, so the rows live and die
+with the caller's transaction (normally rolled back at the end). Users get
+``@example.invalid`` addresses and seats get their own section, so nothing
+seeded here can be mistaken for real data.
+"""
+from __future__ import annotations
+
+import sys
+from uuid import uuid4
+
+import sqlalchemy
+
+from app.core.config import settings
+
+
+def refuse_in_production(force: bool) -> None:
+    """Exit unless ``--force`` was given when ENVIRONMENT=production."""
+    if settings.ENVIRONMENT == "production" and not force:
+        sys.exit("Refusing to seed synthetic rows in production (pass --force to override).")
+
+
+def column_type(conn: sqlalchemy.Connection, table: str, column: str) -> str:
+    """SQL type of a column, for casting enum literals (native enums or VARCHAR, depending on the database)."""
+    return conn.execute(
+        sqlalchemy.text(
+            "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+            "WHERE attrelid = CAST(:table AS regclass) AND attname = :column"
+        ),
+        {"table": table, "column": column},
+    ).scalar_one()
+
+
+def seed_users(
+    conn: sqlalchemy.Connection, count: int, label: str, document_every: int = 0, document_kb: int = 0,
+) -> list:
+    """
+    Insert ``count`` throwaway users named "<label> <n>"; returns their ids.
+    Every ``document_every``-th one carries an inline base64 KYC document
+    of ``document_kb`` KiB, as rows from before the blob store do.
+    """
+    slug = "-".join(label.lower().split())
+    role_type = column_type(conn, '"user"', "role")
+    return conn.execute(
+        sqlalchemy.text(
+            'INSERT INTO "user" (id, email, full_name, role, gov_id_type, gov_id_number, '
+            "hashed_password, is_active, created_at, mobile, kyc_document_name, kyc_document_data) "
+            "SELECT gen_random_uuid(), :slug || '-' || :run_id || '-' || g || '@example.invalid', "
+            f":label || ' ' || g, CAST('USER' AS {role_type}), "
+            "'PAN', 'BENCH' || g, 'x', true, now(), '9000000000', "
+            "CASE WHEN :every > 0 AND g % :every = 0 THEN 'id.png' END, "
+            "CASE WHEN :every > 0 AND g % :every = 0 "
+            "     THEN 'data:image/png;base64,' || repeat('QUJD', :quads) END "
+            "FROM generate_series(1, :n) g RETURNING id"
+        ),
+        {
+            "slug": slug, "run_id": uuid4().hex[:8], "label": label, "n": count,
+            "every": document_every, "quads": document_kb * 256,
+        },
+    ).scalars().all()
+
+
+def seed_seats(conn: sqlalchemy.Connection, count: int, section: str) -> list[int]:
+    """Insert ``count`` free workstations in ``section``; returns their ids in ascending order."""
+    prefix = "".join(word[:4] for word in section.upper().split())
+    seat_ids = conn.execute(
+        sqlalchemy.text(
+            "INSERT INTO seat (code, section, price, is_available, type) "
+            "SELECT :prefix || '-' || :run_id || '-' || g, :section, 0, true, 'workstation' "
+            "FROM generate_series(1, :n) g RETURNING id"
+        ),
+        {"prefix": prefix, "run_id": uuid4().hex[:8], "section": section, "n": count},
+    ).scalars().all()
+    return sorted(seat_ids)
+
+
+def seed_bench_rows(conn: sqlalchemy.Connection, seats: int, label: str = "Checkout Bench") -> tuple[object, list[int]]:
+    """Insert one throwaway user and ``seats`` free workstations; returns their ids."""
+    (user_id,) = seed_users(conn, 1, label)
+    return user_id, seed_seats(conn, seats, label)
@@ -0,0 +1,78 @@
+"""
+Latency of opening a checkout as the number of seats grows.
+
+Seeds synthetic seats and a user inside a transaction, then times
+``open_checkout`` (seat lookup, conflict check, holds, bulk booking insert and
+order attach — everything except the gateway call) for each batch size and
+counts the SQL statements it issued. Everything is rolled back at the end.
+
+    python -m app.db.checkout_benchmark
+    python -m app.db.checkout_benchmark --sizes 1 50 500 --repeat 5
+
+Statement count should be identical for every size and latency roughly flat.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+
+from sqlalchemy import event
+from sqlmodel import Session
+
+from app.core.checkout import attach_order, open_checkout
+from app.core.config import settings
+from app.db.bench_fixtures import refuse_in_production, seed_bench_rows
+from app.db.database import engine, init_db
+from app.models.models import BookingDuration
+
+
+def run(sizes: list[int], repeat: int) -> None:
+    init_db()
+    statements = 0
+
+    def count(*_args) -> None:
+        nonlocal statements
+        statements += 1
+
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            user_id, seat_ids = seed_bench_rows(conn, sum(sizes) * repeat)
+            event.listen(conn, "before_cursor_execute", count)
+            print(f"{'seats':>6} {'median ms':>10} {'max ms':>8} {'statements':>11}")
+            cursor = 0
+            for size in sizes:
+                timings = []
+                for _ in range(repeat):
+                    batch = seat_ids[cursor:cursor + size]
+                    cursor += size
+                    with Session(bind=conn, join_transaction_mode="create_savepoint") as session:
+                        statements = 0
+                        started = time.perf_counter()
+                        checkout = open_checkout(session, user_id, batch, BookingDuration.DAILY, 1)
+                        attach_order(session, checkout.booking_ids, f"order_bench_{cursor}")
+                        session.commit()
+                        timings.append((time.perf_counter() - started) * 1000)
+                print(f"{size:>6} {statistics.median(timings):>10.1f} {max(timings):>8.1f} {statements:>11}")
+            event.remove(conn, "before_cursor_execute", count)
+        finally:
+            trans.rollback()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50, 100, 250, 500])
+    parser.add_argument("--repeat", type=int, default=3, help="checkouts per size")
+    parser.add_argument("--force", action="store_true", help="allow running with ENVIRONMENT=production")
+    args = parser.parse_args()
+
+    refuse_in_production(args.force)
+    if max(args.sizes) > settings.BULK_BOOKING_MAX_SEATS:
+        sys.exit(f"Sizes above BULK_BOOKING_MAX_SEATS ({settings.BULK_BOOKING_MAX_SEATS}) are rejected by the API.")
+    run(args.sizes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Cost of confirming a paid order as the number of seats grows.
+
+For each order size, opens a checkout on synthetic seats (not measured) and
+then times what ``POST /payment/verify`` does once the signature checks out:
+load the order's bookings and ``confirm_bookings`` them, committed. The SQL
+statements issued are counted; everything is rolled back at the end.
+
+    python -m app.db.confirm_benchmark
+    python -m app.db.confirm_benchmark --sizes 1 50 --repeat 5
+
+Exits non-zero if the statement count differs between sizes or exceeds
+``--max-statements``, so a per-seat query sneaking back in fails loudly.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+
+from sqlalchemy import event
+from sqlmodel import Session
+
+from app.core.checkout import attach_order, open_checkout
+from app.core.config import settings
+from app.core.confirmation import confirm_bookings, order_bookings_statement
+from app.db.bench_fixtures import refuse_in_production, seed_bench_rows
+from app.db.database import engine, init_db
+from app.models.models import Booking, BookingDuration
+
+# SAVEPOINT, bookings, seat lock, paid conflicts, recurring conflicts, existing
+# payments, UPDATE, Payment INSERT, revenue ledger, occupancy rollup, hold
+# release, RELEASE
+STATEMENT_BUDGET = 12
+
+
+def run(sizes: list[int], repeat: int, max_statements: int) -> bool:
+    init_db()
+    statements = 0
+    counts: dict[int, int] = {}
+
+    def count(*_args) -> None:
+        nonlocal statements
+        statements += 1
+
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            user_id, seat_ids = seed_bench_rows(conn, sum(sizes) * repeat)
+            event.listen(conn, "before_cursor_execute", count)
+            print(f"{'seats':>6} {'median ms':>10} {'max ms':>8} {'statements':>11}")
+            cursor = 0
+            for size in sizes:
+                timings = []
+                for _ in range(repeat):
+                    batch = seat_ids[cursor:cursor + size]
+                    cursor += size
+                    order_id = f"order_confirm_bench_{cursor}"
+                    with Session(bind=conn, join_transaction_mode="create_savepoint") as session:
+                        checkout = open_checkout(session, user_id, batch, BookingDuration.DAILY, 1)
+                        attach_order(session, checkout.booking_ids, order_id)
+                        session.commit()
+                    with Session(bind=conn, join_transaction_mode="create_savepoint") as session:
+                        statements = 0
+                        started = time.perf_counter()
+                        bookings = session.exec(order_bookings_statement(order_id)).all()
+                        confirmed = confirm_bookings(session, bookings, f"pay_confirm_bench_{cursor}")
+                        session.commit()
+                        timings.append((time.perf_counter() - started) * 1000)
+                    if len(confirmed) != size:
+                        sys.exit(f"Expected {size} confirmed bookings, got {len(confirmed)}")
+                counts[size] = statements
+                print(f"{size:>6} {statistics.median(timings):>10.1f} {max(timings):>8.1f} {statements:>11}")
+            event.remove(conn, "before_cursor_execute", count)
+        finally:
+            trans.rollback()
+
+    ok = True
+    if len(set(counts.values())) > 1:
+        print(f"FAIL: statement count depends on order size: {counts}")
+        ok = False
+    if max(counts.values()) > max_statements:
+        print(f"FAIL: {max(counts.values())} statements per confirmation, budget is {max_statements}")
+        ok = False
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--repeat", type=int, default=3, help="orders per size")
+    parser.add_argument("--max-statements", type=int, default=STATEMENT_BUDGET)
+    parser.add_argument("--force", action="store_true", help="allow running with ENVIRONMENT=production")
+    args = parser.parse_args()
+
+    refuse_in_production(args.force)
+    if max(args.sizes) > settings.BULK_BOOKING_MAX_SEATS:
+        sys.exit(f"Sizes above BULK_BOOKING_MAX_SEATS ({settings.BULK_BOOKING_MAX_SEATS}) are rejected by the API.")
+    if not run(args.sizes, args.repeat, args.max_statements):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,56 +1,185 @@
 import logging
 
 import sqlalchemy
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import create_engine, SQLModel, Session, select
 
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    echo=settings.SQL_ECHO,
-    pool_pre_ping=True,
-    connect_args={"sslmode": "require"} if "neon.tech" in (settings.DATABASE_URL or "") else {},
-)
+def create_db_engine(**pool_options):
+    """An engine for DATABASE_URL; ``pool_options`` (pool_size, max_overflow, ...) go to create_engine."""
+    return create_engine(
+        settings.DATABASE_URL,
+        echo=settings.SQL_ECHO,
+        pool_pre_ping=True,
+        connect_args={"sslmode": "require"} if "neon.tech" in (settings.DATABASE_URL or "") else {},
+        **pool_options,
+    )
+
+
+engine = create_db_engine()
 
 
 def init_db():
-    _run_migrations()
+    _run_migrations(_PRE_CREATE_MIGRATIONS)
     SQLModel.metadata.create_all(engine)
+    _run_migrations(_POST_CREATE_MIGRATIONS)
+    _ensure_booking_overlap_constraint()
     seed_admin()
     seed_office()
 
 
-def _run_migrations():
+def is_exclusion_violation(exc: IntegrityError) -> bool:
+    """True if a write was rejected by an EXCLUDE constraint (e.g. overlapping paid bookings)."""
+    return getattr(exc.orig, "pgcode", None) == "23P01"
+
+
+# Run before create_all().
+# Order matters: convert native enums to VARCHAR first so create_all()
+# finds compatible column types on existing tables.
+_PRE_CREATE_MIGRATIONS = [
+    # Convert seat.type from PostgreSQL native enum → plain VARCHAR.
+    # Safe to run repeatedly: VARCHAR→VARCHAR cast is a no-op.
+    "ALTER TABLE seat ALTER COLUMN type TYPE VARCHAR USING type::VARCHAR",
+    # Booking columns
+    "ALTER TABLE booking ADD COLUMN IF NOT EXISTS payment_status  VARCHAR DEFAULT 'pending'",
+    "ALTER TABLE booking ADD COLUMN IF NOT EXISTS razorpay_order_id  VARCHAR",
+    "ALTER TABLE booking ADD COLUMN IF NOT EXISTS razorpay_payment_id VARCHAR",
+    "CREATE INDEX IF NOT EXISTS ix_booking_razorpay_order_id ON booking(razorpay_order_id)",
+    "ALTER TABLE booking ADD COLUMN IF NOT EXISTS duration_unit     VARCHAR DEFAULT 'monthly'",
+    "ALTER TABLE booking ADD COLUMN IF NOT EXISTS duration_quantity INTEGER DEFAULT 1",
+    "ALTER TABLE booking ADD COLUMN IF NOT EXISTS price_amount      DOUBLE PRECISION DEFAULT 0",
+    "ALTER TABLE booking ADD COLUMN IF NOT EXISTS start_time        TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE booking ADD COLUMN IF NOT EXISTS end_time          TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE booking ADD COLUMN IF NOT EXISTS occupancy_recorded BOOLEAN DEFAULT false",
+    "ALTER TABLE booking ADD COLUMN IF NOT EXISTS reconciled_at TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE recurringbooking ADD COLUMN IF NOT EXISTS reconciled_at TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE booking ADD COLUMN IF NOT EXISTS order_created_at TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE recurringbooking ADD COLUMN IF NOT EXISTS order_created_at TIMESTAMP WITH TIME ZONE",
+    "ALTER TABLE payment ADD COLUMN IF NOT EXISTS revenue_recorded BOOLEAN DEFAULT false",
+    # KYC fields on user table
+    "ALTER TABLE \"user\" ADD COLUMN IF NOT EXISTS mobile              VARCHAR",
+    "ALTER TABLE \"user\" ADD COLUMN IF NOT EXISTS occupation_sector   VARCHAR",
+    "ALTER TABLE \"user\" ADD COLUMN IF NOT EXISTS occupation_role     VARCHAR",
+    "ALTER TABLE \"user\" ADD COLUMN IF NOT EXISTS kyc_document_name   VARCHAR",
+    "ALTER TABLE \"user\" ADD COLUMN IF NOT EXISTS kyc_document_data   TEXT",
+    "ALTER TABLE \"user\" ADD COLUMN IF NOT EXISTS kyc_document_key          VARCHAR",
+    "ALTER TABLE \"user\" ADD COLUMN IF NOT EXISTS kyc_document_size         INTEGER",
+    "ALTER TABLE \"user\" ADD COLUMN IF NOT EXISTS kyc_document_content_type VARCHAR",
+    # Admin manual seat lock
+    "ALTER TABLE seat ADD COLUMN IF NOT EXISTS locked_until TIMESTAMP WITH TIME ZONE",
+    # Hot-query indexes (see Booking.__table_args__; checked by `python -m app.db.plan_check`).
+    # booking.status is a native enum stored by member name, hence 'PAID'.
+    "CREATE INDEX IF NOT EXISTS ix_booking_paid_end_time ON booking (end_time) "
+    "INCLUDE (seat_id, start_time) WHERE status = 'PAID'",
+    "CREATE INDEX IF NOT EXISTS ix_booking_paid_seat_end_time ON booking (seat_id, end_time) "
+    "INCLUDE (start_time) WHERE status = 'PAID'",
+    # No query filters bookings by user since the request path stopped sweeping stale PENDING rows
+    "DROP INDEX IF EXISTS ix_booking_user_seat_status",
+    "CREATE INDEX IF NOT EXISTS ix_payment_booking_id ON payment (booking_id)",
+    "CREATE INDEX IF NOT EXISTS ix_booking_pending_created_at ON booking (created_at) WHERE status = 'PENDING'",
+    "DROP INDEX IF EXISTS ix_booking_cancelled_unreconciled_created_at",
+    "CREATE INDEX IF NOT EXISTS ix_booking_cancelled_unreconciled_opened_at "
+    "ON booking ((coalesce(order_created_at, created_at))) "
+    "WHERE status = 'CANCELLED' AND razorpay_order_id IS NOT NULL AND reconciled_at IS NULL",
+    # Payments for recurring bookings reference the rule instead of a booking
+    "ALTER TABLE payment ALTER COLUMN booking_id DROP NOT NULL",
+    # Needed by the booking overlap constraint below (seat_id equality inside a GiST index)
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+]
+
+# Run after create_all(), so they also apply on the very first deploy.
+_POST_CREATE_MIGRATIONS = [
+    # Needs the recurringbooking table, which create_all() makes on existing databases
+    "ALTER TABLE payment ADD COLUMN IF NOT EXISTS recurring_booking_id UUID REFERENCES recurringbooking(id)",
+    "CREATE INDEX IF NOT EXISTS ix_payment_recurring_booking_id ON payment (recurring_booking_id)",
+]
+
+
+# Two paid bookings can never hold the same seat for overlapping windows. Concurrent
+# confirmations that both passed the application check fail here with SQLSTATE 23P01.
+# Paid rows without a window (from before start_time / end_time existed) are left out,
+# as everywhere else in the app: tstzrange(NULL, NULL) would cover all of time.
+# Not in _POST_CREATE_MIGRATIONS: failing to add it must not pass as "already exists".
+_BOOKING_OVERLAP_CONSTRAINT = "booking_paid_no_overlap"
+_BOOKING_OVERLAP_DDL = (
+    f"ALTER TABLE booking ADD CONSTRAINT {_BOOKING_OVERLAP_CONSTRAINT} EXCLUDE USING gist "
+    "(seat_id WITH =, tstzrange(start_time, end_time, '[)') WITH &&) "
+    "WHERE (status = 'PAID' AND start_time IS NOT NULL AND end_time IS NOT NULL)"
+)
+
+# Paid rows the constraint would reject: overlapping pairs on one seat, and windows
+# that end before they start (tstzrange raises on those). Run by `python -m app.db.overlap_check`.
+_OVERLAP_BLOCKERS_SQL = """
+    SELECT a.seat_id, a.id, b.id, a.start_time, a.end_time, b.start_time, b.end_time
+    FROM booking a
+    JOIN booking b ON b.seat_id = a.seat_id AND b.id > a.id
+    WHERE a.status = 'PAID' AND b.status = 'PAID'
+      AND a.start_time < a.end_time AND b.start_time < b.end_time
+      AND a.start_time < b.end_time AND b.start_time < a.end_time
+    UNION ALL
+    SELECT seat_id, id, NULL, start_time, end_time, NULL, NULL
+    FROM booking
+    WHERE status = 'PAID' AND start_time > end_time
+    ORDER BY 1, 4
+    LIMIT :limit
+"""
+
+
+def booking_overlap_blockers(conn: sqlalchemy.Connection, limit: int | None = None) -> list:
     """
-    Run schema migrations before create_all().
-    Order matters: convert native enums to VARCHAR first so create_all()
-    finds compatible column types on existing tables.
+    PAID bookings that keep ``booking_paid_no_overlap`` from being added, as
+    ``(seat_id, booking_id, other_booking_id, start, end, other_start, other_end)``;
+    ``other_booking_id`` is None for a window that ends before it starts.
     """
-    migrations = [
-        # Convert seat.type from PostgreSQL native enum → plain VARCHAR.
-        # Safe to run repeatedly: VARCHAR→VARCHAR cast is a no-op.
-        "ALTER TABLE seat ALTER COLUMN type TYPE VARCHAR USING type::VARCHAR",
-        # Booking columns
-        "ALTER TABLE booking ADD COLUMN IF NOT EXISTS payment_status  VARCHAR DEFAULT 'pending'",
-        "ALTER TABLE booking ADD COLUMN IF NOT EXISTS razorpay_order_id  VARCHAR",
-        "ALTER TABLE booking ADD COLUMN IF NOT EXISTS razorpay_payment_id VARCHAR",
-        "CREATE INDEX IF NOT EXISTS ix_booking_razorpay_order_id ON booking(razorpay_order_id)",
-        "ALTER TABLE booking ADD COLUMN IF NOT EXISTS duration_unit     VARCHAR DEFAULT 'monthly'",
-        "ALTER TABLE booking ADD COLUMN IF NOT EXISTS duration_quantity INTEGER DEFAULT 1",
-        "ALTER TABLE booking ADD COLUMN IF NOT EXISTS price_amount      DOUBLE PRECISION DEFAULT 0",
-        "ALTER TABLE booking ADD COLUMN IF NOT EXISTS start_time        TIMESTAMP WITH TIME ZONE",
-        "ALTER TABLE booking ADD COLUMN IF NOT EXISTS end_time          TIMESTAMP WITH TIME ZONE",
-        # KYC fields on user table
-        "ALTER TABLE \"user\" ADD COLUMN IF NOT EXISTS mobile              VARCHAR",
-        "ALTER TABLE \"user\" ADD COLUMN IF NOT EXISTS occupation_sector   VARCHAR",
-        "ALTER TABLE \"user\" ADD COLUMN IF NOT EXISTS occupation_role     VARCHAR",
-        "ALTER TABLE \"user\" ADD COLUMN IF NOT EXISTS kyc_document_name   VARCHAR",
-        "ALTER TABLE \"user\" ADD COLUMN IF NOT EXISTS kyc_document_data   TEXT",
-        # Admin manual seat lock
-        "ALTER TABLE seat ADD COLUMN IF NOT EXISTS locked_until TIMESTAMP WITH TIME ZONE",
-    ]
+    return conn.execute(sqlalchemy.text(_OVERLAP_BLOCKERS_SQL), {"limit": limit}).all()
+
+
+def _ensure_booking_overlap_constraint():
+    """
+    Add the paid-booking exclusion constraint if it is missing (or replace one
+    from before windowless rows were excluded). It is the last guarantee against
+    double bookings, so a failure (btree_gist unavailable, PAID rows that already
+    overlap) is logged as an error, and in production the service refuses to
+    start. Check for blocking rows before deploying with ``app.db.overlap_check``.
+    """
+    with engine.connect() as conn:
+        definition = conn.execute(
+            sqlalchemy.text(
+                "SELECT pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conname = :name AND conrelid = 'booking'::regclass"
+            ),
+            {"name": _BOOKING_OVERLAP_CONSTRAINT},
+        ).scalar()
+        if definition is not None and "start_time IS NOT NULL" in definition:
+            return
+        try:
+            blockers = booking_overlap_blockers(conn, limit=5)
+            if blockers:
+                raise RuntimeError(
+                    f"PAID bookings overlap or have inverted windows (first: {blockers[0]}); "
+                    "list them with `python -m app.db.overlap_check`"
+                )
+            if definition is not None:
+                conn.execute(sqlalchemy.text(f"ALTER TABLE booking DROP CONSTRAINT {_BOOKING_OVERLAP_CONSTRAINT}"))
+            conn.execute(sqlalchemy.text(_BOOKING_OVERLAP_DDL))
+            conn.commit()
+        except Exception as exc:
+            conn.rollback()
+            logger.error(
+                "Could not add %s; overlapping PAID bookings are NOT prevented by the database: %s",
+                _BOOKING_OVERLAP_CONSTRAINT, exc,
+            )
+            if settings.ENVIRONMENT == "production":
+                raise RuntimeError(f"{_BOOKING_OVERLAP_CONSTRAINT} is missing and could not be added") from exc
+            return
+    logger.info("Added constraint %s", _BOOKING_OVERLAP_CONSTRAINT)
+
+
+def _run_migrations(migrations: list[str]):
+    """Apply idempotent schema statements; each one is skipped (and logged) if it fails."""
     try:
         with engine.connect() as conn:
             for sql in migrations:
@@ -69,7 +198,7 @@ def _run_migrations():
 def seed_admin():
     """Auto-create default admin user from env vars if it doesn't exist."""
     from app.models.models import User, UserRole
-    from app.core.auth import get_password_hash
+    from app.core.passwords import hash_password_sync
 
     admin_email = settings.ADMIN_EMAIL
     admin_password = settings.ADMIN_PASSWORD
@@ -94,7 +223,7 @@ def seed_admin():
             role=UserRole.ADMIN,
             gov_id_type="PAN",
             gov_id_number="ADMIN00000",
-            hashed_password=get_password_hash(admin_password),
+            hashed_password=hash_password_sync(admin_password),  # once, at startup
         )
         session.add(admin_user)
         session.commit()
@@ -0,0 +1,241 @@
+"""
+Hundreds of parallel checkouts racing for one seat: exactly one may win.
+
+Each round takes a fresh seat and ``--concurrency`` users, one thread each,
+released together by a barrier, and runs two races on it:
+
+- checkout: every user opens a checkout for the same window at once
+  (``open_checkout`` plus ``attach_order``, then commit), as concurrent
+  ``/payment/create-order`` calls would. The seat hold must let exactly one
+  through; the rest are refused with 409.
+- confirm: every user then has a PENDING booking with its own Razorpay order
+  (the winner's from the checkout, the others inserted directly, as if their
+  holds had lapsed), and all orders are confirmed at once
+  (``confirm_captured_order``, then commit), as concurrent ``/payment/verify``
+  calls and webhook deliveries would. A loser is stopped by the seat lock plus
+  overlap check (SeatConflictError) or by the booking_paid_no_overlap
+  constraint (SQLSTATE 23P01).
+
+    python -m app.db.double_booking_benchmark
+    python -m app.db.double_booking_benchmark --rounds 10 --concurrency 500
+
+Prints p50 / p99 / max latency of each race and exits non-zero unless every
+round ends with exactly one open checkout and exactly one PAID booking. The
+racers get their own engine with a pool of ``--concurrency`` connections, so
+the database's max_connections must leave room for that many; this is checked
+up front. The rows have to be committed for the race to be real, so they are
+deleted at the end (bookings, payments, holds, ledger and occupancy rows of the
+synthetic seats, the seats and the users).
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+from uuid import uuid4
+
+import sqlalchemy
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from app.core.checkout import CheckoutError, attach_order, open_checkout
+from app.core.confirmation import SeatConflictError, confirm_captured_order
+from app.db.bench_fixtures import refuse_in_production, seed_seats, seed_users
+from app.db.database import create_db_engine, engine, init_db, is_exclusion_violation
+from app.models.models import Booking, BookingDuration, BookingStatus, RazorpayPaymentStatus
+
+_Racer = Callable[[Session], str]
+
+
+def _free_connections() -> int:
+    with engine.connect() as conn:
+        return conn.execute(
+            sqlalchemy.text(
+                "SELECT current_setting('max_connections')::int "
+                "- current_setting('superuser_reserved_connections')::int "
+                "- (SELECT count(*) FROM pg_stat_activity)"
+            )
+        ).scalar_one()
+
+
+def _seed(rounds: int, concurrency: int, section: str) -> tuple[list, list[int]]:
+    """Committed: ``concurrency`` users and one seat per round."""
+    with engine.connect() as conn:
+        user_ids = seed_users(conn, concurrency, "Double Booking Bench")
+        seat_ids = seed_seats(conn, rounds, section)
+        conn.commit()
+    return user_ids, seat_ids
+
+
+def _race(pool: ThreadPoolExecutor, race_engine: sqlalchemy.Engine, racers: list[_Racer]) -> list[tuple[str, float]]:
+    """Run every racer in its own session and transaction, all released at once. Returns (outcome, ms)."""
+    barrier = threading.Barrier(len(racers))
+
+    def run(racer: _Racer) -> tuple[str, float]:
+        with Session(race_engine) as session:
+            barrier.wait()
+            started = time.perf_counter()
+            try:
+                outcome = racer(session)
+                session.commit()
+            except CheckoutError as exc:
+                session.rollback()
+                held = exc.status_code == 409 and "being booked" in exc.detail
+                outcome = "hold refused" if held else f"refused {exc.status_code}"
+            except SeatConflictError:
+                session.rollback()
+                outcome = "conflict"
+            except IntegrityError as exc:
+                session.rollback()
+                outcome = "constraint" if is_exclusion_violation(exc) else f"error: {exc.orig}"
+            except Exception as exc:  # noqa: BLE001 — reported as a failure below
+                session.rollback()
+                outcome = f"error: {exc!r}"
+            return outcome, (time.perf_counter() - started) * 1000
+
+    return list(pool.map(run, racers))
+
+
+def _checkout_racer(user_id, seat_id: int, start: datetime) -> _Racer:
+    def racer(session: Session) -> str:
+        checkout = open_checkout(session, user_id, [seat_id], BookingDuration.DAILY, 1, start_time=start)
+        attach_order(session, checkout.booking_ids, f"order_race_{uuid4().hex[:12]}")
+        return "opened"
+    return racer
+
+
+def _confirm_racer(order_id: str) -> _Racer:
+    def racer(session: Session) -> str:
+        return "confirmed" if confirm_captured_order(session, order_id, f"pay_{order_id}") else "noop"
+    return racer
+
+
+def _pending_orders(seat_id: int, user_ids: list, start: datetime) -> list[str]:
+    """Every user's order on the seat: the checkout winner's, plus one inserted for each of the others."""
+    now = datetime.now(timezone.utc)
+    with Session(engine) as session:
+        opened = session.exec(
+            select(Booking.user_id, Booking.razorpay_order_id).where(
+                Booking.seat_id == seat_id, Booking.razorpay_order_id.is_not(None)
+            )
+        ).all()
+        orders = [order_id for _, order_id in opened]
+        have_order = {user_id for user_id, _ in opened}
+        for user_id in user_ids:
+            if user_id in have_order:
+                continue
+            order_id = f"order_race_{uuid4().hex[:12]}"
+            session.add(Booking(
+                user_id=user_id,
+                seat_id=seat_id,
+                booking_date=now,
+                status=BookingStatus.PENDING,
+                duration_unit=BookingDuration.DAILY,
+                duration_quantity=1,
+                price_amount=1,
+                start_time=start,
+                end_time=start + timedelta(days=1),
+                payment_status=RazorpayPaymentStatus.PENDING.value,
+                razorpay_order_id=order_id,
+                order_created_at=now,
+            ))
+            orders.append(order_id)
+        session.commit()
+    return orders
+
+
+def _cleanup(user_ids: list, seat_ids: list[int], section: str) -> None:
+    with engine.connect() as conn:
+        params = {"ids": seat_ids, "section": section, "user_ids": [str(user_id) for user_id in user_ids]}
+        for sql in (
+            "DELETE FROM revenuedaily WHERE section = :section",
+            "DELETE FROM seatoccupancyhour WHERE seat_id = ANY(:ids)",
+            "DELETE FROM payment WHERE booking_id IN (SELECT id FROM booking WHERE seat_id = ANY(:ids))",
+            "DELETE FROM booking WHERE seat_id = ANY(:ids)",
+            "DELETE FROM seathold WHERE seat_id = ANY(:ids)",
+            "DELETE FROM seat WHERE id = ANY(:ids)",
+            'DELETE FROM "user" WHERE id = ANY(CAST(:user_ids AS uuid[]))',
+        ):
+            conn.execute(sqlalchemy.text(sql), params)
+        conn.commit()
+
+
+def _report(name: str, results: list[tuple[str, float]]) -> dict[str, int]:
+    outcomes: dict[str, int] = {}
+    for outcome, _ in results:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    timings = sorted(ms for _, ms in results)
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{name:<9} {', '.join(f'{outcome}={count}' for outcome, count in sorted(outcomes.items()))}")
+    print(f"{'':<9} latency ms: p50 {statistics.median(timings):.1f}  p99 {p99:.1f}  max {timings[-1]:.1f}")
+    return outcomes
+
+
+def run(rounds: int, concurrency: int) -> bool:
+    init_db()
+    section = f"Double Booking Bench {uuid4().hex[:8]}"
+    user_ids, seat_ids = _seed(rounds, concurrency, section)
+    race_engine = create_db_engine(pool_size=concurrency, max_overflow=concurrency)
+    start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+    checkouts: list[tuple[str, float]] = []
+    confirms: list[tuple[str, float]] = []
+    bad_rounds = []
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for seat_id in seat_ids:
+                results = _race(pool, race_engine, [_checkout_racer(user_id, seat_id, start) for user_id in user_ids])
+                checkouts.extend(results)
+                opened = sum(outcome == "opened" for outcome, _ in results)
+
+                orders = _pending_orders(seat_id, user_ids, start)
+                confirms.extend(_race(pool, race_engine, [_confirm_racer(order_id) for order_id in orders]))
+                with engine.connect() as conn:
+                    paid = conn.execute(
+                        sqlalchemy.text("SELECT count(*) FROM booking WHERE seat_id = :seat_id AND status = 'PAID'"),
+                        {"seat_id": seat_id},
+                    ).scalar_one()
+                if opened != 1 or paid != 1:
+                    bad_rounds.append((seat_id, opened, paid))
+    finally:
+        race_engine.dispose()
+        _cleanup(user_ids, seat_ids, section)
+
+    print(f"{rounds} rounds x {concurrency} racers per seat")
+    outcomes = _report("checkout", checkouts)
+    outcomes.update(_report("confirm", confirms))
+
+    ok = True
+    for seat_id, opened, paid in bad_rounds:
+        print(f"FAIL: seat {seat_id} ended with {opened} open checkouts and {paid} PAID bookings")
+        ok = False
+    errors = {name: count for name, count in outcomes.items() if name.startswith("error")}
+    if errors:
+        print(f"FAIL: unexpected errors: {errors}")
+        ok = False
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5, help="seats raced for, one after another")
+    parser.add_argument("--concurrency", type=int, default=300, help="users racing per seat")
+    parser.add_argument("--force", action="store_true", help="allow running with ENVIRONMENT=production")
+    args = parser.parse_args()
+
+    refuse_in_production(args.force)
+    if args.concurrency < 2:
+        sys.exit("--concurrency must be at least 2 for a race.")
+    free = _free_connections()
+    if args.concurrency > free:
+        sys.exit(f"--concurrency {args.concurrency} needs that many connections; the database has {free} free.")
+    if not run(args.rounds, args.concurrency):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Move inline base64 KYC documents (``user.kyc_document_data``) into the blob store.
+
+    python -m app.db.kyc_migrate --batch-size 50
+
+Each batch is committed on its own, so the run can be interrupted and resumed,
+and several runs can share the work. Rows whose data cannot be decoded are
+reported and left in place. Documents stored before background processing
+existed are then queued for it; the API's processor picks them up.
+"""
+from __future__ import annotations
+
+import argparse
+
+from app.core.kyc_documents import migrate_inline_documents
+from app.core.kyc_processing import enqueue_unprocessed_documents
+from app.db.database import init_db
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=50, help="documents per committed batch")
+    args = parser.parse_args()
+
+    init_db()
+    migrated, failed, _ = migrate_inline_documents(batch_size=args.batch_size)
+    print(f"Moved {migrated} documents to the blob store ({failed} could not be decoded)")
+    queued = enqueue_unprocessed_documents()
+    print(f"Queued {queued} stored documents for processing")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Pre-flight check for the ``booking_paid_no_overlap`` constraint.
+
+Lists the PAID bookings that keep the constraint from being added: pairs on
+one seat whose windows overlap, and windows that end before they start. Paid
+rows without a window are not covered by the constraint and are not listed.
+
+    python -m app.db.overlap_check
+    python -m app.db.overlap_check --limit 1000
+
+Run it against the production database before deploying. At startup the
+constraint is added if it is missing, and in production the service refuses
+to start if that fails. Resolve each listed row by hand (cancel and refund
+the duplicate, or correct its window) until this exits 0. It only reads, and
+does not run migrations.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+
+import sqlalchemy
+
+from app.db.database import _BOOKING_OVERLAP_CONSTRAINT, booking_overlap_blockers, engine
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=200, help="rows to list at most")
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        installed = conn.execute(
+            sqlalchemy.text("SELECT 1 FROM pg_constraint WHERE conname = :name"),
+            {"name": _BOOKING_OVERLAP_CONSTRAINT},
+        ).first() is not None
+        blockers = booking_overlap_blockers(conn, limit=args.limit)
+
+    print(f"{_BOOKING_OVERLAP_CONSTRAINT}: {'installed' if installed else 'not installed'}")
+    for seat_id, booking_id, other_id, start, end, other_start, other_end in blockers:
+        if other_id is None:
+            print(f"seat {seat_id}: booking {booking_id} ends before it starts ({start} .. {end})")
+        else:
+            print(
+                f"seat {seat_id}: booking {booking_id} ({start} .. {end}) "
+                f"overlaps {other_id} ({other_start} .. {other_end})"
+            )
+    if blockers:
+        more = " (or more)" if len(blockers) == args.limit else ""
+        sys.exit(f"{len(blockers)}{more} PAID bookings block the constraint.")
+    print("No blocking PAID bookings.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+EXPLAIN-based regression check for the hot booking queries.
+
+Seeds a large synthetic booking table (plus payments and recurring rules)
+inside a transaction, ANALYZEs it, EXPLAINs every hot query and fails if any
+of them reads ``booking``, ``payment`` or ``recurringbooking`` without an
+index. Everything is rolled back at the end.
+
+The queries are built by the same statement functions the endpoints and jobs
+call (``paid_conflicts_statement``, ``summary_statement``, ...), so a change to
+a hot query is checked as it is, not as a copy. A new hot query gets its own
+statement builder and an entry in ``_hot_queries``.
+
+    python -m app.db.plan_check               # 200k bookings
+    python -m app.db.plan_check --rows 1000000
+
+Run it against a development / CI database after touching a hot query or
+the index set in ``Booking.__table_args__`` / ``_run_migrations``.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+import sqlalchemy
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.api.seats import summary_statement
+from app.core.availability import active_paid_statement, paid_conflicts_statement, paid_windows_statement
+from app.core.config import settings
+from app.core.confirmation import existing_payments_statement, order_bookings_statement
+from app.core.holds import active_holds_statement
+from app.core.reaper import stale_pending_statement
+from app.core.reconciliation import due_orders_statement
+from app.core.recurrence import recurring_conflicts_statement
+from app.db.bench_fixtures import column_type, refuse_in_production, seed_seats, seed_users
+from app.db.database import engine, init_db
+from app.models.models import Booking
+
+_INDEXED_NODES = {"Index Scan", "Index Only Scan", "Bitmap Heap Scan", "Bitmap Index Scan"}
+# seat and seathold hold at most one row per seat; these are the tables that grow
+_CHECKED_TABLES = {"booking", "payment", "recurringbooking"}
+
+
+class _Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement: Any):
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element: _Explain, compiler: Any, **kw: Any) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def _seed(conn: sqlalchemy.Connection, rows: int, seats: int, users: int) -> dict[str, Any]:
+    user_ids = seed_users(conn, users, "Plan Check")
+    seat_ids = seed_seats(conn, seats, "Plan Check")
+
+    status_type = column_type(conn, "booking", "status")
+    duration_type = column_type(conn, "booking", "duration_unit")
+    # ~2% of bookings are still running, ~1% pending, ~8% cancelled, the rest is paid history
+    conn.execute(
+        sqlalchemy.text(f"""
+            INSERT INTO booking (id, user_id, seat_id, booking_date, status, duration_unit,
+                                 duration_quantity, price_amount, start_time, end_time,
+                                 created_at, payment_status, razorpay_order_id)
+            SELECT gen_random_uuid(),
+                   (CAST(:user_ids AS uuid[]))[1 + g % cardinality(CAST(:user_ids AS uuid[]))],
+                   (CAST(:seat_ids AS int[]))[1 + g % cardinality(CAST(:seat_ids AS int[]))],
+                   t.start_at,
+                   CAST(CASE WHEN g % 100 = 1 THEN 'PENDING'
+                             WHEN g % 100 BETWEEN 2 AND 9 THEN 'CANCELLED'
+                             ELSE 'PAID' END AS {status_type}),
+                   CAST('DAILY' AS {duration_type}),
+                   1, 500,
+                   t.start_at, t.start_at + interval '1 day',
+                   t.start_at, 'success', 'order_planchk_' || g
+            FROM generate_series(1, :rows) g
+            CROSS JOIN LATERAL (
+                SELECT CASE WHEN g % 50 = 0 THEN now() - interval '2 hours'
+                            ELSE now() - (g % 1000 + 2) * interval '1 day' END AS start_at
+            ) t
+        """),
+        {"user_ids": [str(u) for u in user_ids], "seat_ids": list(seat_ids), "rows": rows},
+    )
+    conn.execute(sqlalchemy.text("""
+        INSERT INTO payment (id, booking_id, amount, status, transaction_id, created_at)
+        SELECT gen_random_uuid(), b.id, b.price_amount,
+               CAST('COMPLETED' AS """ + column_type(conn, "payment", "status") + """),
+               'pay_' || b.razorpay_order_id, b.created_at
+        FROM booking b JOIN seat s ON s.id = b.seat_id
+        WHERE s.section = 'Plan Check' AND b.status = 'PAID'
+    """))
+    # One recurring rule per 20 bookings, three quarters of them paid, each running for 90 days
+    conn.execute(
+        sqlalchemy.text(f"""
+            INSERT INTO recurringbooking (id, user_id, seat_id, status, duration_unit, weekdays,
+                                          first_date, last_date, start_local_time, end_local_time,
+                                          timezone, occurrence_count, price_amount, starts_at, ends_at,
+                                          created_at, payment_status)
+            SELECT gen_random_uuid(),
+                   (CAST(:user_ids AS uuid[]))[1 + g % cardinality(CAST(:user_ids AS uuid[]))],
+                   (CAST(:seat_ids AS int[]))[1 + g % cardinality(CAST(:seat_ids AS int[]))],
+                   CAST(CASE WHEN g % 4 = 0 THEN 'PENDING' ELSE 'PAID' END
+                        AS {column_type(conn, "recurringbooking", "status")}),
+                   CAST('HOURLY' AS {column_type(conn, "recurringbooking", "duration_unit")}),
+                   '1,3', CAST(t.starts_at AS date), CAST(t.starts_at + interval '90 days' AS date),
+                   '09:00', '13:00', 'UTC', 26, 5000,
+                   t.starts_at, t.starts_at + interval '90 days', t.starts_at, 'success'
+            FROM generate_series(1, :rules) g
+            CROSS JOIN LATERAL (SELECT now() - (g % 1000) * interval '1 day' AS starts_at) t
+        """),
+        {"user_ids": [str(u) for u in user_ids], "seat_ids": list(seat_ids), "rules": max(rows // 20, 1)},
+    )
+    conn.execute(sqlalchemy.text("ANALYZE booking"))
+    conn.execute(sqlalchemy.text("ANALYZE payment"))
+    conn.execute(sqlalchemy.text("ANALYZE recurringbooking"))
+
+    sample_booking = conn.execute(
+        sqlalchemy.text("SELECT id FROM booking WHERE seat_id = :seat_id LIMIT 1"), {"seat_id": seat_ids[0]}
+    ).scalar_one()
+    return {"seat_ids": list(seat_ids), "booking_id": sample_booking}
+
+
+def _hot_queries(fixture: dict[str, Any]) -> dict[str, Callable[[datetime], Any]]:
+    """The statements the endpoints and jobs actually run, built by the same functions."""
+    def checkout_windows(now: datetime) -> list[tuple[int, datetime, datetime]]:
+        # A five-seat checkout for tomorrow
+        start = now + timedelta(days=1)
+        return [(seat_id, start, start + timedelta(days=1)) for seat_id in fixture["seat_ids"][:5]]
+
+    return {
+        "availability snapshot (seats.get_seats / get_available_seats)": paid_windows_statement,
+        "seats taken now (admin get_stats / get_seats)": active_paid_statement,
+        "seat summary (seats.get_seat_summary)": lambda now: summary_statement(now, []),
+        "active seat holds (snapshot, seat summary)": active_holds_statement,
+        "paid booking conflicts (open_checkout, confirm_bookings)": lambda now: paid_conflicts_statement(
+            checkout_windows(now), [fixture["booking_id"]]
+        ),
+        "recurring rule conflicts (open_checkout, confirm_bookings)": lambda now: recurring_conflicts_statement(
+            checkout_windows(now)
+        ),
+        "pending booking reaper": lambda now: stale_pending_statement(
+            now - timedelta(minutes=settings.PENDING_BOOKING_TTL_MINUTES), 500
+        ),
+        "payment reconciler due orders": lambda now: due_orders_statement(Booking, now, settings.RECONCILE_BATCH_SIZE),
+        "bookings by razorpay order (verify_payment, confirm_captured_order)": lambda now: order_bookings_statement(
+            "order_planchk_42"
+        ),
+        "existing payments (confirm_bookings)": lambda now: existing_payments_statement([fixture["booking_id"]]),
+    }
+
+
+def _unindexed_reads(plan: dict[str, Any]) -> list[str]:
+    bad: list[str] = []
+    relation = plan.get("Relation Name")
+    if relation in _CHECKED_TABLES and plan["Node Type"] not in _INDEXED_NODES:
+        bad.append(f"{plan['Node Type']} on {relation}")
+    for child in plan.get("Plans", []):
+        bad.extend(_unindexed_reads(child))
+    return bad
+
+
+def run(rows: int, seats: int, users: int) -> int:
+    init_db()
+    failures = 0
+    now = datetime.now(timezone.utc)
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            fixture = _seed(conn, rows, seats, users)
+            for name, build in _hot_queries(fixture).items():
+                plan = conn.execute(_Explain(build(now))).scalar_one()[0]["Plan"]
+                bad = _unindexed_reads(plan)
+                status = "FAIL" if bad else "ok"
+                print(f"[{status:>4}] {name}" + (f": {', '.join(bad)}" if bad else ""))
+                failures += bool(bad)
+        finally:
+            trans.rollback()
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000, help="synthetic bookings to seed")
+    parser.add_argument("--seats", type=int, default=200, help="synthetic seats to spread them over")
+    parser.add_argument("--users", type=int, default=2_000, help="synthetic users owning them")
+    parser.add_argument("--force", action="store_true", help="allow running with ENVIRONMENT=production")
+    args = parser.parse_args()
+
+    refuse_in_production(args.force)
+    failures = run(args.rows, args.seats, args.users)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Backfill or rebuild the revenue ledger (``RevenueDaily``).
+
+    python -m app.db.revenue_rebuild            # add payments missing from the ledger
+    python -m app.db.revenue_rebuild --full     # recompute every row from scratch
+
+``--full`` is needed after changing ANALYTICS_TIMEZONE or correcting payment
+rows by hand; the plain backfill is safe to run at any time.
+"""
+from __future__ import annotations
+
+import argparse
+
+from app.core.revenue import backfill_revenue, rebuild_revenue
+from app.db.database import init_db
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="drop and recompute the whole ledger")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="payments per committed chunk (backfill)")
+    args = parser.parse_args()
+
+    init_db()
+    if args.full:
+        print(f"Ledger rebuilt: {rebuild_revenue()} rows")
+    else:
+        processed, _ = backfill_revenue(chunk_size=args.chunk_size)
+        print(f"Backfilled {processed} payments")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+``GET /seats/summary`` against deriving the same counts from ``GET /seats``.
+
+Seeds ``--seats`` synthetic seats over ``--sections`` sections and every seat
+type. A share of them is booked (a PAID booking running now), held by an
+open checkout, or admin-locked. Everything is inside a transaction. Each
+round then times two paths, both starting from a cold snapshot:
+
+- seats: build the availability snapshot, render the ``/seats`` body, and
+  tally per-section / per-type free counts from the parsed JSON, as
+  ``FloorPlan.jsx`` and the admin dashboard did
+- summary: build the snapshot, then run the one GROUP BY GROUPING SETS query
+  behind ``/seats/summary`` and serialise it
+
+It prints the median and max milliseconds and the response size for each, and
+rolls everything back at the end.
+
+    python -m app.db.seat_summary_benchmark
+    python -m app.db.seat_summary_benchmark --seats 10000 --sections 100 --repeat 10
+
+Repeated ``/seats/summary`` calls are served from the snapshot's render cache
+until a seat changes state; this measures the recompute after a change.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Callable
+
+import sqlalchemy
+from sqlmodel import Session
+
+from app.api.seats import _query_summary, _render_all
+from app.core import availability
+from app.db.bench_fixtures import column_type, refuse_in_production, seed_bench_rows
+from app.db.database import engine, init_db
+from app.models.models import SeatType
+
+
+def _seed(conn: sqlalchemy.Connection, args: argparse.Namespace) -> None:
+    user_id, seat_ids = seed_bench_rows(conn, args.seats, "Summary Bench")
+    types = [seat_type.value for seat_type in SeatType]
+    conn.execute(
+        sqlalchemy.text(
+            "UPDATE seat SET section = 'Summary Bench ' || (id % :sections), "
+            "type = (CAST(:types AS varchar[]))[1 + id % cardinality(CAST(:types AS varchar[]))] "
+            "WHERE id = ANY(:ids)"
+        ),
+        {"sections": args.sections, "types": types, "ids": seat_ids},
+    )
+    booked_every = max(int(round(1 / args.booked_share)), 1)
+    conn.execute(
+        sqlalchemy.text(f"""
+            INSERT INTO booking (id, user_id, seat_id, booking_date, status, duration_unit,
+                                 duration_quantity, price_amount, start_time, end_time, created_at, payment_status)
+            SELECT gen_random_uuid(), CAST(:user_id AS uuid), s, now(),
+                   CAST('PAID' AS {column_type(conn, "booking", "status")}),
+                   CAST('DAILY' AS {column_type(conn, "booking", "duration_unit")}),
+                   1, 500, now() - interval '1 hour', now() + interval '23 hours', now(), 'success'
+            FROM unnest(CAST(:ids AS int[])) s
+            WHERE s % :every = 0
+        """),
+        {"user_id": str(user_id), "ids": seat_ids, "every": booked_every},
+    )
+    conn.execute(
+        sqlalchemy.text(
+            "INSERT INTO seathold (seat_id, user_id, expires_at) "
+            "SELECT s, CAST(:user_id AS uuid), now() + interval '10 minutes' FROM unnest(CAST(:ids AS int[])) s "
+            "WHERE s % :every = 1"
+        ),
+        {"user_id": str(user_id), "ids": seat_ids, "every": max(int(round(1 / args.held_share)), 2)},
+    )
+    conn.execute(
+        sqlalchemy.text(
+            "UPDATE seat SET locked_until = now() + interval '1 day' WHERE id = ANY(:ids) AND id % :every = 2"
+        ),
+        {"ids": seat_ids, "every": max(int(round(1 / args.locked_share)), 3)},
+    )
+    conn.execute(sqlalchemy.text("ANALYZE seat"))
+    conn.execute(sqlalchemy.text("ANALYZE booking"))
+
+
+def _via_seats(session: Session) -> int:
+    snapshot = availability._build_snapshot(session, 0, datetime.now(timezone.utc))
+    body = _render_all(snapshot)
+    free = Counter()
+    for seat in json.loads(body):
+        if seat["is_available"]:
+            free[("section", seat["section"])] += 1
+            free[("type", seat["type"])] += 1
+    return len(body)
+
+
+def _via_summary(session: Session) -> int:
+    snapshot = availability._build_snapshot(session, 0, datetime.now(timezone.utc))
+    return len(_query_summary(session, snapshot).model_dump_json().encode())
+
+
+def _measure(conn: sqlalchemy.Connection, path: Callable[[Session], int], repeat: int) -> tuple[float, float, int]:
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        with Session(bind=conn, join_transaction_mode="create_savepoint") as session:
+            started = time.perf_counter()
+            size = path(session)
+            timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), max(timings), size
+
+
+def run(args: argparse.Namespace) -> None:
+    init_db()
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            _seed(conn, args)
+            print(f"{'path':<18} {'median ms':>10} {'max ms':>8} {'body KiB':>9}")
+            for label, path in (("GET /seats + tally", _via_seats), ("GET /seats/summary", _via_summary)):
+                median_ms, max_ms, size = _measure(conn, path, args.repeat)
+                print(f"{label:<18} {median_ms:>10.1f} {max_ms:>8.1f} {size / 1024:>9.1f}")
+        finally:
+            trans.rollback()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seats", type=int, default=10_000)
+    parser.add_argument("--sections", type=int, default=100)
+    parser.add_argument("--booked-share", type=float, default=0.3)
+    parser.add_argument("--held-share", type=float, default=0.05)
+    parser.add_argument("--locked-share", type=float, default=0.02)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--force", action="store_true", help="allow running with ENVIRONMENT=production")
+    args = parser.parse_args()
+
+    refuse_in_production(args.force)
+    if not all(0 < share <= 1 for share in (args.booked_share, args.held_share, args.locked_share)):
+        sys.exit("Shares must be in (0, 1].")
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,9 @@
-from datetime import datetime, timezone
+from datetime import date, datetime, time, timezone
 from enum import Enum
 from typing import Optional, List
 from uuid import UUID, uuid4
 from sqlmodel import SQLModel, Field, Relationship
-from sqlalchemy import Column, String, Text, DateTime
+from sqlalchemy import Column, String, Text, DateTime, Index, LargeBinary, text
 
 
 class UserRole(str, Enum):
@@ -55,11 +55,15 @@ class User(UserBase, table=True):
     hashed_password: str
     is_active: bool = Field(default=True)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    # Stored as TEXT to hold base64-encoded document (up to ~2 MB)
+    # Legacy inline base64 document; new uploads go to the blob store and the
+    # migration (app.db.kyc_migrate) moves old ones there, leaving this NULL.
     kyc_document_data: Optional[str] = Field(
         default=None,
         sa_column=Column("kyc_document_data", Text, nullable=True),
     )
+    kyc_document_key: Optional[str] = Field(default=None)            # blob store key (sha256)
+    kyc_document_size: Optional[int] = Field(default=None)
+    kyc_document_content_type: Optional[str] = Field(default=None)
 
     bookings: List["Booking"] = Relationship(back_populates="user")
 
@@ -99,6 +103,36 @@ class BookingBase(SQLModel):
 
 
 class Booking(BookingBase, table=True):
+    # Hot-path indexes (mirrored in database._run_migrations for existing databases).
+    # Enum columns are stored by member *name*, hence 'PAID' / 'PENDING' in the predicates.
+    __table_args__ = (
+        # "Which seats are taken right now": status='paid' AND end_time > now, across all seats
+        Index(
+            "ix_booking_paid_end_time", "end_time",
+            postgresql_include=["seat_id", "start_time"],
+            postgresql_where=text("status = 'PAID'"),
+        ),
+        # Per-seat overlap checks when confirming a payment
+        Index(
+            "ix_booking_paid_seat_end_time", "seat_id", "end_time",
+            postgresql_include=["start_time"],
+            postgresql_where=text("status = 'PAID'"),
+        ),
+        # Abandoned-checkout reaper: oldest PENDING rows first
+        Index(
+            "ix_booking_pending_created_at", "created_at",
+            postgresql_where=text("status = 'PENDING'"),
+        ),
+        # Payment reconciler: reaped orders not yet checked since they were cancelled,
+        # by when the order was opened (the lookback window of _due_orders)
+        Index(
+            "ix_booking_cancelled_unreconciled_opened_at", text("coalesce(order_created_at, created_at)"),
+            postgresql_where=text(
+                "status = 'CANCELLED' AND razorpay_order_id IS NOT NULL AND reconciled_at IS NULL"
+            ),
+        ),
+    )
+
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     user_id: UUID = Field(foreign_key="user.id")
     seat_id: int = Field(foreign_key="seat.id")
@@ -107,6 +141,19 @@ class Booking(BookingBase, table=True):
     payment_status: str = Field(default=RazorpayPaymentStatus.PENDING.value)
     razorpay_order_id: Optional[str] = Field(default=None, index=True)
     razorpay_payment_id: Optional[str] = Field(default=None)
+    # When razorpay_order_id was attached; the reaper's TTL runs from here for rows with an order
+    order_created_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column("order_created_at", DateTime(timezone=True), nullable=True),
+    )
+    # Set once the booking's hours have been added to SeatOccupancyHour
+    occupancy_recorded: bool = Field(default=False)
+    # Last time the payment reconciler asked Razorpay about this booking's order; the reaper
+    # clears it on cancelling, so a reaped order is checked once more
+    reconciled_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column("reconciled_at", DateTime(timezone=True), nullable=True),
+    )
 
     user: "User" = Relationship(back_populates="bookings")
     seat: "Seat" = Relationship(back_populates="bookings")
@@ -121,7 +168,206 @@ class PaymentBase(SQLModel):
 
 class Payment(PaymentBase, table=True):
     id: UUID = Field(default_factory=uuid4, primary_key=True)
-    booking_id: UUID = Field(foreign_key="booking.id")
+    # Exactly one of booking_id / recurring_booking_id is set
+    booking_id: Optional[UUID] = Field(default=None, foreign_key="booking.id", index=True)
+    recurring_booking_id: Optional[UUID] = Field(default=None, foreign_key="recurringbooking.id", index=True)
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    # Set once the amount has been added to RevenueDaily
+    revenue_recorded: bool = Field(default=False)
+
+    booking: Optional["Booking"] = Relationship(back_populates="payment")
+
+
+class RecurringBooking(SQLModel, table=True):
+    """
+    "Every Mon/Wed 09:00-13:00 from first_date to last_date" on one seat, stored
+    once. Occurrences are never materialised; see ``app.core.recurrence``.
+    """
+    __table_args__ = (
+        # Availability snapshot and conflict checks: paid rules that have not ended yet
+        Index(
+            "ix_recurringbooking_paid_seat_ends_at", "seat_id", "ends_at",
+            postgresql_where=text("status = 'PAID'"),
+        ),
+    )
+
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    user_id: UUID = Field(foreign_key="user.id", index=True)
+    seat_id: int = Field(foreign_key="seat.id")
+    status: BookingStatus = Field(default=BookingStatus.PENDING)
+    duration_unit: BookingDuration = Field(default=BookingDuration.HOURLY)   # HOURLY or DAILY only
+    weekdays: str                        # ISO weekdays, Monday = 1, e.g. "1,3"
+    first_date: date
+    last_date: date                      # inclusive
+    start_local_time: Optional[time] = None   # hourly rules only, in ``timezone``
+    end_local_time: Optional[time] = None
+    timezone: str
+    occurrence_count: int
+    price_amount: float                  # whole rule, priced once at creation
+    # First occurrence start / last occurrence end, for range pruning
+    starts_at: datetime = Field(sa_column=Column("starts_at", DateTime(timezone=True), nullable=False))
+    ends_at: datetime = Field(sa_column=Column("ends_at", DateTime(timezone=True), nullable=False))
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    payment_status: str = Field(default=RazorpayPaymentStatus.PENDING.value)
+    razorpay_order_id: Optional[str] = Field(default=None, index=True)
+    razorpay_payment_id: Optional[str] = Field(default=None)
+    # Orders are opened separately (create-order-recurring), often well after the rule was created
+    order_created_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column("order_created_at", DateTime(timezone=True), nullable=True),
+    )
+    reconciled_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column("reconciled_at", DateTime(timezone=True), nullable=True),
+    )
+
+
+class SeatOccupancyHour(SQLModel, table=True):
+    """Analytics rollup: minutes each seat was booked within each hour bucket."""
+    __table_args__ = (Index("ix_seatoccupancyhour_hour_start", "hour_start"),)
+
+    seat_id: int = Field(foreign_key="seat.id", primary_key=True)
+    hour_start: datetime = Field(
+        sa_column=Column("hour_start", DateTime(timezone=True), primary_key=True),
+    )
+    occupied_minutes: float = Field(default=0)
+
+
+class RevenueDaily(SQLModel, table=True):
+    """Revenue ledger: completed payments per local day (ANALYTICS_TIMEZONE) and booking kind."""
+    day: date = Field(primary_key=True)
+    seat_type: str = Field(primary_key=True)
+    duration_unit: str = Field(primary_key=True)     # BookingDuration member name, e.g. 'HOURLY'
+    section: str = Field(primary_key=True)
+    amount: float = Field(default=0)
+    payments: int = Field(default=0)
+
+
+class IdempotencyRecord(SQLModel, table=True):
+    """Stored response for an ``Idempotency-Key``; ``status_code`` is NULL while the first request runs."""
+    key: str = Field(primary_key=True)           # sha256(principal, method, path, Idempotency-Key)
+    request_hash: str                            # sha256 of the request body
+    status_code: Optional[int] = Field(default=None)
+    content_type: Optional[str] = Field(default=None)
+    response_body: Optional[bytes] = Field(
+        default=None,
+        sa_column=Column("response_body", LargeBinary, nullable=True),
+    )
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column("created_at", DateTime(timezone=True), nullable=False),
+    )
+    expires_at: datetime = Field(
+        sa_column=Column("expires_at", DateTime(timezone=True), nullable=False, index=True),
+    )
+
+
+class SeatHold(SQLModel, table=True):
+    """Checkout lease on a seat; ignored (and overwritable) once ``expires_at`` has passed."""
+    seat_id: int = Field(foreign_key="seat.id", primary_key=True)
+    user_id: UUID = Field(foreign_key="user.id")
+    expires_at: datetime = Field(
+        sa_column=Column("expires_at", DateTime(timezone=True), nullable=False),
+    )
+
+
+class WebhookEvent(SQLModel, table=True):
+    """
+    Inbox of verified Razorpay webhook deliveries. The primary key is Razorpay's
+    event id, so a redelivered event is dropped on insert; ``processed_at`` is
+    NULL until the inbox worker has applied it.
+    """
+    __table_args__ = (
+        # Worker drain order and inbox depth / lag metrics
+        Index(
+            "ix_webhookevent_unprocessed_received_at", "received_at",
+            postgresql_where=text("processed_at IS NULL"),
+        ),
+    )
 
-    booking: "Booking" = Relationship(back_populates="payment")
+    event_id: str = Field(primary_key=True)      # x-razorpay-event-id (sha256 of the body if absent)
+    event: str                                   # e.g. "payment.captured"
+    payload: str = Field(sa_column=Column("payload", Text, nullable=False))
+    received_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column("received_at", DateTime(timezone=True), nullable=False),
+    )
+    processed_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column("processed_at", DateTime(timezone=True), nullable=True, index=True),
+    )
+    attempts: int = Field(default=0)
+    last_error: Optional[str] = Field(default=None)
+
+
+class RefreshToken(SQLModel, table=True):
+    """
+    One link in a rotating refresh-token chain. Only the SHA-256 of the token is
+    stored. ``used_at`` is set when it is exchanged for its successor (same
+    ``family_id``); ``revoked_at`` on logout or when a used token comes back.
+    """
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    token_hash: str = Field(unique=True, index=True)
+    user_id: UUID = Field(foreign_key="user.id", index=True)
+    family_id: UUID = Field(index=True)          # one per password login
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column("created_at", DateTime(timezone=True), nullable=False),
+    )
+    expires_at: datetime = Field(
+        sa_column=Column("expires_at", DateTime(timezone=True), nullable=False, index=True),
+    )
+    used_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column("used_at", DateTime(timezone=True), nullable=True),
+    )
+    revoked_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column("revoked_at", DateTime(timezone=True), nullable=True),
+    )
+
+
+class RateLimitBucket(SQLModel, table=True):
+    """Shared token bucket for ``RATE_LIMIT_BACKEND=postgres``; absent rows are full buckets."""
+    key: str = Field(primary_key=True)           # "<rule>:<ip or user>"
+    tokens: float
+    updated_at: datetime = Field(
+        sa_column=Column("updated_at", DateTime(timezone=True), nullable=False, index=True),
+    )
+
+
+class KycDocumentInfo(SQLModel, table=True):
+    """
+    Background analysis of a stored KYC document, keyed by its blob key (the
+    content hash), so identical uploads share one row and one preview.
+    """
+    __table_args__ = (
+        # Processor claim order
+        Index(
+            "ix_kycdocumentinfo_pending_created_at", "created_at",
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
+
+    key: str = Field(primary_key=True)
+    status: str = Field(default="pending")       # pending | ready | failed
+    size: Optional[int] = Field(default=None)
+    detected_type: Optional[str] = Field(default=None)     # sniffed from the content; NULL if unrecognised
+    preview_key: Optional[str] = Field(default=None)       # blob store key of the JPEG preview
+    preview_width: Optional[int] = Field(default=None)
+    preview_height: Optional[int] = Field(default=None)
+    attempts: int = Field(default=0)
+    last_error: Optional[str] = Field(default=None)
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column("created_at", DateTime(timezone=True), nullable=False),
+    )
+    claimed_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column("claimed_at", DateTime(timezone=True), nullable=True),
+    )
+    processed_at: Optional[datetime] = Field(
+        default=None,
+        sa_column=Column("processed_at", DateTime(timezone=True), nullable=True),
+    )
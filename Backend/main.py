@@ -4,11 +4,45 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.db.database import init_db
 from app.api import auth, seats, bookings, admin, payment
 from app.core.config import settings
+from app.core.background import PeriodicTask
+from app.core.gateway import gateway
+from app.core.idempotency import IdempotencyMiddleware, purge_expired
+from app.core.kyc_processing import kyc_processor
+from app.core.passwords import password_hasher
+from app.core.ratelimit import RateLimitMiddleware, rate_limiter
+from app.core.reaper import reap_pending_bookings
+from app.core.reconciliation import reconcile_pending_orders
+from app.core.refresh_tokens import purge_expired_refresh_tokens
+from app.core.seat_events import broadcaster
+from app.core.webhook_inbox import inbox_worker, purge_processed_events
+
+periodic_tasks = [
+    PeriodicTask("pending-booking-reaper", settings.PENDING_REAPER_INTERVAL_SECONDS, reap_pending_bookings),
+    PeriodicTask("idempotency-purge", settings.IDEMPOTENCY_PURGE_INTERVAL_SECONDS, purge_expired),
+    PeriodicTask("webhook-inbox-purge", 3600, purge_processed_events),
+    PeriodicTask("refresh-token-purge", 3600, purge_expired_refresh_tokens),
+    PeriodicTask("payment-reconciliation", settings.RECONCILE_INTERVAL_SECONDS, reconcile_pending_orders),
+    PeriodicTask("rate-limit-sweep", settings.RATE_LIMIT_SWEEP_INTERVAL_SECONDS, rate_limiter.sweep),
+]
 
 @asynccontextmanager
 async def lifespan(_app: FastAPI):
     init_db()
+    await gateway.start()
+    password_hasher.start()
+    broadcaster.start()
+    inbox_worker.start()
+    kyc_processor.start()
+    for task in periodic_tasks:
+        task.start()
     yield
+    for task in periodic_tasks:
+        await task.stop()
+    await kyc_processor.stop()
+    await inbox_worker.stop()
+    await broadcaster.stop()
+    await gateway.aclose()
+    password_hasher.shutdown()
 
 app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
 
@@ -21,6 +55,16 @@ REQUIRED_ORIGINS = [
 
 origins = list(set(settings.CORS_ORIGINS + REQUIRED_ORIGINS))
 
+# Registered before CORS so replayed responses still get CORS headers
+app.add_middleware(
+    IdempotencyMiddleware,
+    paths=("/bookings/create/", "/bookings/recurring", "/payment/create-order", "/admin/bookings/create-order"),
+)
+
+# Outside the idempotency layer so throttled calls never claim a key; inside CORS so 429s carry its headers
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
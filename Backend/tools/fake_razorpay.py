@@ -0,0 +1,217 @@
+"""
+Local stand-in for the Razorpay REST API, for development and load tests.
+
+Implements the calls the backend makes (``POST /v1/orders``,
+``GET /v1/orders/{id}/payments``) plus one helper Razorpay does not have,
+``POST /v1/orders/{id}/pay``, which plays the part of the customer finishing
+Checkout: it records a payment, returns the signed fields the browser would
+send to ``/payment/verify`` and, after ``--webhook-delay-ms``, POSTs a signed
+``payment.captured`` / ``payment.failed`` event to ``--webhook-url``.
+
+    python -m tools.fake_razorpay --port 9100 --webhook-url http://localhost:8000/payment/webhook
+
+and run the backend with
+
+    RAZORPAY_API_BASE_URL=http://localhost:9100/v1
+    RAZORPAY_KEY_ID=rzp_test_fake RAZORPAY_KEY_SECRET=fake_secret RAZORPAY_WEBHOOK_SECRET=fake_webhook_secret
+
+Latency and failure knobs: ``--latency-ms`` / ``--jitter-ms`` delay every API
+call, ``--error-rate`` answers a share of them with 503, ``--decline-rate``
+fails a share of payments, and ``--webhook-drop-rate`` /
+``--webhook-duplicate-rate`` lose or redeliver webhooks. State lives in memory.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import random
+import secrets
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+
+
+@dataclass
+class FakeConfig:
+    key_id: str = "rzp_test_fake"
+    key_secret: str = "fake_secret"
+    webhook_secret: str = "fake_webhook_secret"
+    webhook_url: Optional[str] = None
+    latency_ms: float = 0
+    jitter_ms: float = 0
+    error_rate: float = 0
+    decline_rate: float = 0
+    webhook_delay_ms: float = 200
+    webhook_drop_rate: float = 0
+    webhook_duplicate_rate: float = 0
+
+
+@dataclass
+class FakeState:
+    orders: dict[str, dict] = field(default_factory=dict)
+    payments: dict[str, list[dict]] = field(default_factory=dict)     # order id -> payments
+
+
+def _random_id(prefix: str) -> str:
+    return f"{prefix}_{secrets.token_hex(7)}"
+
+
+def sign(secret: str, message: bytes) -> str:
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def create_app(config: FakeConfig) -> FastAPI:
+    app = FastAPI(title="Fake Razorpay")
+    state = FakeState()
+    client = httpx.AsyncClient(timeout=10)
+    background: set[asyncio.Task] = set()
+
+    async def _simulate(request: Request) -> None:
+        header = request.headers.get("authorization", "")
+        expected = "Basic " + base64.b64encode(f"{config.key_id}:{config.key_secret}".encode()).decode()
+        if not hmac.compare_digest(header, expected):
+            raise HTTPException(status_code=401, detail={"error": {"code": "BAD_REQUEST_ERROR", "description": "Authentication failed"}})
+        delay = config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if random.random() < config.error_rate:
+            raise HTTPException(status_code=503, detail={"error": {"code": "SERVER_ERROR", "description": "Injected failure"}})
+
+    async def _deliver(event: str, payment: dict) -> None:
+        await asyncio.sleep(config.webhook_delay_ms / 1000)
+        if random.random() < config.webhook_drop_rate:
+            return
+        body = json.dumps({
+            "entity": "event",
+            "event": event,
+            "created_at": int(time.time()),
+            "payload": {"payment": {"entity": payment}},
+        }).encode()
+        headers = {
+            "content-type": "application/json",
+            "x-razorpay-signature": sign(config.webhook_secret, body),
+            "x-razorpay-event-id": _random_id("evt"),
+        }
+        deliveries = 2 if random.random() < config.webhook_duplicate_rate else 1
+        for _ in range(deliveries):
+            try:
+                await client.post(config.webhook_url, content=body, headers=headers)
+            except httpx.HTTPError as exc:
+                print(f"webhook delivery failed: {exc!r}")
+
+    @app.on_event("shutdown")
+    async def _close() -> None:
+        await client.aclose()
+
+    @app.post("/v1/orders")
+    async def create_order(request: Request):
+        await _simulate(request)
+        body = await request.json()
+        if not isinstance(body.get("amount"), int) or body["amount"] < 100:
+            raise HTTPException(status_code=400, detail={"error": {"code": "BAD_REQUEST_ERROR", "description": "amount must be at least 100 paise"}})
+        order = {
+            "id": _random_id("order"),
+            "entity": "order",
+            "amount": body["amount"],
+            "amount_paid": 0,
+            "amount_due": body["amount"],
+            "currency": body.get("currency", "INR"),
+            "receipt": body.get("receipt"),
+            "notes": body.get("notes", {}),
+            "status": "created",
+            "attempts": 0,
+            "created_at": int(time.time()),
+        }
+        state.orders[order["id"]] = order
+        state.payments[order["id"]] = []
+        return order
+
+    @app.get("/v1/orders/{order_id}/payments")
+    async def order_payments(order_id: str, request: Request):
+        await _simulate(request)
+        if order_id not in state.orders:
+            raise HTTPException(status_code=400, detail={"error": {"code": "BAD_REQUEST_ERROR", "description": "The id provided does not exist"}})
+        items = state.payments[order_id]
+        return {"entity": "collection", "count": len(items), "items": items}
+
+    @app.post("/v1/orders/{order_id}/pay")
+    async def pay(order_id: str, notify: bool = True):
+        """Test helper: complete Checkout for the order (no auth, no injected errors)."""
+        order = state.orders.get(order_id)
+        if order is None:
+            raise HTTPException(status_code=404, detail="Unknown order")
+        captured = random.random() >= config.decline_rate
+        payment = {
+            "id": _random_id("pay"),
+            "entity": "payment",
+            "amount": order["amount"],
+            "currency": order["currency"],
+            "status": "captured" if captured else "failed",
+            "order_id": order_id,
+            "method": "card",
+            "captured": captured,
+            "created_at": int(time.time()),
+        }
+        state.payments[order_id].append(payment)
+        order["attempts"] += 1
+        if captured:
+            order.update(status="paid", amount_paid=order["amount"], amount_due=0)
+        else:
+            order["status"] = "attempted"
+
+        if notify and config.webhook_url:
+            task = asyncio.create_task(_deliver("payment.captured" if captured else "payment.failed", payment))
+            background.add(task)
+            task.add_done_callback(background.discard)
+
+        result = {"status": payment["status"], "razorpay_order_id": order_id, "razorpay_payment_id": payment["id"]}
+        if captured:
+            result["razorpay_signature"] = sign(config.key_secret, f"{order_id}|{payment['id']}".encode())
+        return result
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--key-id", default=FakeConfig.key_id)
+    parser.add_argument("--key-secret", default=FakeConfig.key_secret)
+    parser.add_argument("--webhook-secret", default=FakeConfig.webhook_secret)
+    parser.add_argument("--webhook-url", help="backend /payment/webhook URL; omit to send no webhooks")
+    parser.add_argument("--latency-ms", type=float, default=0, help="added to every API call")
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0, help="share of API calls answered with 503")
+    parser.add_argument("--decline-rate", type=float, default=0, help="share of payments that fail")
+    parser.add_argument("--webhook-delay-ms", type=float, default=200)
+    parser.add_argument("--webhook-drop-rate", type=float, default=0)
+    parser.add_argument("--webhook-duplicate-rate", type=float, default=0)
+    args = parser.parse_args()
+
+    config = FakeConfig(
+        key_id=args.key_id,
+        key_secret=args.key_secret,
+        webhook_secret=args.webhook_secret,
+        webhook_url=args.webhook_url,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        decline_rate=args.decline_rate,
+        webhook_delay_ms=args.webhook_delay_ms,
+        webhook_drop_rate=args.webhook_drop_rate,
+        webhook_duplicate_rate=args.webhook_duplicate_rate,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
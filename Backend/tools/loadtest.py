@@ -0,0 +1,212 @@
+"""
+End-to-end load harness for the checkout flow.
+
+Each virtual user registers, logs in and then repeats the booking journey
+until ``--duration`` runs out:
+
+    GET /seats/available -> POST /payment/create-order-batch
+    -> (customer pays on the fake gateway) -> POST /payment/verify
+
+Run it against a backend whose RAZORPAY_API_BASE_URL points at
+``tools.fake_razorpay`` (the payment step calls its ``/pay`` helper). Start
+the fake with ``--webhook-url`` to exercise the webhook inbox at the same time.
+
+    python -m tools.loadtest --api-url http://localhost:8000 \\
+        --razorpay-url http://localhost:9100/v1 --users 50 --duration 60
+
+Prints throughput and p50 / p95 / p99 latency per endpoint. Seat conflicts
+(409 from create-order-batch) are expected under contention and counted
+separately from errors. Only point this at a disposable database.
+
+All virtual users share one client IP, so start the backend with
+``RATE_LIMIT_ENABLED=false`` (or raise the ``RATE_LIMIT_*`` limits): the auth
+bucket admits about 20 registrations per IP and create-order is limited per
+user. Rate-limited calls (429) are reported in their own column and left out
+of the latencies and failures.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+import httpx
+
+
+@dataclass
+class EndpointStats:
+    latencies_ms: list[float] = field(default_factory=list)
+    statuses: dict[int, int] = field(default_factory=lambda: defaultdict(int))
+    failures: int = 0          # transport errors and unexpected statuses
+    throttled: int = 0         # 429 from the rate limiter; not a latency sample
+
+    def record(self, status_code: int, elapsed_ms: float) -> None:
+        self.statuses[status_code] += 1
+        if status_code == 429:
+            self.throttled += 1
+        else:
+            self.latencies_ms.append(elapsed_ms)
+
+    def percentile(self, pct: float) -> float:
+        ordered = sorted(self.latencies_ms)
+        if not ordered:
+            return 0.0
+        rank = max(int(round(pct / 100 * len(ordered))) - 1, 0)
+        return ordered[min(rank, len(ordered) - 1)]
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.endpoints: dict[str, EndpointStats] = defaultdict(EndpointStats)
+        self.journeys = 0
+        self.conflicts = 0
+        self.declined = 0
+
+    async def call(
+        self, client: httpx.AsyncClient, name: str, method: str, url: str, expected: tuple[int, ...], **kwargs,
+    ) -> httpx.Response | None:
+        stats = self.endpoints[name]
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            stats.failures += 1
+            return None
+        stats.record(response.status_code, (time.perf_counter() - started) * 1000)
+        if response.status_code not in expected and response.status_code != 429:
+            stats.failures += 1
+        return response
+
+    def report(self, elapsed: float) -> None:
+        print(f"\n{self.journeys} paid journeys in {elapsed:.1f}s ({self.journeys / elapsed:.1f}/s), "
+              f"{self.conflicts} seat conflicts, {self.declined} declined payments\n")
+        print(f"{'endpoint':<28} {'requests':>9} {'req/s':>7} {'fail':>6} {'429':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}  statuses")
+        for name, stats in self.endpoints.items():
+            count = len(stats.latencies_ms)
+            statuses = " ".join(f"{code}:{n}" for code, n in sorted(stats.statuses.items()))
+            print(
+                f"{name:<28} {count:>9} {count / elapsed:>7.1f} {stats.failures:>6} {stats.throttled:>6} "
+                f"{stats.percentile(50):>8.1f} {stats.percentile(95):>8.1f} {stats.percentile(99):>8.1f} "
+                f"{max(stats.latencies_ms, default=0):>8.1f}  {statuses}"
+            )
+        all_latencies = [ms for stats in self.endpoints.values() for ms in stats.latencies_ms]
+        if all_latencies:
+            print(f"\noverall mean {statistics.fmean(all_latencies):.1f} ms over {len(all_latencies)} requests")
+        report_throttled(sum(stats.throttled for stats in self.endpoints.values()))
+
+
+def report_throttled(count: int) -> None:
+    """Point at the rate limiter when a run was throttled; its 429s measure the limiter, not the endpoint."""
+    if count:
+        print(
+            f"\n{count} requests were rate limited (429). Run the backend with RATE_LIMIT_ENABLED=false "
+            "(or higher RATE_LIMIT_* limits) for load tests."
+        )
+
+
+async def _virtual_user(
+    index: int, args: argparse.Namespace, recorder: Recorder, deadline: float,
+    api: httpx.AsyncClient, gateway: httpx.AsyncClient,
+) -> None:
+    email = f"load-{uuid.uuid4().hex[:12]}@example.invalid"
+    password = "load-test-password"
+    response = await recorder.call(api, "POST /auth/register", "POST", "/auth/register", (201,), json={
+        "email": email,
+        "full_name": f"Load User {index}",
+        "password": password,
+        "gov_id_type": "PAN",
+        "gov_id_number": f"LOAD{index:06d}",
+    })
+    if response is None or response.status_code != 201:
+        return
+    response = await recorder.call(api, "POST /auth/login", "POST", "/auth/login", (200,), data={
+        "username": email, "password": password,
+    })
+    if response is None or response.status_code != 200:
+        return
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    while time.monotonic() < deadline:
+        response = await recorder.call(api, "GET /seats/available", "GET", "/seats/available", (200,), headers=headers)
+        if response is None or response.status_code != 200:
+            continue
+        free = [seat["id"] for seat in response.json() if seat["is_available"] and not seat.get("held_until")]
+        if len(free) < args.seats_per_order:
+            await asyncio.sleep(1)
+            continue
+
+        order_headers = {**headers, "Idempotency-Key": uuid.uuid4().hex}
+        response = await recorder.call(
+            api, "POST /payment/create-order-batch", "POST", "/payment/create-order-batch", (201, 409),
+            headers=order_headers,
+            json={
+                "seat_ids": random.sample(free, args.seats_per_order),
+                "duration_unit": args.duration_unit,
+                "duration_quantity": 1,
+            },
+        )
+        if response is None:
+            continue
+        if response.status_code == 409:
+            recorder.conflicts += 1
+            continue
+        if response.status_code == 429:
+            await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+            continue
+        if response.status_code != 201:
+            continue
+        order_id = response.json()["razorpay_order_id"]
+
+        response = await recorder.call(
+            gateway, "POST (fake) /orders/{id}/pay", "POST", f"/orders/{order_id}/pay", (200,),
+        )
+        if response is None or response.status_code != 200:
+            continue
+        paid = response.json()
+        if paid["status"] != "captured":
+            recorder.declined += 1
+            continue
+
+        response = await recorder.call(
+            api, "POST /payment/verify", "POST", "/payment/verify", (200,), headers=headers,
+            json={key: paid[key] for key in ("razorpay_order_id", "razorpay_payment_id", "razorpay_signature")},
+        )
+        if response is not None and response.status_code == 200:
+            recorder.journeys += 1
+        if args.think_ms:
+            await asyncio.sleep(random.uniform(0, args.think_ms) / 1000)
+
+
+async def run(args: argparse.Namespace) -> None:
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.users * 2, max_keepalive_connections=args.users * 2)
+    async with httpx.AsyncClient(base_url=args.api_url, limits=limits, timeout=args.timeout) as api, \
+            httpx.AsyncClient(base_url=args.razorpay_url, limits=limits, timeout=args.timeout) as gateway:
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*(
+            _virtual_user(index, args, recorder, deadline, api, gateway) for index in range(args.users)
+        ))
+        recorder.report(time.monotonic() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--api-url", default="http://localhost:8000")
+    parser.add_argument("--razorpay-url", default="http://localhost:9100/v1", help="fake gateway base URL")
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of booking journeys")
+    parser.add_argument("--seats-per-order", type=int, default=1)
+    parser.add_argument("--duration-unit", default="hourly", choices=["hourly", "daily", "monthly", "yearly"])
+    parser.add_argument("--think-ms", type=float, default=0, help="max random pause between journeys")
+    parser.add_argument("--timeout", type=float, default=30)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Seat-listing latency during a login storm.
+
+Samples ``GET /seats`` latency on its own, then again while ``--storm``
+concurrent clients hammer ``POST /auth/login`` (each one a full PBKDF2
+verification). With hashing in its own process pool the two distributions
+should be close; if seat listing degrades with the storm, hashing is
+competing with request handling again.
+
+    python -m tools.login_storm --api-url http://localhost:8000 --storm 100 --seconds 20
+
+Registers one throwaway user first. 503 answers to logins are the hashing
+queue timing out (PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS) and are counted, not
+treated as failures.
+
+Every client shares one IP, and the login bucket admits about 20 logins per
+IP before answering 429 without hashing anything, so start the backend with
+``RATE_LIMIT_ENABLED=false`` (or a much higher ``RATE_LIMIT_AUTH_*``).
+Throttled logins are reported separately and not counted as logins.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+import uuid
+from collections import Counter
+
+import httpx
+
+from tools.loadtest import EndpointStats, report_throttled
+
+
+async def _sample_seats(client: httpx.AsyncClient, deadline: float, interval: float) -> EndpointStats:
+    stats = EndpointStats()
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await client.get("/seats/")
+            stats.record(response.status_code, (time.perf_counter() - started) * 1000)
+        except httpx.HTTPError:
+            stats.failures += 1
+        await asyncio.sleep(interval)
+    return stats
+
+
+async def _storm(client: httpx.AsyncClient, email: str, password: str, deadline: float, outcomes: Counter) -> None:
+    while time.monotonic() < deadline:
+        try:
+            response = await client.post("/auth/login", data={"username": email, "password": password})
+            outcomes[response.status_code] += 1
+        except httpx.HTTPError:
+            outcomes["error"] += 1
+
+
+def _line(label: str, stats: EndpointStats) -> str:
+    return (
+        f"{label:<16} {len(stats.latencies_ms):>8} {stats.percentile(50):>8.1f} "
+        f"{stats.percentile(95):>8.1f} {stats.percentile(99):>8.1f} {max(stats.latencies_ms, default=0):>8.1f}"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    email = f"storm-{uuid.uuid4().hex[:12]}@example.invalid"
+    password = "login-storm-password"
+    limits = httpx.Limits(max_connections=args.storm + 10)
+    async with httpx.AsyncClient(base_url=args.api_url, limits=limits, timeout=60) as client:
+        response = await client.post("/auth/register", json={
+            "email": email, "full_name": "Login Storm", "password": password,
+            "gov_id_type": "PAN", "gov_id_number": "STORM0001",
+        })
+        response.raise_for_status()
+
+        baseline = await _sample_seats(client, time.monotonic() + args.seconds, args.interval)
+
+        outcomes: Counter = Counter()
+        deadline = time.monotonic() + args.seconds
+        storm = [asyncio.create_task(_storm(client, email, password, deadline, outcomes)) for _ in range(args.storm)]
+        loaded = await _sample_seats(client, deadline, args.interval)
+        await asyncio.gather(*storm)
+
+    print(f"{'GET /seats':<16} {'samples':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    print(_line("idle", baseline))
+    print(_line(f"{args.storm} logins", loaded))
+    # Only answers that went through a password verification count as logins
+    logins = sum(count for key, count in outcomes.items() if key not in ("error", 429, 503))
+    print(f"\nlogins: {logins} in {args.seconds:.0f}s ({logins / args.seconds:.1f}/s), outcomes {dict(outcomes)}")
+    print(f"throttled (429): {outcomes[429]}, hashing queue timeouts (503): {outcomes[503]}")
+    report_throttled(outcomes[429])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--api-url", default="http://localhost:8000")
+    parser.add_argument("--storm", type=int, default=50, help="concurrent login clients")
+    parser.add_argument("--seconds", type=float, default=15, help="length of each phase")
+    parser.add_argument("--interval", type=float, default=0.05, help="pause between seat samples")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
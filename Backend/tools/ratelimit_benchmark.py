@@ -0,0 +1,100 @@
+"""
+Per-request overhead of ``RateLimitMiddleware`` with the in-memory backend.
+
+Drives the middleware in-process around a no-op ASGI app, so only the limiter
+itself is timed: a route it does not cover, an IP-limited route
+(``/auth/login``) and a route limited per user and per IP
+(``/payment/create-order-batch``, bearer token decoded on every call). Requests
+come from ``--clients`` distinct addresses and limits are raised so nothing is
+refused. Exits non-zero if any path costs more than ``--budget-us``.
+
+    python -m tools.ratelimit_benchmark --requests 200000 --clients 10000
+
+Needs the backend environment (``.env``) for settings; no database is used.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+
+from app.core.auth import create_access_token
+from app.core.ratelimit import MemoryBackend, RateLimiter, RateLimitMiddleware, RateLimitRule, default_rules
+
+
+async def _noop_app(scope, receive, send) -> None:
+    return None
+
+
+async def _noop_send(message) -> None:
+    return None
+
+
+async def _noop_receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+def _scopes(path: str, clients: int, token: str | None) -> list[dict]:
+    headers = [(b"content-type", b"application/json")]
+    if token:
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    return [
+        {
+            "type": "http", "method": "POST", "path": path, "headers": headers,
+            "client": (f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}", 40000),
+        }
+        for index in range(clients)
+    ]
+
+
+async def _time(app, scopes: list[dict], requests: int) -> float:
+    """Mean microseconds per call."""
+    count = len(scopes)
+    started = time.perf_counter()
+    for index in range(requests):
+        await app(scopes[index % count], _noop_receive, _noop_send)
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+async def run(args: argparse.Namespace) -> int:
+    # Same rules as production, with limits nobody reaches in the run
+    rules = tuple(
+        RateLimitRule(rule.name, rule.paths, rule.key, per_minute=1e9, burst=10**9) for rule in default_rules()
+    )
+    backend = MemoryBackend()
+    middleware = RateLimitMiddleware(_noop_app, RateLimiter(rules, backend))
+    token = create_access_token("bench@example.invalid")
+
+    cases = [
+        ("unlimited route", _scopes("/seats/available", args.clients, None)),
+        ("per-IP route", _scopes("/auth/login", args.clients, None)),
+        ("per-user + IP", _scopes("/payment/create-order-batch", args.clients, token)),
+    ]
+    baseline = await _time(_noop_app, cases[0][1], args.requests)
+    print(f"{args.requests} requests per case from {args.clients} addresses; bare app {baseline:.2f} µs/call\n")
+    print(f"{'case':<18} {'µs/call':>9} {'overhead':>9}")
+    over_budget = False
+    for label, scopes in cases:
+        await _time(middleware, scopes, min(args.requests, len(scopes)))       # create the buckets
+        per_call = await _time(middleware, scopes, args.requests)
+        overhead = per_call - baseline
+        over_budget |= overhead > args.budget_us
+        print(f"{label:<18} {per_call:>9.2f} {overhead:>9.2f}")
+    print(f"\n{backend.size()} live buckets")
+    if over_budget:
+        print(f"FAIL: overhead above {args.budget_us:.0f} µs per request")
+        return 1
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100_000, help="timed calls per case")
+    parser.add_argument("--clients", type=int, default=10_000, help="distinct client addresses")
+    parser.add_argument("--budget-us", type=float, default=50)
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Throughput of ``POST /auth/refresh`` against ``POST /auth/login``.
+
+Registers one throwaway user, then runs two phases of ``--seconds`` each with
+``--clients`` concurrent clients: the first re-logs in with the password in a
+loop (one PBKDF2 verification per call), the second logs in once per client
+and then rotates its refresh token in a loop (one SHA-256 and two small
+writes per call). Each client keeps its own token family, since presenting a
+rotated token twice would revoke it.
+
+    python -m tools.refresh_benchmark --api-url http://localhost:8000 --clients 20 --seconds 15
+
+503 answers to logins are the hashing queue timing out and are counted, not
+treated as failures.
+
+All clients share one IP and ``/auth/login`` is limited per IP (about 20
+logins, then 10 a minute), so start the backend with ``RATE_LIMIT_ENABLED=false``
+(or a much higher ``RATE_LIMIT_AUTH_*``); otherwise the login phase mostly
+measures 429s. Throttled calls are reported in their own column, and a client
+whose phase-two login is throttled sits that phase out.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+from tools.loadtest import EndpointStats, report_throttled
+
+
+async def _timed(client: httpx.AsyncClient, stats: EndpointStats, url: str, **kwargs) -> httpx.Response | None:
+    started = time.perf_counter()
+    try:
+        response = await client.post(url, **kwargs)
+    except httpx.HTTPError:
+        stats.failures += 1
+        return None
+    stats.record(response.status_code, (time.perf_counter() - started) * 1000)
+    return response
+
+
+async def _login_loop(client: httpx.AsyncClient, credentials: dict, deadline: float, stats: EndpointStats) -> None:
+    while time.monotonic() < deadline:
+        await _timed(client, stats, "/auth/login", data=credentials)
+
+
+async def _refresh_loop(client: httpx.AsyncClient, credentials: dict, deadline: float, stats: EndpointStats) -> None:
+    response = await client.post("/auth/login", data=credentials)
+    if response.status_code == 429:
+        stats.throttled += 1
+        return
+    response.raise_for_status()
+    token = response.json()["refresh_token"]
+    while time.monotonic() < deadline:
+        response = await _timed(client, stats, "/auth/refresh", json={"refresh_token": token})
+        if response is None or response.status_code != 200:
+            stats.failures += 1
+            return
+        token = response.json()["refresh_token"]
+
+
+def _line(label: str, stats: EndpointStats, seconds: float) -> str:
+    ok = stats.statuses.get(200, 0)
+    statuses = " ".join(f"{code}:{n}" for code, n in sorted(stats.statuses.items()))
+    return (
+        f"{label:<16} {ok:>8} {ok / seconds:>8.1f} {stats.percentile(50):>8.1f} {stats.percentile(95):>8.1f} "
+        f"{stats.percentile(99):>8.1f} {stats.failures:>6} {stats.throttled:>6}  {statuses}"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    email = f"refresh-{uuid.uuid4().hex[:12]}@example.invalid"
+    password = "refresh-bench-password"
+    credentials = {"username": email, "password": password}
+    limits = httpx.Limits(max_connections=args.clients + 5)
+    async with httpx.AsyncClient(base_url=args.api_url, limits=limits, timeout=60) as client:
+        response = await client.post("/auth/register", json={
+            "email": email, "full_name": "Refresh Bench", "password": password,
+            "gov_id_type": "PAN", "gov_id_number": "REFRESH001",
+        })
+        response.raise_for_status()
+
+        logins = EndpointStats()
+        deadline = time.monotonic() + args.seconds
+        await asyncio.gather(*(_login_loop(client, credentials, deadline, logins) for _ in range(args.clients)))
+
+        refreshes = EndpointStats()
+        deadline = time.monotonic() + args.seconds
+        await asyncio.gather(*(_refresh_loop(client, credentials, deadline, refreshes) for _ in range(args.clients)))
+
+    print(f"{args.clients} clients, {args.seconds:.0f}s per phase\n")
+    print(f"{'endpoint':<16} {'ok':>8} {'ok/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'fail':>6} {'429':>6}  statuses")
+    print(_line("/auth/login", logins, args.seconds))
+    print(_line("/auth/refresh", refreshes, args.seconds))
+    login_rate = logins.statuses.get(200, 0) / args.seconds
+    if login_rate:
+        print(f"\nrefresh / login throughput: {refreshes.statuses.get(200, 0) / args.seconds / login_rate:.1f}x")
+    report_throttled(logins.throttled + refreshes.throttled)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--api-url", default="http://localhost:8000")
+    parser.add_argument("--clients", type=int, default=20, help="concurrent clients per phase")
+    parser.add_argument("--seconds", type=float, default=15, help="length of each phase")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Fan-out latency of ``GET /seats/stream`` with many live subscribers.
+
+Opens ``--streams`` Server-Sent Events connections (at most
+``--connect-concurrency`` handshakes at a time) and waits until each has
+received its ``retry:`` frame. Then it publishes one change, an admin lock on a
+free seat through ``PATCH /admin/seats/{id}/lock``, and times how long each
+stream takes to see the resulting ``seats`` event (or ``resync``, if its queue
+overflowed). The lock is removed again at the end.
+
+    python -m tools.seat_stream_fanout --api-url http://localhost:8000 --streams 5000 \\
+        --admin-email admin@example.com --admin-password secret
+
+Needs an open-file limit above ``--streams`` on both ends (``ulimit -n``), and
+SEAT_STREAM_MAX_SUBSCRIBERS at least that high on the server. Refused (503)
+connections are counted. Exits non-zero if a connected stream never saw the
+event within ``--timeout``.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from tools.loadtest import EndpointStats
+
+
+@dataclass
+class FanoutState:
+    target: int
+    connected: int = 0
+    refused: int = 0
+    errors: int = 0
+    resyncs: int = 0
+    published_at: float | None = None
+    received_at: list[float] = field(default_factory=list)
+    settled: asyncio.Event = field(default_factory=asyncio.Event)
+
+    def settle(self) -> None:
+        if self.connected + self.refused + self.errors >= self.target:
+            self.settled.set()
+
+
+async def _listen(client: httpx.AsyncClient, slots: asyncio.Semaphore, state: FanoutState) -> None:
+    await slots.acquire()
+    connected = False
+    try:
+        async with client.stream("GET", "/seats/stream") as response:
+            if response.status_code != 200:
+                state.refused += 1
+                return
+            async for line in response.aiter_lines():
+                if not connected:
+                    # First frame is the retry hint: the subscription is registered
+                    connected = True
+                    slots.release()
+                    state.connected += 1
+                    state.settle()
+                    continue
+                if state.published_at is None or line not in ("event: seats", "event: resync"):
+                    continue   # heartbeats, data lines, changes from before the publish
+                state.received_at.append(time.perf_counter())
+                if line == "event: resync":
+                    state.resyncs += 1
+                return
+    except httpx.HTTPError:
+        if not connected:
+            state.errors += 1
+    finally:
+        if not connected:
+            slots.release()
+            state.settle()
+
+
+async def _admin_headers(client: httpx.AsyncClient, email: str, password: str) -> dict:
+    response = await client.post("/auth/login", data={"username": email, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def _free_seat(client: httpx.AsyncClient, headers: dict) -> int:
+    response = await client.get("/admin/seats", headers=headers)
+    response.raise_for_status()
+    for seat in response.json():
+        if seat["is_available"] and not seat["is_locked"]:
+            return seat["id"]
+    raise SystemExit("No free, unlocked seat to publish a change with.")
+
+
+async def run(args: argparse.Namespace) -> bool:
+    limits = httpx.Limits(max_connections=args.streams + 10, max_keepalive_connections=args.streams + 10)
+    timeout = httpx.Timeout(30, read=None)
+    async with httpx.AsyncClient(base_url=args.api_url, limits=limits, timeout=timeout) as client:
+        headers = await _admin_headers(client, args.admin_email, args.admin_password)
+        seat_id = await _free_seat(client, headers)
+
+        state = FanoutState(target=args.streams)
+        slots = asyncio.Semaphore(args.connect_concurrency)
+        started = time.perf_counter()
+        listeners = [asyncio.create_task(_listen(client, slots, state)) for _ in range(args.streams)]
+        try:
+            await asyncio.wait_for(state.settled.wait(), timeout=args.timeout)
+        except asyncio.TimeoutError:
+            print(f"Only {state.connected} streams connected within {args.timeout:.0f}s")
+        connect_s = time.perf_counter() - started
+        await asyncio.sleep(1)   # the first subscriber makes the broadcaster take its baseline snapshot
+
+        lock = {"locked_until": (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat()}
+        state.published_at = time.perf_counter()
+        response = await client.patch(f"/admin/seats/{seat_id}/lock", json=lock, headers=headers)
+        ack_ms = (time.perf_counter() - state.published_at) * 1000
+        response.raise_for_status()
+
+        _, pending = await asyncio.wait(listeners, timeout=args.timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        await client.patch(f"/admin/seats/{seat_id}/lock", json={"locked_until": None}, headers=headers)
+
+    fanout = EndpointStats(latencies_ms=[(at - state.published_at) * 1000 for at in state.received_at])
+    missed = state.connected - len(state.received_at)
+    print(f"streams: {state.connected} connected in {connect_s:.1f}s, {state.refused} refused, {state.errors} failed")
+    print(f"publish: PATCH /admin/seats/{seat_id}/lock answered in {ack_ms:.1f} ms")
+    print(f"{'received':>9} {'resync':>7} {'missed':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    print(
+        f"{len(state.received_at):>9} {state.resyncs:>7} {missed:>7} {fanout.percentile(50):>8.1f} "
+        f"{fanout.percentile(95):>8.1f} {fanout.percentile(99):>8.1f} {fanout.percentile(100):>8.1f}"
+    )
+    return missed == 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--api-url", default="http://localhost:8000")
+    parser.add_argument("--streams", type=int, default=5000, help="concurrent SSE subscribers")
+    parser.add_argument("--connect-concurrency", type=int, default=200, help="handshakes in flight at once")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to connect, and to wait for the event")
+    parser.add_argument("--admin-email", default=os.getenv("ADMIN_EMAIL"))
+    parser.add_argument("--admin-password", default=os.getenv("ADMIN_PASSWORD"))
+    args = parser.parse_args()
+    if not args.admin_email or not args.admin_password:
+        parser.error("--admin-email and --admin-password (or ADMIN_EMAIL / ADMIN_PASSWORD) are required")
+    if not asyncio.run(run(args)):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
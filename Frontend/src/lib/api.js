@@ -36,11 +36,20 @@ const parseError = async (response) => {
   return `Request failed with status ${response.status}`;
 };
 
-export const registerUser = async (payload) => {
-  const response = await fetch(`${API_BASE_URL}/auth/register`, {
+/**
+ * Register with the form fields and an optional KYC `File`, sent as multipart form data
+ * so the document is uploaded as-is rather than base64-encoded inside JSON.
+ */
+export const registerUser = async (payload, kycFile = null) => {
+  const body = new FormData();
+  Object.entries(payload).forEach(([key, value]) => {
+    if (value !== undefined && value !== null) body.append(key, value);
+  });
+  if (kycFile) body.append('kyc_document', kycFile, kycFile.name);
+
+  const response = await fetch(`${API_BASE_URL}/auth/register/multipart`, {
     method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify(payload),
+    body,
   });
 
   if (!response.ok) {
@@ -69,50 +78,101 @@ export const loginUser = async (email, password) => {
   return response.json();
 };
 
-export const setAuthSession = ({ token, user }) => {
+export const setAuthSession = ({ token, refreshToken, user }) => {
   sessionStorage.setItem('token', token);
-  sessionStorage.setItem('user', JSON.stringify(user));
+  if (refreshToken) sessionStorage.setItem('refreshToken', refreshToken);
+  if (user) sessionStorage.setItem('user', JSON.stringify(user));
 };
 
 export const clearAuthSession = () => {
+  const refreshToken = sessionStorage.getItem('refreshToken');
+  if (refreshToken) {
+    // Best effort: revoke the refresh token server-side
+    fetch(`${API_BASE_URL}/auth/logout`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ refresh_token: refreshToken }),
+    }).catch(() => {});
+  }
   sessionStorage.removeItem('token');
+  sessionStorage.removeItem('refreshToken');
   sessionStorage.removeItem('user');
 };
 
-/* ─── Admin API ─── */
 const authHeaders = () => ({
   'Content-Type': 'application/json',
   Authorization: `Bearer ${sessionStorage.getItem('token')}`,
 });
 
+// Concurrent 401s share one refresh: a refresh token only works once.
+let pendingRefresh = null;
+
+const refreshAccessToken = () => {
+  if (!pendingRefresh) {
+    pendingRefresh = (async () => {
+      const refreshToken = sessionStorage.getItem('refreshToken');
+      if (!refreshToken) return false;
+      try {
+        const res = await fetch(`${API_BASE_URL}/auth/refresh`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ refresh_token: refreshToken }),
+        });
+        if (!res.ok) return false;
+        const data = await res.json();
+        setAuthSession({ token: data.access_token, refreshToken: data.refresh_token });
+        return true;
+      } catch {
+        return false;
+      }
+    })().finally(() => {
+      pendingRefresh = null;
+    });
+  }
+  return pendingRefresh;
+};
+
+/**
+ * fetch() with the bearer token. When the access token has expired, swaps the
+ * refresh token for a new pair once and retries, instead of sending the user
+ * back to the sign-in form.
+ */
+const authFetch = async (url, options = {}) => {
+  const send = () => fetch(url, { ...options, headers: { ...authHeaders(), ...options.headers } });
+  const res = await send();
+  if (res.status !== 401 || !(await refreshAccessToken())) return res;
+  return send();
+};
+
+/* ─── Admin API ─── */
+
 export const fetchAdminStats = async () => {
-  const res = await fetch(`${API_BASE_URL}/admin/stats`, { headers: authHeaders() });
+  const res = await authFetch(`${API_BASE_URL}/admin/stats`);
   if (!res.ok) throw new Error(await parseError(res));
   return res.json();
 };
 
 export const fetchAdminUsers = async () => {
-  const res = await fetch(`${API_BASE_URL}/admin/users`, { headers: authHeaders() });
+  const res = await authFetch(`${API_BASE_URL}/admin/users`);
   if (!res.ok) throw new Error(await parseError(res));
   return res.json();
 };
 
 export const fetchAdminBookings = async () => {
-  const res = await fetch(`${API_BASE_URL}/admin/bookings`, { headers: authHeaders() });
+  const res = await authFetch(`${API_BASE_URL}/admin/bookings`);
   if (!res.ok) throw new Error(await parseError(res));
   return res.json();
 };
 
 export const fetchAdminSeats = async () => {
-  const res = await fetch(`${API_BASE_URL}/admin/seats`, { headers: authHeaders() });
+  const res = await authFetch(`${API_BASE_URL}/admin/seats`);
   if (!res.ok) throw new Error(await parseError(res));
   return res.json();
 };
 
 export const createAdminSeat = async (payload) => {
-  const res = await fetch(`${API_BASE_URL}/admin/seats`, {
+  const res = await authFetch(`${API_BASE_URL}/admin/seats`, {
     method: 'POST',
-    headers: authHeaders(),
     body: JSON.stringify(payload),
   });
   if (!res.ok) throw new Error(await parseError(res));
@@ -120,9 +180,8 @@ export const createAdminSeat = async (payload) => {
 };
 
 export const updateAdminSeat = async (seatId, payload) => {
-  const res = await fetch(`${API_BASE_URL}/admin/seats/${seatId}`, {
+  const res = await authFetch(`${API_BASE_URL}/admin/seats/${seatId}`, {
     method: 'PATCH',
-    headers: authHeaders(),
     body: JSON.stringify(payload),
   });
   if (!res.ok) throw new Error(await parseError(res));
@@ -130,18 +189,16 @@ export const updateAdminSeat = async (seatId, payload) => {
 };
 
 export const resetSeatAvailability = async () => {
-  const res = await fetch(`${API_BASE_URL}/admin/seats/reset-availability`, {
+  const res = await authFetch(`${API_BASE_URL}/admin/seats/reset-availability`, {
     method: 'POST',
-    headers: authHeaders(),
   });
   if (!res.ok) throw new Error(await parseError(res));
   return res.json();
 };
 
 export const initializeSeats = async () => {
-  const res = await fetch(`${API_BASE_URL}/seats/initialize-office`, {
+  const res = await authFetch(`${API_BASE_URL}/seats/initialize-office`, {
     method: 'POST',
-    headers: authHeaders(),
   });
   if (!res.ok) throw new Error(await parseError(res));
   return res.json();
@@ -154,10 +211,28 @@ export const fetchSeats = async () => {
   return res.json();
 };
 
+/**
+ * Subscribe to live seat changes (Server-Sent Events).
+ * `onChanges` receives `[{ id, available, locked_until }]` diffs; `onResync` fires when
+ * the server asks the client to re-fetch the full list. Returns an unsubscribe function.
+ */
+export const subscribeSeatChanges = (onChanges, onResync) => {
+  if (typeof EventSource === 'undefined') return () => {};
+  const source = new EventSource(`${API_BASE_URL}/seats/stream`);
+  source.addEventListener('seats', (event) => {
+    try {
+      onChanges(JSON.parse(event.data));
+    } catch {
+      onResync();
+    }
+  });
+  source.addEventListener('resync', () => onResync());
+  return () => source.close();
+};
+
 export const createPaymentOrderBatch = async (payload) => {
-  const res = await fetch(`${API_BASE_URL}/payment/create-order-batch`, {
+  const res = await authFetch(`${API_BASE_URL}/payment/create-order-batch`, {
     method: 'POST',
-    headers: authHeaders(),
     body: JSON.stringify(payload),
   });
   if (!res.ok) throw new Error(await parseError(res));
@@ -166,9 +241,8 @@ export const createPaymentOrderBatch = async (payload) => {
 
 /* --- Admin KYC --- */
 export const lockAdminSeat = async (seatId, lockedUntil) => {
-  const res = await fetch(`${API_BASE_URL}/admin/seats/${seatId}/lock`, {
+  const res = await authFetch(`${API_BASE_URL}/admin/seats/${seatId}/lock`, {
     method: 'PATCH',
-    headers: authHeaders(),
     body: JSON.stringify({ locked_until: lockedUntil }),
   });
   if (!res.ok) throw new Error(await parseError(res));
@@ -176,21 +250,46 @@ export const lockAdminSeat = async (seatId, lockedUntil) => {
 };
 
 export const fetchAdminKYC = async () => {
-  const res = await fetch(`${API_BASE_URL}/admin/kyc`, { headers: authHeaders() });
+  const res = await authFetch(`${API_BASE_URL}/admin/kyc`);
   if (!res.ok) throw new Error(await parseError(res));
   return res.json();
 };
 
-export const fetchKYCDocument = async (userId) => {
-  const res = await fetch(`${API_BASE_URL}/admin/kyc/${userId}/document`, { headers: authHeaders() });
+/**
+ * Download a user's KYC document. Returns `{ document_name, document_data, content_type }`
+ * where `document_data` is an object URL; release it with `URL.revokeObjectURL` when done.
+ */
+export const fetchKYCDocument = async (userId, documentName) => {
+  const res = await authFetch(`${API_BASE_URL}/admin/kyc/${userId}/document`);
   if (!res.ok) throw new Error(await parseError(res));
-  return res.json();
+  const blob = await res.blob();
+  return {
+    document_name: documentName,
+    document_data: URL.createObjectURL(blob),
+    content_type: blob.type,
+  };
+};
+
+/**
+ * Download the small JPEG preview made for a KYC document in the background
+ * (only when the listing reports `has_preview`). Same shape as
+ * `fetchKYCDocument`, with `preview: true`.
+ */
+export const fetchKYCPreview = async (userId, documentName) => {
+  const res = await authFetch(`${API_BASE_URL}/admin/kyc/${userId}/preview`);
+  if (!res.ok) throw new Error(await parseError(res));
+  const blob = await res.blob();
+  return {
+    document_name: documentName,
+    document_data: URL.createObjectURL(blob),
+    content_type: blob.type,
+    preview: true,
+  };
 };
 
 export const verifyPayment = async (payload) => {
-  const res = await fetch(`${API_BASE_URL}/payment/verify`, {
+  const res = await authFetch(`${API_BASE_URL}/payment/verify`, {
     method: 'POST',
-    headers: authHeaders(),
     body: JSON.stringify(payload),
   });
   if (!res.ok) throw new Error(await parseError(res));
@@ -198,9 +297,8 @@ export const verifyPayment = async (payload) => {
 };
 
 export const createAdminBookingOrder = async (payload) => {
-  const res = await fetch(`${API_BASE_URL}/admin/bookings/create-order`, {
+  const res = await authFetch(`${API_BASE_URL}/admin/bookings/create-order`, {
     method: 'POST',
-    headers: authHeaders(),
     body: JSON.stringify(payload),
   });
   if (!res.ok) throw new Error(await parseError(res));
@@ -34,6 +34,7 @@ import {
   fetchAdminSeats,
   fetchAdminKYC,
   fetchKYCDocument,
+  fetchKYCPreview,
   createAdminSeat,
   updateAdminSeat,
   lockAdminSeat,
@@ -131,11 +132,15 @@ const AdminCRM = () => {
     }
   }, []);
 
-  const viewKYCDocument = async (userId) => {
+  // Opens the background-made preview when there is one; the full document is loaded on demand
+  const viewKYCDocument = async (userId, documentName, hasPreview = false) => {
     setKycDocLoading(true);
     try {
-      const doc = await fetchKYCDocument(userId);
-      setKycDocModal(doc);
+      const doc = hasPreview
+        ? await fetchKYCPreview(userId, documentName)
+        : await fetchKYCDocument(userId, documentName);
+      if (kycDocModal?.document_data) URL.revokeObjectURL(kycDocModal.document_data);
+      setKycDocModal({ ...doc, user_id: userId });
     } catch (err) {
       alert(err.message || 'Failed to load document');
     } finally {
@@ -143,6 +148,11 @@ const AdminCRM = () => {
     }
   };
 
+  const closeKYCDocument = () => {
+    if (kycDocModal?.document_data) URL.revokeObjectURL(kycDocModal.document_data);
+    setKycDocModal(null);
+  };
+
   const exportKYCToExcel = () => {
     const rows = kycRecords.map((u) => ({
       'Full Name': u.full_name,
@@ -1034,7 +1044,7 @@ const AdminCRM = () => {
                         <td style={{ padding: '0.85rem 1.25rem' }}>
                           {u.has_document ? (
                             <button
-                              onClick={() => viewKYCDocument(u.id)}
+                              onClick={() => viewKYCDocument(u.id, u.kyc_document_name, u.has_preview)}
                               disabled={kycDocLoading}
                               style={{ display: 'inline-flex', alignItems: 'center', gap: '0.35rem', fontSize: '0.58rem', fontWeight: 800, textTransform: 'uppercase', letterSpacing: '0.1em', color: '#a855f7', background: 'rgba(168,85,247,0.08)', border: '1px solid rgba(168,85,247,0.2)', borderRadius: '6px', padding: '0.3rem 0.65rem', cursor: 'pointer' }}
                             >
@@ -1301,26 +1311,36 @@ const AdminCRM = () => {
                   {kycDocModal.document_name || 'KYC Document'}
                 </span>
               </div>
-              <button onClick={() => setKycDocModal(null)} style={{ background: 'none', border: 'none', cursor: 'pointer', color: '#475569' }}><CloseIcon size={18} /></button>
+              <button onClick={closeKYCDocument} style={{ background: 'none', border: 'none', cursor: 'pointer', color: '#475569' }}><CloseIcon size={18} /></button>
             </div>
             <div style={{ maxHeight: '70vh', overflow: 'auto', padding: '1rem', display: 'flex', alignItems: 'center', justifyContent: 'center', background: '#0a0a14' }}>
-              {kycDocModal.document_data?.startsWith('data:image') ? (
+              {kycDocModal.content_type?.startsWith('image/') ? (
                 <img src={kycDocModal.document_data} alt="KYC Document" style={{ maxWidth: '100%', borderRadius: '8px' }} />
-              ) : kycDocModal.document_data?.startsWith('data:application/pdf') ? (
+              ) : kycDocModal.content_type === 'application/pdf' ? (
                 <iframe src={kycDocModal.document_data} title="KYC PDF" style={{ width: '100%', height: '60vh', border: 'none', borderRadius: '8px' }} />
               ) : (
                 <span style={{ color: '#475569', fontSize: '0.8rem' }}>Preview not available. <a href={kycDocModal.document_data} download={kycDocModal.document_name} style={{ color: '#a855f7' }}>Download</a></span>
               )}
             </div>
             <div style={{ padding: '1rem 1.5rem', borderTop: '1px solid rgba(255,255,255,0.05)', display: 'flex', justifyContent: 'flex-end', gap: '0.75rem' }}>
-              <a
-                href={kycDocModal.document_data}
-                download={kycDocModal.document_name || 'kyc-document'}
-                style={{ display: 'inline-flex', alignItems: 'center', gap: '0.4rem', padding: '0.55rem 1.25rem', borderRadius: '999px', background: 'rgba(168,85,247,0.1)', border: '1px solid rgba(168,85,247,0.25)', color: '#a855f7', fontSize: '0.62rem', fontWeight: 800, textTransform: 'uppercase', letterSpacing: '0.12em', textDecoration: 'none' }}
-              >
-                <Download size={12} /> Download
-              </a>
-              <button onClick={() => setKycDocModal(null)} style={{ padding: '0.55rem 1.25rem', borderRadius: '999px', border: '1px solid rgba(255,255,255,0.08)', background: 'transparent', color: '#64748b', fontSize: '0.62rem', fontWeight: 800, textTransform: 'uppercase', letterSpacing: '0.12em', cursor: 'pointer' }}>
+              {kycDocModal.preview ? (
+                <button
+                  onClick={() => viewKYCDocument(kycDocModal.user_id, kycDocModal.document_name)}
+                  disabled={kycDocLoading}
+                  style={{ display: 'inline-flex', alignItems: 'center', gap: '0.4rem', padding: '0.55rem 1.25rem', borderRadius: '999px', background: 'rgba(168,85,247,0.1)', border: '1px solid rgba(168,85,247,0.25)', color: '#a855f7', fontSize: '0.62rem', fontWeight: 800, textTransform: 'uppercase', letterSpacing: '0.12em', cursor: kycDocLoading ? 'not-allowed' : 'pointer' }}
+                >
+                  {kycDocLoading ? <Loader2 size={12} style={{ animation: 'spin 1s linear infinite' }} /> : <Eye size={12} />} Full document
+                </button>
+              ) : (
+                <a
+                  href={kycDocModal.document_data}
+                  download={kycDocModal.document_name || 'kyc-document'}
+                  style={{ display: 'inline-flex', alignItems: 'center', gap: '0.4rem', padding: '0.55rem 1.25rem', borderRadius: '999px', background: 'rgba(168,85,247,0.1)', border: '1px solid rgba(168,85,247,0.25)', color: '#a855f7', fontSize: '0.62rem', fontWeight: 800, textTransform: 'uppercase', letterSpacing: '0.12em', textDecoration: 'none' }}
+                >
+                  <Download size={12} /> Download
+                </a>
+              )}
+              <button onClick={closeKYCDocument} style={{ padding: '0.55rem 1.25rem', borderRadius: '999px', border: '1px solid rgba(255,255,255,0.08)', background: 'transparent', color: '#64748b', fontSize: '0.62rem', fontWeight: 800, textTransform: 'uppercase', letterSpacing: '0.12em', cursor: 'pointer' }}>
                 Close
               </button>
             </div>
@@ -3,7 +3,7 @@ import { useNavigate } from 'react-router-dom';
 import { motion, AnimatePresence } from 'framer-motion';
 import { Armchair, X, ChevronRight, Users, Building2, BriefcaseBusiness, ZoomIn, ZoomOut, RotateCcw, Box, Layers, Move } from 'lucide-react';
 import './BookingPage.css';
-import { fetchSeats } from '../lib/api';
+import { fetchSeats, subscribeSeatChanges } from '../lib/api';
 import {
   FloorPlanSVG, FLOOR_PLAN_SEATS, ZONE_COLORS,
   WHOLE_UNIT_TYPES, ZONE_PRIMARY_SEAT, ZONE_DISPLAY_LABEL,
@@ -54,8 +54,7 @@ const BookingPage = () => {
 
   useEffect(() => {
     let active = true;
-    setLoadingSeats(true);
-    fetchSeats()
+    const loadSeats = () => fetchSeats()
       .then((data) => {
         if (!active) return;
         setBackendSeats(Array.isArray(data) ? data : []);
@@ -69,8 +68,27 @@ const BookingPage = () => {
         if (active) setLoadingSeats(false);
       });
 
+    // Subscribe before the initial fetch so no change falls between the two
+    const unsubscribe = subscribeSeatChanges(
+      (changes) => {
+        if (!active) return;
+        const byId = new Map(changes.map((change) => [change.id, change]));
+        setBackendSeats((seats) => seats.map((seat) => {
+          const change = byId.get(seat.id);
+          return change
+            ? { ...seat, is_available: change.available, locked_until: change.locked_until, held_until: change.held_until }
+            : seat;
+        }));
+      },
+      loadSeats,
+    );
+
+    setLoadingSeats(true);
+    loadSeats();
+
     return () => {
       active = false;
+      unsubscribe();
     };
   }, []);
 
@@ -89,7 +89,7 @@ const Register = () => {
     occupationRole: '',
   });
 
-  const [kycFile, setKycFile] = useState(null); // { name, base64, type }
+  const [kycFile, setKycFile] = useState(null); // File
 
   const createStableId = (prefix) => {
     if (globalThis.crypto?.randomUUID)
@@ -114,11 +114,7 @@ const Register = () => {
       e.target.value = '';
       return;
     }
-    const reader = new FileReader();
-    reader.onload = () => {
-      setKycFile({ name: file.name, base64: reader.result, type: file.type });
-    };
-    reader.readAsDataURL(file);
+    setKycFile(file);
   };
 
   const removeFile = () => {
@@ -143,9 +139,7 @@ const Register = () => {
         mobile: formData.mobile.trim(),
         occupation_sector: formData.occupationSector,
         occupation_role: formData.occupationRole.trim() || undefined,
-        kyc_document_name: kycFile?.name || undefined,
-        kyc_document_data: kycFile?.base64 || undefined,
-      });
+      }, kycFile);
       const reference = data.user_id
         ? `VER-${String(data.user_id).slice(0, 8).toUpperCase()}`
         : createStableId('VER-');
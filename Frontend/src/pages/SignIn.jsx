@@ -23,7 +23,7 @@ const SignIn = () => {
       const data = await loginUser(email, password);
       const role = data.role?.toLowerCase?.() || 'user';
       const user = { email, fullName: email.split('@')[0], role };
-      setAuthSession({ token: data.access_token, user });
+      setAuthSession({ token: data.access_token, refreshToken: data.refresh_token, user });
       navigate(role === 'admin' ? '/crm' : from, { replace: true });
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Unable to sign in. Please try again.');